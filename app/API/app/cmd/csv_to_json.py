@@ -11,17 +11,19 @@ and exports results into a CSV file for security testing / STTS tracking.
 - Shows "Status = 200" messages for successful page fetches
 """
 
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import socket
+from urllib.parse import urlparse
 import csv
 import os
 
+from services.crawl_engine import PARSER, Extractor, crawl as crawl_pages
+from utils.dns_cache import DNS, install as install_dns_cache
+
 # ========== CONFIGURATION ==========
 BASE_URL = "https://mlbam-park.b12sites.com/index"
 OUTPUT_FILE = "site_metadata.csv"
 TIMEOUT = 10
+MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500"))  # safety cap for the shared crawl engine
 # ===================================
 
 # Get the directory where this script lives
@@ -30,13 +32,13 @@ CSV_FILE = os.path.join(BASE_DIR, OUTPUT_FILE)
 
 
 def resolve_ip(url: str) -> str:
-    """Resolve the domain name into an IP address"""
-    try:
-        domain = urlparse(url).hostname
-        return socket.gethostbyname(domain)
-    except Exception as e:
-        print(f"[!] Error resolving IP: {e} - csv_to_json.py:38")
+    """Resolve the domain name into an IP address (shared DNS cache)"""
+    domain = urlparse(url).hostname
+    ip = DNS.resolve(domain)
+    if not ip:
+        print(f"[!] Error resolving IP: {domain} did not resolve - csv_to_json.py:38")
         return "N/A"
+    return ip
 
 
 def extract_metadata(soup: BeautifulSoup) -> dict:
@@ -49,43 +51,31 @@ def extract_metadata(soup: BeautifulSoup) -> dict:
     }
 
 
-def crawl_site(base_url: str, ip_address: str) -> list:
-    """Visit the site, follow internal links, and collect metadata"""
-    visited = set()
-    to_visit = [base_url]
-    results = []
-    base_domain = urlparse(base_url).netloc  # Only crawl this domain
-
-    while to_visit:
-        url = to_visit.pop()
-        if url in visited:
-            continue
-        visited.add(url)
-
-        try:
-            response = requests.get(url, timeout=TIMEOUT)
-            if response.status_code == 200:
-                print(f"[*] Fetching {url} > Status = 200 ✅ - csv_to_json.py:68")
-            else:
-                print(f"[!] Skipped {url} (status {response.status_code}) - csv_to_json.py:70")
-                continue
+class MetadataRows(Extractor):
+    """One CSV row per page that answered 200"""
 
-            soup = BeautifulSoup(response.text, "html.parser")
+    def __init__(self, ip_address: str):
+        self.ip_address = ip_address
 
-            metadata = extract_metadata(soup)
-            metadata.update({"Page URL": url, "Hosting IP": ip_address})
-            results.append(metadata)
+    def page(self, url, response, soup):
+        if response.status_code != 200:
+            print(f"[!] Skipped {url} (status {response.status_code}) - csv_to_json.py:70")
+            return None
+        print(f"[*] Fetching {url} > Status = 200 ✅ - csv_to_json.py:68")
+        if soup is None:
+            soup = BeautifulSoup(response.content, PARSER)
+        metadata = extract_metadata(soup)
+        metadata.update({"Page URL": url, "Hosting IP": self.ip_address})
+        return metadata
 
-            # Find and queue new links
-            for link in soup.find_all("a", href=True):
-                new_url = urljoin(url, link["href"])
-                if urlparse(new_url).netloc == base_domain and new_url not in visited:
-                    to_visit.append(new_url)
+    def error(self, url, e):
+        print(f"[!] Error fetching {url}: {e} - csv_to_json.py:86")
+        return None
 
-        except Exception as e:
-            print(f"[!] Error fetching {url}: {e} - csv_to_json.py:86")
 
-    return results
+def crawl_site(base_url: str, ip_address: str, max_pages: int = MAX_PAGES) -> list:
+    """Visit the site, follow internal links, and collect metadata (shared crawl engine, same domain only)"""
+    return crawl_pages(base_url, MetadataRows(ip_address), max_pages=max_pages, timeout=TIMEOUT)
 
 
 def save_to_csv(data: list, filename: str):
@@ -105,6 +95,7 @@ def save_to_csv(data: list, filename: str):
 
 if __name__ == "__main__":
     print("[*] Starting metadata crawler... - csv_to_json.py:107")
+    install_dns_cache()  # every page fetch reuses the cached address
     ip_address = resolve_ip(BASE_URL)
     print(f"[+] Resolved IP: {ip_address} - csv_to_json.py:109")
 
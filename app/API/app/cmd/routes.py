@@ -3,6 +3,7 @@ from fastapi.responses import FileResponse
 from pathlib import Path
 from pydantic import BaseModel, HttpUrl
 import os, csv
+from typing import Optional
 from datetime import datetime
 
 # Import services
@@ -12,11 +13,18 @@ from app.services.reporting_service import generate
 
 # Import Pydantic models
 from app.models import TrainResult, ReportSummary  # adjust import if TrainResult lives elsewhere
+from app.utils.dns_cache import install as install_dns_cache
 
 # -------------------------------------------------
 # Setup
 # -------------------------------------------------
 router = APIRouter()
+
+@router.on_event("startup")
+def _startup():
+    # crawl fetches resolve hosts through the process-wide DNS cache
+    install_dns_cache()
+
 reports_dir = Path("data/reports/latest")
 reports_dir.mkdir(parents=True, exist_ok=True)
 
@@ -37,6 +45,8 @@ class SitePayload(BaseModel):
 
 class IngestPayload(BaseModel):
     max_pages: int = 15
+    crawl_id: Optional[str] = None  # resume an interrupted crawl
+    incremental: bool = False  # skip pages unchanged since the last crawl (ETag / Last-Modified / body hash)
 
 # -------------------------------------------------
 # Routes
@@ -56,8 +66,13 @@ def api_set_site(payload: SitePayload):
 def api_ingest(payload: IngestPayload):
     if not (1 <= payload.max_pages <= 500):
         raise HTTPException(status_code=400, detail="max_pages must be between 1 and 500")
-    events = crawl_site(max_pages=payload.max_pages)
-    return {"collected": len(events), "target_site": get_target_site()}
+    try:
+        events = crawl_site(max_pages=payload.max_pages, crawl_id=payload.crawl_id,
+                            incremental=payload.incremental)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stats = getattr(events, "stats", {})
+    return {"collected": len(events), "target_site": get_target_site(), "crawl_id": stats.get("crawl_id"), "crawl": stats}
 
 # 3. Train Model
 @router.post("/learn/train", response_model=TrainResult, dependencies=[Depends(verify_api_key)])
@@ -0,0 +1,118 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# On-disk checkpoints so a crawl survives a restart and can be resumed by its id.
+#
+#   V1  <id>.journal.jsonl  one line per finished page: its order, url, record and the
+#                           pages it added to the frontier. Written as each page ends.
+#   V2  <id>.state.json     snapshot of the frontier (pending pages, seen set, counters)
+#                           and how many journal lines it already covers. Rewritten
+#                           atomically every CRAWL_CHECKPOINT_EVERY pages or
+#                           CRAWL_CHECKPOINT_SECONDS.
+#   V3  a crawl that completes deletes both files (finish()): only interrupted crawls
+#       leave checkpoints behind, so routine crawls do not pile up on disk.
+#   V4  resuming = load the snapshot, then replay the journal lines written after it.
+#       A torn last line (crash mid-write) is ignored; that page is simply fetched again.
+#
+# Settings (env):
+#   CRAWL_CHECKPOINT_DIR      where checkpoints live       (default data/crawls)
+#   CRAWL_CHECKPOINT_EVERY    pages between snapshots      (default 50)
+#   CRAWL_CHECKPOINT_SECONDS  seconds between snapshots    (default 15)
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+CHECKPOINT_DIR = Path(os.getenv("CRAWL_CHECKPOINT_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "crawls")))
+CHECKPOINT_EVERY = int(os.getenv("CRAWL_CHECKPOINT_EVERY", "50"))
+CHECKPOINT_SECONDS = float(os.getenv("CRAWL_CHECKPOINT_SECONDS", "15"))
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,100}$")
+
+def new_crawl_id() -> str:
+    return time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
+
+# ===============================
+# Chapter 2: The Checkpoint
+# ===============================
+class CrawlCheckpoint:
+    """Developer Note: Journal + snapshot files for one crawl id."""
+
+    def __init__(self, crawl_id: str, directory: Path = None,
+                 every: int = None, seconds: float = None):
+        if not _SAFE_ID.match(crawl_id or ""):
+            raise ValueError(f"invalid crawl id: {crawl_id!r}")
+        self.crawl_id = crawl_id
+        self.directory = Path(directory or CHECKPOINT_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.directory / f"{crawl_id}.state.json"
+        self.journal_path = self.directory / f"{crawl_id}.journal.jsonl"
+        self.every = CHECKPOINT_EVERY if every is None else every
+        self.seconds = CHECKPOINT_SECONDS if seconds is None else seconds
+        self.journal_lines = 0
+        self._since = 0
+        self._last = time.monotonic()
+        self._journal = None
+
+    def load(self) -> Optional[dict]:
+        """Developer Note: {"state": snapshot, "entries": [journal entries]} or None for a new crawl."""
+        if not self.state_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text())
+        entries = []
+        if self.journal_path.exists():
+            with open(self.journal_path, "rb") as f:
+                good = 0
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # torn tail from a crash: everything after it is unreliable
+                    good += len(line)
+            # drop the torn tail so new lines start on a clean line
+            if good < self.journal_path.stat().st_size:
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+        self.journal_lines = len(entries)
+        return {"state": state, "entries": entries}
+
+    def append(self, entry: dict):
+        """Developer Note: Journal one finished page (flushed, so a process crash keeps it)."""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        self.journal_lines += 1
+        self._since += 1
+
+    def due(self) -> bool:
+        return self._since >= self.every or time.monotonic() - self._last >= self.seconds
+
+    def snapshot(self, state: dict):
+        """Developer Note: Atomically replace the snapshot; it covers every journal line so far."""
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+        state = {**state, "crawl_id": self.crawl_id, "journal_lines": self.journal_lines,
+                 "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+        self._since = 0
+        self._last = time.monotonic()
+
+    def finish(self):
+        """Developer Note: The crawl completed: nothing left to resume, so its files go."""
+        self.close()
+        for path in (self.journal_path, self.state_path, self.state_path.with_suffix(".tmp")):
+            path.unlink(missing_ok=True)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,546 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# One crawl core for every crawler in SEA-SEC (ddd/crawl, data_service.crawl_site,
+# csv_to_json.crawl_site). The walk is the same everywhere; only what each page
+# turns into differs, and that part is a pluggable Extractor.
+#
+#   V1  asyncio frontier walked by `concurrency` workers (all hosts together)
+#   V2  a token bucket per host keeps the walk gentle (HOST_RATE pages/s, HOST_BURST)
+#   V3  one pooled requests.Session per crawl: keep-alive connections are reused
+#   V4  each HTML page is parsed once; the soup feeds both the extractor and link discovery
+#   V4a bodies are streamed (fetch): HTML is kept up to CRAWL_MAX_BODY bytes and the
+#       download stops there; anything else is only counted (or sized from Content-Length
+#       without downloading it), so a worker never holds a large binary in memory
+#   V4b with parse_workers > 0 parsing is its own stage: fetch threads hand each HTML
+#       response to a process pool, so parsing uses every core instead of one
+#   V5  records come back in the order pages were found
+#   V6  the frontier (crawl_frontier.Frontier) dedups canonical URLs in O(1); the
+#       returned CrawlResult carries stats such as duplicates_avoided and what the seen
+#       set cost (seen_bytes); seen="fingerprint" or "bloom" bounds it on huge crawls
+#   V7  with a crawl_id the walk is checkpointed (crawl_checkpoint) and calling again
+#       with the same id resumes it; on_record only sees pages fetched by this call
+#       (a crawl that completes removes its checkpoint)
+#   V8  with a ValidatorStore (crawl_validators) the walk is incremental: requests are
+#       conditional (If-None-Match / If-Modified-Since) and a 304 or an identical body
+#       hash skips parsing; the page's previous record is carried forward (Extractor.carry)
+#       and its stored links are followed. on_record only sees pages that changed.
+#   V9  robots.txt is honoured (crawl_seeds): disallowed pages are never fetched and a
+#       Crawl-delay slows that host's bucket down; the sitemaps it names (or /sitemap.xml)
+#       seed the frontier before the first worker starts
+#   V10 each host's rate adapts (crawl_rate.AimdRate): up while latency holds, halved on
+#       429 / 503 / rising latency, paused for Retry-After; pages refused with 429 / 503
+#       are retried. The rate each host ended at and its back-offs are in stats["rate"]
+#
+# Settings (env):
+#   CRAWL_CONCURRENCY  pages in flight at once          (default 16)
+#   CRAWL_HOST_RATE    starting pages per second per host (default 4)
+#   CRAWL_HOST_BURST   pages at once after a quiet spell (default 4)
+#   CRAWL_TIMEOUT      seconds to wait for one page      (default 20)
+#   CRAWL_PARSER       BeautifulSoup parser              (default lxml)
+#   CRAWL_MAX_BODY     bytes of one page kept or counted (default 5 MiB)
+#   CRAWL_PARSE_WORKERS  parse processes; 0 parses on the fetch threads (default 0)
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from .crawl_checkpoint import CrawlCheckpoint
+from .crawl_frontier import Frontier
+from . import crawl_rate, crawl_seeds
+from .crawl_rate import AimdRate, retry_after_seconds
+from .crawl_seeds import fetch_robots, sitemap_urls
+from .crawl_validators import ValidatorStore, body_hash
+
+CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))
+HOST_RATE = float(os.getenv("CRAWL_HOST_RATE", "4"))
+HOST_BURST = int(os.getenv("CRAWL_HOST_BURST", "4"))
+TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "20"))
+PARSER = os.getenv("CRAWL_PARSER", "lxml")
+MAX_BODY = int(os.getenv("CRAWL_MAX_BODY", str(5 * 1024 * 1024)))
+PARSE_WORKERS = int(os.getenv("CRAWL_PARSE_WORKERS", "0"))
+CHUNK = 64 * 1024
+USER_AGENT = "SEA-SEQ/1.0"
+
+def normalize(u: str) -> str:
+    """Developer Note: Remove #fragments and trim spaces (what gets fetched; dedup uses crawl_frontier.canonicalize)."""
+    return urldefrag(u)[0].strip()
+
+class CrawlResult(list):
+    """Developer Note: The records, in page order, plus `.stats` about the walk."""
+
+    def __init__(self, records=(), stats=None):
+        super().__init__(records)
+        self.stats = stats or {}
+
+# ===============================
+# Chapter 2: Extractors
+# ===============================
+class Extractor:
+    """
+    Developer Note: Turns one fetched page into one record (or None to drop it).
+    Runs on a worker thread. `soup` is None for non-HTML or failed responses.
+    An exception raised by page() is handed to error() for the same URL.
+    """
+
+    def page(self, url: str, response: requests.Response, soup: Optional[BeautifulSoup]) -> Any:
+        raise NotImplementedError
+
+    def error(self, url: str, exc: Exception) -> Any:
+        return None
+
+    def dump(self, record: Any) -> Any:
+        """Developer Note: JSON-able form of a record for checkpoints (records are dicts by default)."""
+        return record
+
+    def load(self, data: Any) -> Any:
+        """Developer Note: Inverse of dump() when a checkpoint is resumed."""
+        return data
+
+    def carry(self, url: str, previous: Any, response: requests.Response) -> Any:
+        """Developer Note: Record for a page that has not changed since `previous` (incremental crawls)."""
+        return previous
+
+class PageStats(Extractor):
+    """Developer Note: {"url", "status", "bytes"} per page; status None when it never answered."""
+
+    def page(self, url, response, soup):
+        return {"url": url, "status": response.status_code, "bytes": body_size(response)}
+
+    def error(self, url, exc):
+        return {"url": url, "status": None, "bytes": 0}
+
+# ===============================
+# Chapter 3: Politeness
+# ===============================
+class TokenBucket:
+    """Developer Note: `rate` tokens per second, at most `burst` saved up; one token per page."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = None
+        self.held_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def hold(self, seconds: float):
+        """Developer Note: Hand out no token for `seconds` (Retry-After); saved tokens are dropped."""
+        self.held_until = max(self.held_until, asyncio.get_running_loop().time() + seconds)
+        self.tokens = 0.0
+
+    async def take(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if now < self.held_until:
+                    await asyncio.sleep(self.held_until - now)
+                    self.updated = loop.time()
+                    continue
+                if self.updated is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# ===============================
+# Chapter 4: Fetch and Parse
+# ===============================
+def _session(pool_size: int, user_agent: str) -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = user_agent
+    return s
+
+def is_html(response: requests.Response) -> bool:
+    """Developer Note: Worth parsing? A missing Content-Type is given the benefit of the doubt."""
+    ctype = response.headers.get("content-type", "").lower()
+    return not ctype or "html" in ctype
+
+def body_size(response: requests.Response) -> int:
+    """Developer Note: Bytes the page weighed (counted by fetch(), even when the body was not kept)."""
+    return getattr(response, "body_bytes", None) or len(response.content)
+
+def fetch(session, url: str, timeout: float, headers: dict = None, max_body: int = None) -> requests.Response:
+    """
+    Developer Note: Streamed GET (session may also be the requests module). Afterwards
+    response.content is the HTML body, at most max_body bytes (empty for anything else),
+    response.body_bytes how much the page weighed and response.truncated whether the
+    download was cut short. Non-HTML with a Content-Length is never downloaded at all.
+    """
+    max_body = MAX_BODY if max_body is None else max_body
+    r = session.get(url, timeout=timeout, headers=headers, stream=True)
+    keep = is_html(r)
+    body, size, truncated = bytearray(), 0, False
+    try:
+        declared = r.headers.get("Content-Length", "")
+        if not keep and declared.isdigit():
+            size = int(declared)
+        else:
+            for chunk in r.iter_content(CHUNK):
+                size += len(chunk)
+                if keep:
+                    body += chunk[:max_body - len(body)]
+                if size > max_body:
+                    truncated = True
+                    break
+    finally:
+        r.close()
+    r._content = bytes(body)
+    r._content_consumed = True
+    r.body_bytes = size
+    r.truncated = truncated
+    return r
+
+def _conditional_headers(previous: Optional[dict]) -> dict:
+    headers = {}
+    if previous and previous["record"] is not None:
+        if previous["etag"]:
+            headers["If-None-Match"] = previous["etag"]
+        if previous["last_modified"]:
+            headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
+
+def _extract(extractor, url, r, parser):
+    """Developer Note: Parse once, then extract the record and the links; returns (record, hrefs, ok)."""
+    soup = None
+    hrefs = []
+    try:
+        if r.ok and r.content and is_html(r):
+            soup = BeautifulSoup(r.content, parser)
+            hrefs = [a["href"] for a in soup.find_all("a", href=True)]
+        return extractor.page(url, r, soup), hrefs, True
+    except Exception as e:
+        return extractor.error(url, e), hrefs, False
+    finally:
+        if soup is not None:
+            soup.decompose()
+
+def _extract_remote(extractor, url, r, body_bytes, truncated, parser):
+    """Developer Note: _extract in a parse process (what fetch() attached does not survive pickling)."""
+    r.body_bytes, r.truncated = body_bytes, truncated
+    return _extract(extractor, url, r, parser)
+
+def parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Developer Note: Parse processes; spawned, because forking a threaded crawler is unsafe."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _visit(session, url, extractor, timeout, parser, validators=None, key=None, max_body=None, parsers=None):
+    """
+    Developer Note: Blocking fetch + parse + extract for one URL; returns (record, hrefs, change, fetched)
+    where change is "new", "not_modified" (304) or "same_hash" (parse skipped), or None on error,
+    and fetched is (status, seconds, Retry-After header), or None when the server never answered.
+    validators is a ValidatorStore keyed by `key` (the canonical URL); parsers a parse_pool().
+    """
+    previous = validators.get(key) if validators else None
+    t0 = time.monotonic()
+    try:
+        r = fetch(session, url, timeout, _conditional_headers(previous), max_body)
+    except Exception as e:
+        return extractor.error(url, e), [], None, None
+    fetched = (r.status_code, time.monotonic() - t0, r.headers.get("Retry-After"))
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    digest = None
+    try:
+        if previous and previous["record"] is not None:
+            if r.status_code == 304:
+                validators.touch(key, etag, last_modified)
+                return extractor.carry(url, extractor.load(previous["record"]), r), previous["links"], "not_modified", fetched
+            if r.ok and is_html(r):
+                digest = body_hash(r.content)
+                if digest == previous["hash"]:
+                    validators.touch(key, etag, last_modified)
+                    return extractor.carry(url, extractor.load(previous["record"]), r), previous["links"], "same_hash", fetched
+    except Exception as e:
+        return extractor.error(url, e), [], None, fetched
+    if parsers is not None and r.ok and r.content and is_html(r):
+        record, hrefs, ok = parsers.submit(_extract_remote, extractor, url, r, body_size(r), r.truncated,
+                                           parser).result()
+    else:
+        record, hrefs, ok = _extract(extractor, url, r, parser)
+    if not ok:
+        return record, hrefs, None, fetched
+    if validators and r.ok and record is not None:
+        # only an HTML body is kept, so only its hash can tell that nothing changed
+        digest = digest or (body_hash(r.content) if is_html(r) else None)
+        validators.put(key, etag, last_modified, digest, extractor.dump(record), hrefs)
+    return record, hrefs, "new", fetched
+
+# ===============================
+# Chapter 5: The Walk
+# ===============================
+async def crawl_async(start_url: str, extractor: Extractor = None, *, max_pages: int = 50,
+                      concurrency: int = None, host_rate: float = None, host_burst: int = None,
+                      timeout: float = None, same_host: bool = True, user_agent: str = USER_AGENT,
+                      parser: str = None, strip_params: List[str] = None,
+                      crawl_id: str = None, on_record: Callable[[Any], None] = None,
+                      checkpoint_dir: str = None, validators: ValidatorStore = None,
+                      seen: str = None, seen_fp_rate: float = None,
+                      robots: bool = None, sitemaps: bool = None,
+                      adaptive: bool = None, max_host_rate: float = None,
+                      max_body: int = None, parse_workers: int = None) -> CrawlResult:
+    """
+    Developer Note: Crawl from start_url and return one record per page (PageStats by default).
+    Links are followed from HTML pages only; same_host keeps the walk on start_url's host.
+    strip_params overrides crawl_frontier.STRIP_PARAMS (query params ignored for dedup).
+    seen / seen_fp_rate override CRAWL_SEEN / CRAWL_SEEN_FP_RATE (a resumed crawl keeps its own).
+    crawl_id: checkpoint under this id, or resume it if a checkpoint exists (the stored
+    start_url wins). on_record(record) is called as each page is journaled, never for
+    pages replayed from a checkpoint.
+    validators: make the crawl incremental (see V8); unchanged pages skip on_record.
+    robots / sitemaps override CRAWL_ROBOTS / CRAWL_SITEMAPS (see V9); sitemaps are
+    only read for a new crawl, never on resume.
+    adaptive / max_host_rate override CRAWL_ADAPTIVE / CRAWL_RATE_MAX (see V10); host_rate
+    is where each host starts, or its fixed rate when adaptive is off.
+    max_body overrides CRAWL_MAX_BODY (see V4a); parse_workers CRAWL_PARSE_WORKERS (see V4b,
+    the extractor and its records must then pickle).
+    """
+    extractor = extractor or PageStats()
+    concurrency = max(1, concurrency or CONCURRENCY)
+    host_rate = HOST_RATE if host_rate is None else host_rate
+    host_burst = HOST_BURST if host_burst is None else host_burst
+    timeout = timeout or TIMEOUT
+    parser = parser or PARSER
+    robots = crawl_seeds.ROBOTS if robots is None else robots
+    sitemaps = crawl_seeds.SITEMAPS if sitemaps is None else sitemaps
+    adaptive = crawl_rate.ADAPTIVE if adaptive is None else adaptive
+
+    start_url = normalize(start_url)
+    found = []  # (order found, record)
+    checkpoint = CrawlCheckpoint(crawl_id, checkpoint_dir) if crawl_id else None
+    resumed = checkpoint.load() if checkpoint else None
+    if resumed:
+        state, entries = resumed["state"], resumed["entries"]
+        start_url = state["start_url"]
+        frontier = Frontier.from_state(state["frontier"], max_pages=max_pages, strip_params=strip_params,
+                                       seen_fp_rate=seen_fp_rate)
+        done = []
+        for i, entry in enumerate(entries):
+            done.append(entry["order"])
+            if entry["record"] is not None:
+                found.append((entry["order"], extractor.load(entry["record"])))
+            if i >= state["journal_lines"]:
+                # finished after the snapshot: put back what it added to the frontier
+                for order, url in entry["added"]:
+                    frontier.restore(order, url)
+                frontier.duplicates_avoided += entry.get("duplicates", 0)
+        frontier.discard(done)
+    else:
+        frontier = Frontier(max_pages=max_pages, strip_params=strip_params, seen=seen, seen_fp_rate=seen_fp_rate)
+    start_host = urlparse(start_url).hostname
+    loop = asyncio.get_running_loop()
+    buckets = {}
+    ready = asyncio.Condition()
+    in_flight = {}  # order -> url being fetched
+    changes = {"new": 0, "not_modified": 0, "same_hash": 0}
+    rules = {}  # origin -> Future[crawl_seeds.Robots]
+    seeding = {"sitemap_urls": 0}
+    blocked = set()  # distinct URLs robots.txt kept us from, however often they were linked
+    delays = {}  # host -> Crawl-delay honoured
+    controls = {}  # host -> AimdRate
+    retried = [0]
+
+    def snapshot(status="running"):
+        checkpoint.snapshot({"start_url": start_url, "status": status,
+                             "frontier": frontier.to_state(in_flight.items())})
+
+    session = _session(concurrency, user_agent)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl")
+    parse_workers = PARSE_WORKERS if parse_workers is None else parse_workers
+    parsers = parse_pool(parse_workers) if parse_workers > 0 else None
+
+    async def robots_for(url):
+        key = crawl_seeds.origin(url)
+        if key not in rules:
+            rules[key] = loop.run_in_executor(executor, fetch_robots, session, url, user_agent, timeout)
+        return await rules[key]
+
+    def disallowed(url):
+        """Developer Note: True if robots.txt of url's origin is known and forbids it."""
+        future = rules.get(crawl_seeds.origin(url)) if robots else None
+        if future is not None and future.done() and not future.result().allowed(url):
+            blocked.add(url)
+            return True
+        return False
+
+    def admit(url):
+        return not disallowed(url) and frontier.add(url)
+
+    def seed(site_rules):
+        """Developer Note: Blocking: stream sitemap URLs into the frontier (no workers running yet)."""
+        listed = site_rules.sitemaps if site_rules else []
+        for loc in sitemap_urls(session, listed or [crawl_seeds.origin(start_url) + "/sitemap.xml"], timeout):
+            if frontier.max_pages is not None and frontier.admitted >= frontier.max_pages:
+                break
+            loc = normalize(loc)
+            if not loc.startswith("http") or (same_host and urlparse(loc).hostname != start_host):
+                continue
+            if admit(loc):
+                seeding["sitemap_urls"] += 1
+
+    if robots or sitemaps:
+        site_rules = await robots_for(start_url) if robots else None
+        if not resumed:
+            if max_pages > 0:
+                admit(start_url)
+            if sitemaps and max_pages > 0:
+                await loop.run_in_executor(executor, seed, site_rules)
+    elif not resumed and max_pages > 0:
+        frontier.add(start_url)
+
+    if checkpoint and not resumed:
+        snapshot()
+
+    async def worker():
+        while True:
+            async with ready:
+                # wait for work; stop once the frontier is empty and nobody can add to it
+                while not frontier and in_flight:
+                    await ready.wait()
+                item = frontier.pop()
+                if item is None:
+                    return
+                order, url = item
+                in_flight[order] = url
+            try:
+                host = urlparse(url).netloc
+                site_rules = await robots_for(url) if robots else None
+                if site_rules and not site_rules.allowed(url):
+                    blocked.add(url)
+                    if checkpoint:
+                        checkpoint.append({"order": order, "url": url, "added": [], "duplicates": 0, "record": None})
+                    continue
+                bucket = buckets.get(host)
+                if bucket is None:
+                    delay = site_rules.crawl_delay if site_rules else None
+                    ceiling = crawl_rate.RATE_MAX if max_host_rate is None else max_host_rate
+                    if delay:
+                        delays[host] = delay
+                        ceiling = min(ceiling, 1 / delay)
+                        bucket = TokenBucket(min(host_rate, 1 / delay), 1)
+                    else:
+                        bucket = TokenBucket(host_rate, host_burst)
+                    buckets[host] = bucket
+                    if adaptive:
+                        controls[host] = AimdRate(bucket, floor=min(crawl_rate.RATE_MIN, bucket.rate), ceiling=ceiling)
+                control = controls.get(host)
+                attempt = 0
+                while True:
+                    await bucket.take()
+                    try:
+                        record, hrefs, change, fetched = await loop.run_in_executor(
+                            executor, _visit, session, url, extractor, timeout, parser, validators,
+                            frontier.key(url), max_body, parsers)
+                    except Exception as e:
+                        # one bad page must not cost us a worker
+                        record, hrefs, change, fetched = extractor.error(url, e), [], None, None
+                    if control is None or fetched is None:
+                        break
+                    status, seconds, retry_after = fetched
+                    if status not in crawl_rate.BACKOFF_STATUS:
+                        if status < 500:
+                            control.success(seconds)
+                        break
+                    control.backoff(str(status), retry_after_seconds(retry_after))
+                    if attempt >= crawl_rate.RETRIES:
+                        break
+                    attempt += 1
+                    retried[0] += 1
+                if change:
+                    changes[change] += 1
+                # no awaits from here to the journal line: a snapshot never sees half a page
+                added, duplicates = [], frontier.duplicates_avoided
+                for href in hrefs:
+                    nxt = normalize(urljoin(url, href))
+                    if not nxt.startswith("http"):
+                        continue
+                    if same_host and urlparse(nxt).hostname != start_host:
+                        continue
+                    if admit(nxt):
+                        added.append((frontier.admitted - 1, nxt))
+                if checkpoint:
+                    checkpoint.append({"order": order, "url": url, "added": added,
+                                       "duplicates": frontier.duplicates_avoided - duplicates,
+                                       "record": None if record is None else extractor.dump(record)})
+                if record is not None:
+                    found.append((order, record))
+                    if on_record and change in ("new", None):
+                        on_record(record)
+                del in_flight[order]
+                if checkpoint and checkpoint.due():
+                    snapshot()
+            finally:
+                in_flight.pop(order, None)
+                async with ready:
+                    ready.notify_all()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+        if checkpoint:
+            checkpoint.finish()
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        executor.shutdown(wait=False)
+        if parsers is not None:
+            parsers.shutdown(wait=False, cancel_futures=True)
+        session.close()
+        if checkpoint:
+            checkpoint.close()
+    found.sort(key=lambda item: item[0])
+    stats = {"pages": len(found), **frontier.stats(), **frontier.memory()}
+    if parsers is not None:
+        stats["parse_workers"] = parse_workers
+    if robots or sitemaps:
+        stats.update(seeding, robots_disallowed=len(blocked))
+        if delays:
+            stats["crawl_delay"] = delays
+    if adaptive:
+        stats["rate"] = {host: control.as_dict() for host, control in controls.items()}
+        stats["retries"] = retried[0]
+    if validators:
+        stats.update(pages_changed=changes["new"], pages_not_modified=changes["not_modified"],
+                     pages_same_hash=changes["same_hash"])
+    if checkpoint:
+        stats.update(crawl_id=crawl_id, resumed=bool(resumed),
+                     pages_replayed=len(resumed["entries"]) if resumed else 0)
+    return CrawlResult((record for _, record in found), stats)
+
+def crawl(start_url: str, extractor: Extractor = None, **options) -> CrawlResult:
+    """
+    Developer Note: Blocking door to crawl_async. Inside a running event loop prefer
+    `await crawl_async(...)`; if called there anyway the walk runs on its own thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(crawl_async(start_url, extractor, **options))
+    box = {}
+
+    def run():
+        try:
+            box["records"] = asyncio.run(crawl_async(start_url, extractor, **options))
+        except BaseException as e:
+            box["error"] = e
+
+    t = threading.Thread(target=run, name="crawl")
+    t.start()
+    t.join()
+    if "error" in box:
+        raise box["error"]
+    return box["records"]
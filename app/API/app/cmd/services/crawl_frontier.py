@@ -0,0 +1,423 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# The crawl frontier for crawl_engine: a FIFO queue of pages still to fetch plus
+# an index of every page ever admitted, both O(1) per link.
+#
+#   V1  pages are indexed by their canonical URL (RFC 3986 normalisation plus a
+#       few web conventions), so /a, /a/, /a#top and /a?utm_source=x are one page
+#   V2  the URL actually fetched is the first spelling seen; the key is only for dedup
+#   V3  a duplicate fetch avoided is a distinct spelling of an already admitted page
+#       (/a/ after /a): the same string linked twice is counted once, as a plain
+#       string-set crawler would not have fetched it twice either. The spellings are
+#       kept in a second seen set of the same kind
+#   V4  the seen set is pluggable for very large crawls (see Chapter 3):
+#         exact        every canonical URL as a str (default; ~100+ bytes per URL)
+#         fingerprint  64-bit hashes in an open-addressed array (~11-22 bytes per URL;
+#                      two URLs sharing a hash is ~n^2/2^65, negligible below 10^8 URLs)
+#         bloom        Bloom filter at CRAWL_SEEN_FP_RATE (~2 bytes per URL at 0.1%);
+#                      a false positive skips a new page as if it were a duplicate
+#       memory() reports what the seen set costs, per crawl
+#
+# Settings (env):
+#   CRAWL_STRIP_PARAMS           comma list of query params ignored when comparing
+#                                URLs; a trailing * matches a prefix (default: tracking params)
+#   CRAWL_IGNORE_TRAILING_SLASH  treat /path and /path/ as one page (default true)
+#   CRAWL_SEEN                   exact | fingerprint | bloom (default exact)
+#   CRAWL_SEEN_FP_RATE           Bloom false-positive rate (default 0.001)
+#   CRAWL_SEEN_CAPACITY          Bloom sizing when the crawl has no page cap (default 1000000)
+import base64
+import hashlib
+import math
+import os
+import re
+import sys
+from array import array
+from collections import deque
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+DEFAULT_STRIP_PARAMS = "utm_*,gclid,fbclid,msclkid,mc_cid,mc_eid,_ga,_gl,sessionid,phpsessid,jsessionid,sid"
+STRIP_PARAMS = tuple(p.strip().lower() for p in os.getenv("CRAWL_STRIP_PARAMS", DEFAULT_STRIP_PARAMS).split(",") if p.strip())
+IGNORE_TRAILING_SLASH = os.getenv("CRAWL_IGNORE_TRAILING_SLASH", "true").lower() == "true"
+SEEN = os.getenv("CRAWL_SEEN", "exact").lower()
+SEEN_FP_RATE = float(os.getenv("CRAWL_SEEN_FP_RATE", "0.001"))
+SEEN_CAPACITY = int(os.getenv("CRAWL_SEEN_CAPACITY", "1000000"))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PCT = re.compile(r"%([0-9A-Fa-f]{2})")
+
+# ===============================
+# Chapter 2: Canonical URLs
+# ===============================
+def _normalize_pct(text: str) -> str:
+    """Developer Note: RFC 3986 6.2.2.1/6.2.2.2: uppercase escapes, decode unreserved characters."""
+    def fix(m):
+        ch = chr(int(m.group(1), 16))
+        return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+    return _PCT.sub(fix, text)
+
+def _remove_dot_segments(path: str) -> str:
+    """Developer Note: RFC 3986 5.2.4."""
+    out = []
+    for seg in path.split("/"):
+        if seg == "..":
+            if len(out) > 1:
+                out.pop()
+        elif seg != ".":
+            out.append(seg)
+    if path.endswith(("/.", "/..")):
+        out.append("")
+    return "/".join(out) or "/"
+
+def _stripped(name: str, strip_params: Iterable[str]) -> bool:
+    name = name.lower()
+    for p in strip_params:
+        if p.endswith("*") and name.startswith(p[:-1]):
+            return True
+        if name == p:
+            return True
+    return False
+
+def canonicalize(url: str, strip_params: Iterable[str] = None, ignore_trailing_slash: bool = None) -> str:
+    """
+    Developer Note: Canonical form used to decide whether two URLs are the same page.
+      - scheme and host lowercased, default port dropped, empty path becomes "/"
+      - dot segments removed, percent-escapes normalised
+      - fragment dropped, query params sorted, strip_params removed
+      - optionally a trailing slash on a non-root path is dropped
+    """
+    strip_params = STRIP_PARAMS if strip_params is None else tuple(p.lower() for p in strip_params)
+    ignore_trailing_slash = IGNORE_TRAILING_SLASH if ignore_trailing_slash is None else ignore_trailing_slash
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if ":" in host:
+        netloc = f"[{host}]"  # IPv6 literal
+    if parts.username is not None:
+        userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        netloc = f"{userinfo}@{netloc}"
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    path = _remove_dot_segments(_normalize_pct(parts.path or "/"))
+    if ignore_trailing_slash and len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    query = ""
+    if parts.query:
+        pairs = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _stripped(k, strip_params)]
+        query = urlencode(sorted(pairs), quote_via=quote)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+# ===============================
+# Chapter 3: Seen Sets
+# ===============================
+def _digest(key: str, size: int) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=size).digest()
+
+class ExactSeen:
+    """Developer Note: The plain set of canonical URLs; exact, and the most memory."""
+
+    kind = "exact"
+
+    def __init__(self, keys=()):
+        self._keys = set()
+        self._str_bytes = 0
+        for k in keys:
+            self.add(k)
+
+    def add(self, key: str):
+        if key not in self._keys:
+            self._keys.add(key)
+            self._str_bytes += sys.getsizeof(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._keys) + self._str_bytes
+
+    def to_state(self):
+        return list(self._keys)
+
+class FingerprintSeen:
+    """
+    Developer Note: 64-bit blake2b fingerprints in an open-addressed array('Q') with
+    linear probing; 0 marks an empty slot. Doubles when 70% full.
+    """
+
+    kind = "fingerprint"
+    LOAD = 0.7
+
+    def __init__(self, capacity: int = 1024):
+        self._alloc(max(1024, 1 << math.ceil(math.log2(max(1, capacity) / self.LOAD))))
+        self._count = 0
+
+    def _alloc(self, size: int):
+        self._slots = array("Q", [0]) * size
+        self._mask = size - 1
+        self._limit = int(size * self.LOAD)
+
+    @staticmethod
+    def fingerprint(key: str) -> int:
+        return int.from_bytes(_digest(key, 8), "little") or 1
+
+    def _slot(self, fp: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while True:
+            v = slots[i]
+            if v == 0 or v == fp:
+                return i
+            i = (i + 1) & mask
+
+    def _insert(self, fp: int) -> bool:
+        i = self._slot(fp)
+        if self._slots[i]:
+            return False
+        self._slots[i] = fp
+        self._count += 1
+        return True
+
+    def add(self, key: str):
+        if self._insert(self.fingerprint(key)) and self._count > self._limit:
+            old = self._slots
+            self._alloc(len(old) * 2)
+            self._count = 0
+            for fp in old:
+                if fp:
+                    self._insert(fp)
+
+    def __contains__(self, key: str) -> bool:
+        return self._slots[self._slot(self.fingerprint(key))] != 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def nbytes(self) -> int:
+        return self._slots.itemsize * len(self._slots)
+
+    def to_state(self) -> dict:
+        used = array("Q", (fp for fp in self._slots if fp))
+        return {"kind": self.kind, "fingerprints": base64.b64encode(used.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "FingerprintSeen":
+        used = array("Q")
+        used.frombytes(base64.b64decode(state["fingerprints"]))
+        seen = cls(len(used))
+        for fp in used:
+            seen._insert(fp)
+        return seen
+
+class _BloomLayer:
+    def __init__(self, capacity: int, fp_rate: float, bits: bytes = None):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.m = max(64, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def positions(self, h1: int, h2: int):
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def __contains__(self, hashes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self.positions(*hashes))
+
+    def test_and_add(self, hashes) -> bool:
+        """Developer Note: Set the key's bits; True if they were all set already (no add)."""
+        bits = self.bits
+        present = True
+        for p in self.positions(*hashes):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+class BloomSeen:
+    """
+    Developer Note: Scalable Bloom filter (Almeida et al.): when a layer is full a new one
+    twice its size is added at half its false-positive rate, so the overall rate stays
+    under fp_rate however far the crawl outgrows `capacity`. Double hashing for the k bits.
+    """
+
+    kind = "bloom"
+
+    def __init__(self, capacity: int = None, fp_rate: float = None):
+        self.capacity = max(1, capacity or SEEN_CAPACITY)
+        self.fp_rate = fp_rate or SEEN_FP_RATE
+        if not 0 < self.fp_rate < 1:
+            raise ValueError(f"bloom false-positive rate must be between 0 and 1: {self.fp_rate}")
+        self._layers = [_BloomLayer(self.capacity, self.fp_rate / 2)]
+        self._count = 0
+
+    @staticmethod
+    def _hashes(key: str):
+        d = _digest(key, 16)
+        return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+    def add(self, key: str):
+        hashes = self._hashes(key)
+        if any(hashes in layer for layer in self._layers[:-1]):
+            return
+        layer = self._layers[-1]
+        if layer.count >= layer.capacity and hashes not in layer:
+            layer = _BloomLayer(layer.capacity * 2, layer.fp_rate / 2)
+            self._layers.append(layer)
+        if not layer.test_and_add(hashes):
+            self._count += 1
+
+    def __contains__(self, key: str) -> bool:
+        hashes = self._hashes(key)
+        return any(hashes in layer for layer in self._layers)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def nbytes(self) -> int:
+        return sum(len(layer.bits) for layer in self._layers)
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "capacity": self.capacity, "fp_rate": self.fp_rate, "count": self._count,
+                "layers": [{"capacity": l.capacity, "fp_rate": l.fp_rate, "count": l.count,
+                            "bits": base64.b64encode(bytes(l.bits)).decode("ascii")} for l in self._layers]}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BloomSeen":
+        seen = cls(state["capacity"], state["fp_rate"])
+        seen._layers = []
+        for l in state["layers"]:
+            layer = _BloomLayer(l["capacity"], l["fp_rate"], base64.b64decode(l["bits"]))
+            layer.count = l["count"]
+            seen._layers.append(layer)
+        seen._count = state["count"]
+        return seen
+
+def new_seen(kind: str = None, capacity: Optional[int] = None, fp_rate: float = None):
+    """Developer Note: Seen set by name (CRAWL_SEEN by default); capacity sizes the compact kinds."""
+    kind = (kind or SEEN).lower()
+    if kind == "exact":
+        return ExactSeen()
+    if kind == "fingerprint":
+        return FingerprintSeen()  # grows as needed; a large page cap need not be paid up front
+    if kind == "bloom":
+        return BloomSeen(capacity, fp_rate)
+    raise ValueError(f"unknown seen set: {kind!r} (exact, fingerprint or bloom)")
+
+def seen_from_state(state):
+    if isinstance(state, list):
+        return ExactSeen(state)
+    if state["kind"] == "fingerprint":
+        return FingerprintSeen.from_state(state)
+    if state["kind"] == "bloom":
+        return BloomSeen.from_state(state)
+    raise ValueError(f"unknown seen set: {state['kind']!r}")
+
+# ===============================
+# Chapter 4: The Frontier
+# ===============================
+class Frontier:
+    """
+    Developer Note: FIFO of (order, url) still to fetch and the set of canonical
+    keys already admitted. add() and pop() are O(1). `seen` picks the seen set
+    (exact, fingerprint or bloom; see Chapter 3), sized for max_pages.
+    """
+
+    def __init__(self, max_pages: Optional[int] = None, strip_params: Iterable[str] = None,
+                 ignore_trailing_slash: bool = None, seen: str = None, seen_fp_rate: float = None):
+        self.max_pages = max_pages
+        self.strip_params = strip_params
+        self.ignore_trailing_slash = ignore_trailing_slash
+        self._queue = deque()
+        self._seen = new_seen(seen, max_pages, seen_fp_rate)
+        self._spellings = new_seen(seen, max_pages, seen_fp_rate)  # raw URLs met so far
+        self.admitted = 0
+        self.duplicates_avoided = 0
+        self.over_limit = 0
+
+    def key(self, url: str) -> str:
+        return canonicalize(url, self.strip_params, self.ignore_trailing_slash)
+
+    def add(self, url: str) -> bool:
+        """Developer Note: Queue url unless its page is already known or the page cap is reached."""
+        key = self.key(url)
+        if key in self._seen:
+            if url not in self._spellings:
+                self._spellings.add(url)
+                self.duplicates_avoided += 1
+            return False
+        if self.max_pages is not None and self.admitted >= self.max_pages:
+            self.over_limit += 1
+            return False
+        self._seen.add(key)
+        self._spellings.add(url)
+        self._queue.append((self.admitted, url))
+        self.admitted += 1
+        return True
+
+    def pop(self) -> Optional[Tuple[int, str]]:
+        return self._queue.popleft() if self._queue else None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, url: str) -> bool:
+        return self.key(url) in self._seen
+
+    # ---- checkpoints (see crawl_checkpoint) ----
+
+    def restore(self, order: int, url: str):
+        """Developer Note: Re-admit a page with its original order (journal replay)."""
+        self._seen.add(self.key(url))
+        self._spellings.add(url)
+        self._queue.append((order, url))
+        self.admitted = max(self.admitted, order + 1)
+
+    def discard(self, orders):
+        """Developer Note: Drop queued pages that are already done (once, on resume)."""
+        orders = set(orders)
+        self._queue = deque(item for item in self._queue if item[0] not in orders)
+
+    def to_state(self, in_flight=()) -> dict:
+        """Developer Note: JSON-able snapshot; pages being fetched right now go back in front."""
+        pending = sorted(in_flight) + list(self._queue)
+        return {"queue": pending, "seen": self._seen.to_state(), "spellings": self._spellings.to_state(),
+                "admitted": self.admitted,
+                "duplicates_avoided": self.duplicates_avoided, "over_limit": self.over_limit}
+
+    @classmethod
+    def from_state(cls, state: dict, **options) -> "Frontier":
+        """Developer Note: The stored seen set wins over a `seen` option (it cannot be converted)."""
+        f = cls(**{**options, "seen": "exact"})
+        f._queue = deque((order, url) for order, url in state["queue"])
+        f._seen = seen_from_state(state["seen"])
+        f._spellings = seen_from_state(state["spellings"])
+        f.admitted = state["admitted"]
+        f.duplicates_avoided = state["duplicates_avoided"]
+        f.over_limit = state["over_limit"]
+        return f
+
+    def stats(self) -> dict:
+        return {
+            "pages_admitted": self.admitted,
+            "duplicates_avoided": self.duplicates_avoided,
+            "links_over_limit": self.over_limit,
+        }
+
+    def memory(self) -> dict:
+        return {"seen_kind": self._seen.kind, "seen_entries": len(self._seen),
+                "seen_bytes": self._seen.nbytes() + self._spellings.nbytes()}
@@ -0,0 +1,115 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# Adaptive per-host crawl rate for crawl_engine (AIMD, as in TCP congestion control).
+#
+#   V1  each host starts at CRAWL_HOST_RATE pages/s; every `rate` pages answered at a
+#       steady latency (about once a second) add CRAWL_RATE_STEP pages/s, up to the ceiling
+#   V2  429 / 503 halve the rate and, with a Retry-After, hold the host that long;
+#       the page is then retried, at most CRAWL_RETRIES times
+#   V3  latency rising well above the best seen on that host halves the rate too,
+#       at most once per cooldown so a burst of slow pages is one back-off, not ten;
+#       the slower latency then becomes the baseline
+#   V4  every back-off is kept as an event; as_dict() goes into the crawl's stats
+#
+# Settings (env):
+#   CRAWL_ADAPTIVE         adapt the per-host rate            (default true)
+#   CRAWL_RATE_MIN         floor, pages per second            (default 0.25)
+#   CRAWL_RATE_MAX         ceiling, pages per second          (default 32)
+#   CRAWL_RATE_STEP        additive increase, pages/s         (default 0.5)
+#   CRAWL_RETRIES          retries of a 429 / 503 page        (default 2)
+#   CRAWL_RETRY_AFTER_MAX  longest Retry-After honoured, s    (default 60)
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+ADAPTIVE = os.getenv("CRAWL_ADAPTIVE", "true").lower() == "true"
+RATE_MIN = float(os.getenv("CRAWL_RATE_MIN", "0.25"))
+RATE_MAX = float(os.getenv("CRAWL_RATE_MAX", "32"))
+RATE_STEP = float(os.getenv("CRAWL_RATE_STEP", "0.5"))
+RETRIES = int(os.getenv("CRAWL_RETRIES", "2"))
+RETRY_AFTER_MAX = float(os.getenv("CRAWL_RETRY_AFTER_MAX", "60"))
+
+BACKOFF_STATUS = (429, 503)
+DECREASE = 0.5
+LATENCY_FACTOR = 2.0   # back off when smoothed latency passes 2x the host's best ...
+LATENCY_SLACK = 0.1    # ... and is at least this many seconds above it (ignores ms jitter)
+SMOOTHING = 0.3        # EWMA weight of the newest latency sample
+MAX_EVENTS = 100
+
+def retry_after_seconds(value: Optional[str], now: float = None) -> Optional[float]:
+    """Developer Note: Retry-After as seconds (delta-seconds or an HTTP date); None if absent or bad."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+# ===============================
+# Chapter 2: The Controller
+# ===============================
+class AimdRate:
+    """
+    Developer Note: Drives one host's TokenBucket. success() after each good answer,
+    backoff() on 429/503; both run on the event loop, so no locking.
+    """
+
+    def __init__(self, bucket, floor: float = None, ceiling: float = None, step: float = None):
+        self.bucket = bucket
+        self.floor = RATE_MIN if floor is None else floor
+        self.ceiling = max(self.floor, RATE_MAX if ceiling is None else ceiling)
+        self.step = RATE_STEP if step is None else step
+        self.initial = bucket.rate
+        self.peak = bucket.rate
+        self.latency = None    # EWMA, seconds
+        self.best = None       # lowest EWMA seen
+        self._good = 0
+        self._quiet_until = 0.0
+        self._started = time.monotonic()
+        self.backoffs = 0
+        self.events = []
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _set(self, rate: float):
+        self.bucket.rate = min(self.ceiling, max(self.floor, rate))
+        self.peak = max(self.peak, self.bucket.rate)
+
+    def success(self, latency: float):
+        self.latency = latency if self.latency is None else SMOOTHING * latency + (1 - SMOOTHING) * self.latency
+        self.best = self.latency if self.best is None else min(self.best, self.latency)
+        if self.latency > LATENCY_FACTOR * self.best and self.latency - self.best > LATENCY_SLACK:
+            self.backoff("latency")
+            self.best = self.latency  # the new normal; only a further rise backs off again
+            return
+        self._good += 1
+        if self._good >= max(1, int(self.rate)):
+            self._good = 0
+            self._set(self.rate + self.step)
+
+    def backoff(self, reason: str, retry_after: float = None):
+        now = time.monotonic()
+        self._good = 0
+        if retry_after is not None:
+            self.bucket.hold(min(retry_after, RETRY_AFTER_MAX))
+        if now < self._quiet_until:
+            return  # pages already in flight when we slowed down: one back-off is enough
+        self._set(self.rate * DECREASE)
+        self._quiet_until = now + max(1.0, 1 / self.rate)
+        self.backoffs += 1
+        if len(self.events) < MAX_EVENTS:
+            self.events.append({"at": round(now - self._started, 3), "reason": reason,
+                                "rate": round(self.rate, 3), "retry_after": retry_after})
+
+    def as_dict(self) -> dict:
+        return {"rate": round(self.rate, 3), "initial": round(self.initial, 3), "peak": round(self.peak, 3),
+                "latency": None if self.latency is None else round(self.latency, 4),
+                "backoffs": self.backoffs, "events": self.events}
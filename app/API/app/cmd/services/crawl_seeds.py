@@ -0,0 +1,178 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# What a site says about crawling it, for crawl_engine.
+#
+#   V1  robots.txt (urllib.robotparser): Disallow / Allow rules for our user agent,
+#       its Crawl-delay (caps that host's token bucket) and its Sitemap: lines
+#   V2  sitemaps seed the frontier before the walk starts, so every listed page is
+#       known up front and the workers fan out at once instead of one link at a time
+#   V3  sitemaps are parsed as a stream (iterparse; each <url> is dropped from the
+#       tree once read), gzipped ones (.xml.gz) included, and sitemap indexes are followed
+#   V4  one sitemap file is read up to the protocol's limits, 50 MB uncompressed and
+#       50,000 URLs, so a decompression bomb or an endless file stops there
+#
+# Robots fetch outcomes follow urllib.robotparser: 401/403 disallow everything,
+# any other failure (404, 5xx, no answer) allows everything.
+#
+# Settings (env):
+#   CRAWL_ROBOTS        honour robots.txt              (default true)
+#   CRAWL_SITEMAPS      seed from sitemaps             (default true)
+#   CRAWL_MAX_SITEMAPS  sitemap files read per crawl   (default 50)
+#   CRAWL_MAX_SITEMAP_BYTES  uncompressed bytes read per sitemap file (default 50 MB)
+import gzip
+import io
+import os
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+ROBOTS = os.getenv("CRAWL_ROBOTS", "true").lower() == "true"
+SITEMAPS = os.getenv("CRAWL_SITEMAPS", "true").lower() == "true"
+MAX_SITEMAPS = int(os.getenv("CRAWL_MAX_SITEMAPS", "50"))
+MAX_SITEMAP_BYTES = int(os.getenv("CRAWL_MAX_SITEMAP_BYTES", str(50 * 1000 * 1000)))
+MAX_SITEMAP_URLS = 50_000  # per file, as the sitemap protocol allows
+
+def origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+# ===============================
+# Chapter 2: robots.txt
+# ===============================
+class Robots:
+    """Developer Note: The robots.txt rules of one origin, as they apply to `user_agent`."""
+
+    def __init__(self, origin_url: str, user_agent: str, lines: Iterable[str] = (),
+                 allow_all: bool = False, disallow_all: bool = False):
+        self.origin = origin_url
+        self.user_agent = user_agent
+        self._rules = RobotFileParser(origin_url + "/robots.txt")
+        self._rules.parse(list(lines))
+        self._rules.allow_all = allow_all
+        self._rules.disallow_all = disallow_all
+
+    def allowed(self, url: str) -> bool:
+        return self._rules.can_fetch(self.user_agent, url)
+
+    @property
+    def crawl_delay(self) -> Optional[float]:
+        delay = self._rules.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    @property
+    def sitemaps(self) -> List[str]:
+        return [urljoin(self.origin + "/", s) for s in (self._rules.site_maps() or [])]
+
+def fetch_robots(session, url: str, user_agent: str, timeout: float) -> Robots:
+    """Developer Note: Blocking fetch of robots.txt for url's origin (runs on a crawl worker thread)."""
+    base = origin(url)
+    try:
+        r = session.get(base + "/robots.txt", timeout=timeout)
+    except Exception:
+        return Robots(base, user_agent, allow_all=True)
+    if r.status_code in (401, 403):
+        return Robots(base, user_agent, disallow_all=True)
+    if not r.ok:
+        return Robots(base, user_agent, allow_all=True)
+    return Robots(base, user_agent, r.text.splitlines())
+
+# ===============================
+# Chapter 3: Sitemaps
+# ===============================
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+class _ChunkReader(io.RawIOBase):
+    """Developer Note: File view of response.iter_content (Content-Encoding already undone)."""
+
+    def __init__(self, response, chunk_size: int = 64 * 1024):
+        self._chunks = response.iter_content(chunk_size)
+        self._left = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        while not self._left:
+            self._left = next(self._chunks, None)
+            if self._left is None:
+                self._left = b""
+                return 0
+        n = min(len(buf), len(self._left))
+        buf[:n] = self._left[:n]
+        self._left = self._left[n:]
+        return n
+
+class SitemapTooLarge(ValueError):
+    """Developer Note: A sitemap file went past MAX_SITEMAP_BYTES once decompressed."""
+
+class _Capped(io.RawIOBase):
+    """Developer Note: Reads through `body`, raising SitemapTooLarge past `limit` bytes."""
+
+    def __init__(self, body, limit: int):
+        self._body = body
+        self._limit = self._left = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        data = self._body.read(min(len(buf), self._left + 1))
+        if len(data) > self._left:
+            raise SitemapTooLarge(f"more than {self._limit} bytes")
+        self._left -= len(data)
+        buf[:len(data)] = data
+        return len(data)
+
+def _stream(response) -> io.BufferedReader:
+    body = io.BufferedReader(_ChunkReader(response))
+    if body.peek(2)[:2] == b"\x1f\x8b":  # a .xml.gz file served as is
+        body = gzip.GzipFile(fileobj=body)
+    # the cap counts what the parser sees: decompressed bytes
+    return io.BufferedReader(_Capped(body, MAX_SITEMAP_BYTES))
+
+def _read_sitemap(session, url: str, timeout: float, children: list) -> Iterator[str]:
+    """Developer Note: Page URLs of one sitemap; child sitemaps of an index go to `children`."""
+    with session.get(url, timeout=timeout, stream=True) as r:
+        if not r.ok:
+            return
+        index, root, found = None, None, 0
+        for event, elem in ET.iterparse(_stream(r), events=("start", "end")):
+            name = _local(elem.tag)
+            if event == "start":
+                if root is None:
+                    root, index = elem, name == "sitemapindex"
+                continue
+            if name == "loc" and elem.text:
+                loc = elem.text.strip()
+                if index:
+                    children.append(loc)
+                else:
+                    yield loc
+                found += 1
+                if found >= MAX_SITEMAP_URLS:
+                    print(f"[!] Sitemap {url}: stopped at {MAX_SITEMAP_URLS} URLs")
+                    return
+            elif name in ("url", "sitemap"):
+                root.clear()  # drop the finished entries from the tree: memory stays flat
+
+def sitemap_urls(session, sitemaps: Iterable[str], timeout: float,
+                 max_sitemaps: int = None) -> Iterator[str]:
+    """
+    Developer Note: Stream the page URLs listed by `sitemaps`, following sitemap
+    indexes breadth first, at most max_sitemaps files. Broken files are skipped.
+    """
+    max_sitemaps = MAX_SITEMAPS if max_sitemaps is None else max_sitemaps
+    queue, read, done = list(sitemaps), 0, set()
+    while queue and read < max_sitemaps:
+        url = queue.pop(0)
+        if url in done:
+            continue
+        done.add(url)
+        read += 1
+        try:
+            yield from _read_sitemap(session, url, timeout, queue)
+        except Exception as e:  # one bad sitemap must not stop the crawl
+            print(f"[!] Sitemap skipped {url}: {type(e).__name__}: {e}")
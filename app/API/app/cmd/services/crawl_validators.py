@@ -0,0 +1,92 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# Per-URL memory for incremental re-crawls (SQLite, one row per scope + URL).
+#
+#   V1  keeps the ETag / Last-Modified validators and a SHA-256 of the body of the
+#       last good fetch, plus the record it produced and the links found on it
+#   V2  crawl_engine sends If-None-Match / If-Modified-Since from here; on 304 or an
+#       identical body hash it skips parsing and carries the stored record forward,
+#       following the stored links so the walk continues past unchanged pages
+#   V3  scope keeps different record types apart (e.g. "events" for data_service)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+def body_hash(content: bytes) -> str:
+    return hashlib.sha256(content or b"").hexdigest()
+
+# ===============================
+# Chapter 2: The Store
+# ===============================
+class ValidatorStore:
+    """Developer Note: url -> validators, body hash, last record and links for one scope."""
+
+    def __init__(self, path, scope: str = "pages"):
+        self.path = str(path)
+        self.scope = scope
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS page_validators (
+          scope TEXT NOT NULL,
+          url TEXT NOT NULL,
+          etag TEXT,
+          last_modified TEXT,
+          body_hash TEXT,
+          record TEXT,
+          links TEXT,
+          fetched_at REAL NOT NULL,
+          PRIMARY KEY (scope, url)
+        )""")
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body_hash, record, links FROM page_validators WHERE scope=? AND url=?",
+                (self.scope, url),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, record, links = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "record": json.loads(record) if record is not None else None,
+            "links": json.loads(links) if links else [],
+        }
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], digest: str,
+            record: Any, links: List[str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO page_validators (scope, url, etag, last_modified, body_hash, record, links, fetched_at) "
+                "VALUES (?,?,?,?,?,?,?,?)",
+                (self.scope, url, etag, last_modified, digest,
+                 None if record is None else json.dumps(record), json.dumps(links), time.time()),
+            )
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Developer Note: Page confirmed unchanged; keep (or refresh) its validators."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE page_validators SET etag=COALESCE(?, etag), last_modified=COALESCE(?, last_modified), "
+                "fetched_at=? WHERE scope=? AND url=?",
+                (etag, last_modified, time.time(), self.scope, url),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM page_validators WHERE scope=?", (self.scope,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -2,16 +2,23 @@
 # Chapter 1: Imports and Setup
 # ===============================
 # This chapter sets up the environment and dependencies for data collection and event processing.
-import os, re, json, time
-from typing import List, Tuple
+import os, re, json
+from typing import Iterator, List, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from pydantic import TypeAdapter
 from models.events import SecurityEvent
+from services.crawl_checkpoint import new_crawl_id
+from services.crawl_engine import PARSER, Extractor, crawl as crawl_pages, fetch as fetch_page
+from services.crawl_validators import ValidatorStore
+from services.event_store import EventIndex, EventLog, site_key
 from pathlib import Path
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "data")).resolve()
-EVENTS_PATH = DATA_DIR / "events.jsonl"
+EVENTS_DIR = DATA_DIR / "events"  # events log: one directory of rotated, gzipped segments per site, plus its index
+CRAWLS_DIR = DATA_DIR / "crawls"  # crawl checkpoints (frontier snapshots + page journals)
+VALIDATORS_PATH = DATA_DIR / "page_validators.sqlite3"  # ETag / Last-Modified / body hash per page
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 DEFAULT_SITE = os.getenv("TARGET_SITE_URL", "https://mlbam-park.b12sites.com/").strip()
@@ -36,15 +43,18 @@ def set_target_site(url: str) -> str:
 # Chapter 3: Event Fetching and Parsing
 # ===============================
 def _fetch(url: str) -> Tuple[str, requests.Response]:
-    """Developer Note: Fetches a URL and returns the response."""
-    r = requests.get(url, timeout=15, headers={"User-Agent":"SEA-SEC/0.1"})
+    """Developer Note: Fetches a URL and returns the response (streamed: only an HTML body is kept, capped)."""
+    r = fetch_page(requests, url, timeout=15, headers={"User-Agent":"SEA-SEC/0.1"})
     r.raise_for_status()
     return url, r
 
 def _event_from_response(url: str, r: requests.Response) -> SecurityEvent:
-    """Developer Note: Parses a response into a SecurityEvent object."""
+    """Developer Note: Parses a response into a SecurityEvent object (lxml by default, see CRAWL_PARSER)."""
+    return _event_from_soup(url, r, BeautifulSoup(r.content, PARSER))
+
+def _event_from_soup(url: str, r: requests.Response, soup: BeautifulSoup) -> SecurityEvent:
+    """Developer Note: Builds the SecurityEvent from an already parsed page."""
     https = urlparse(url).scheme == "https"
-    soup = BeautifulSoup(r.text, "html.parser")
     links = soup.find_all("a")
     forms = soup.find_all("form")
     has_login = any("password" in (inp.get("type","").lower()) for f in forms for inp in f.find_all("input"))
@@ -69,52 +79,158 @@ def explotsreports():
 # ===============================
 # Chapter 5: Site Crawling
 # ===============================
-def crawl_site(max_pages: int = 15) -> List[SecurityEvent]:
+class _EventExtractor(Extractor):
+    """Developer Note: One SecurityEvent per crawled page; failures become events with a note."""
+
+    def page(self, url, response, soup):
+        response.raise_for_status()
+        if soup is None:
+            soup = BeautifulSoup(response.content, PARSER)
+        return _event_from_soup(url, response, soup)
+
+    def error(self, url, e):
+        return SecurityEvent(page_url=url, https=urlparse(url).scheme=="https",
+                             num_links=0, num_forms=0, has_login_form=False,
+                             headers={}, note=f"error: {type(e).__name__}: {e}")
+
+    def dump(self, ev):
+        return ev.model_dump(mode="json")
+
+    def load(self, data):
+        return SecurityEvent.model_validate(data)
+
+def _log_line(ev: SecurityEvent, crawl_id: Optional[str]) -> str:
+    """Developer Note: One log line: the event plus the crawl that produced it (for the index)."""
+    return json.dumps({**ev.model_dump(mode="json"), "crawl_id": crawl_id}) + "\n"
+
+def _persist_missing(events: List[SecurityEvent], crawl_id: Optional[str] = None):
+    """Developer Note: Append the events the log does not hold yet (resume after a crash)."""
+    if not events:
+        return
+    log, index = _event_store()
+    rows = [(ev, ev.model_dump(mode="json")) for ev in events]
+    held = index.contains_many((data["page_url"], data["timestamp"]) for _, data in rows)
+    batch = {}
+    for ev, data in rows:
+        key = (str(data["page_url"]), str(data["timestamp"]))
+        if key not in held:
+            held.add(key)
+            batch.setdefault(site_key(data["page_url"]), []).append(_log_line(ev, crawl_id))
+    for site, lines in batch.items():
+        log.append(site, lines)
+
+def crawl_site(max_pages: int = 15, crawl_id: Optional[str] = None, incremental: bool = False) -> List[SecurityEvent]:
+    """
+    Developer Note: Crawls the target site with the shared crawl engine (concurrent,
+    same host only, seeded from its sitemaps, robots.txt rules and Crawl-delay honoured,
+    adaptive per-host rate instead of a fixed sleep) and appends each event to its
+    site's partition of EVENTS_DIR as its page finishes. The returned list's `.stats`
+    says how many duplicate fetches the canonicalising frontier avoided, and its crawl_id.
+
+    The crawl is checkpointed under crawl_id (a new one by default); passing the id
+    of an interrupted crawl resumes it. Each page is journaled before its event is
+    logged, so on resume only journaled events missing from the log are appended.
+
+    incremental=True re-crawls with conditional requests against VALIDATORS_PATH: a page
+    that answers 304 or serves the same bytes is not parsed again, its previous event is
+    carried forward into the result, and nothing new is appended to the log for it.
+    """
     start = get_target_site()
-    seen = set()
-    to_visit = [start]
-    events: List[SecurityEvent] = []
-    while to_visit and len(seen) < max_pages:
-        url = to_visit.pop(0)
-        if url in seen:
-            continue
-        seen.add(url)
-        try:
-            _, resp = _fetch(url)
-            ev = _event_from_response(url, resp)
-            events.append(ev)
-            # enqueue new links on same host
-            soup = BeautifulSoup(resp.text, "html.parser")
-            base = f"{urlparse(start).scheme}://{urlparse(start).netloc}"
-            for a in soup.find_all("a", href=True):
-                nxt = urljoin(url, a["href"])
-                if urlparse(nxt).netloc == urlparse(start).netloc:
-                    if nxt not in seen and nxt not in to_visit:
-                        to_visit.append(nxt)
-        except Exception as e:
-            events.append(SecurityEvent(page_url=url, https=urlparse(url).scheme=="https",
-                                        num_links=0, num_forms=0, has_login_form=False,
-                                        headers={}, note=f"error: {type(e).__name__}: {e}"))
-        time.sleep(0.3)
-    # persist
-    with open(EVENTS_PATH, "a") as f:
-        for ev in events:
-            f.write(ev.model_dump_json() + "\n")
+    crawl_id = crawl_id or new_crawl_id()
+    written = set()
+    validators = ValidatorStore(VALIDATORS_PATH, scope="events") if incremental else None
+    log, _ = _event_store()
+
+    def persist(ev):
+        log.append(site_key(ev.page_url), _log_line(ev, crawl_id))
+        written.add(id(ev))
+
+    try:
+        events: List[SecurityEvent] = crawl_pages(start, _EventExtractor(), max_pages=max_pages,
+                                                  timeout=15, user_agent="SEA-SEC/0.1",
+                                                  crawl_id=crawl_id, checkpoint_dir=CRAWLS_DIR,
+                                                  on_record=persist, validators=validators)
+    finally:
+        if validators:
+            validators.close()
+    if events.stats.get("resumed"):
+        _persist_missing([ev for ev in events if id(ev) not in written], crawl_id)
     return events
 
 # ===============================
-# Chapter 6: Event Loading
+# Chapter 6: Event Log and Loading
 # ===============================
-def load_events(limit: int = None) -> List[SecurityEvent]:
-    events = []
-    if not EVENTS_PATH.exists():
-        return events
-    with open(EVENTS_PATH) as f:
-        for i, line in enumerate(f):
+_stores = {}
+_EVENT_LIST = TypeAdapter(List[SecurityEvent])
+
+def _import_legacy_log(log: EventLog, legacy: Path):
+    """Developer Note: Move a pre-partitioning events.jsonl into the per-site log (once)."""
+    batch = {}
+    with open(legacy) as f:
+        for line in f:
+            try:
+                site = site_key(json.loads(line)["page_url"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            batch.setdefault(site, []).append(line if line.endswith("\n") else line + "\n")
+            if len(batch[site]) >= 10_000:
+                log.append(site, batch.pop(site))
+    for site, lines in batch.items():
+        log.append(site, lines)
+    legacy.rename(legacy.with_name(legacy.name + ".imported"))
+    legacy.with_name(legacy.name + ".index.sqlite3").unlink(missing_ok=True)
+    print(f"[!] imported {legacy} into {log.root}")
+
+def _event_store() -> Tuple[EventLog, EventIndex]:
+    """Developer Note: The EventLog of the current EVENTS_DIR and its index (one pair per directory, kept open)."""
+    key = str(EVENTS_DIR)
+    if key not in _stores:
+        log = EventLog(EVENTS_DIR)
+        legacy = EVENTS_DIR.parent / "events.jsonl"
+        if legacy.exists():
+            _import_legacy_log(log, legacy)
+        _stores[key] = (log, EventIndex(log))
+    return _stores[key]
+
+def _decode_events(lines: List[bytes]) -> List[SecurityEvent]:
+    """Developer Note: Decode log lines in one pydantic call; if the batch fails, line by line, skipping bad ones."""
+    if not lines:
+        return []
+    try:
+        return _EVENT_LIST.validate_json(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        events = []
+        for line in lines:
             try:
                 events.append(SecurityEvent.model_validate_json(line))
-            except Exception:
+            except ValueError:
                 continue
-            if limit and len(events) >= limit:
-                break
-    return events
+        return events
+
+def load_events(limit: int = None, site: str = None, crawl_id: str = None,
+                since=None, until=None) -> List[SecurityEvent]:
+    """
+    Developer Note: Events from the log, oldest first, read through its index: only the
+    matching lines are read and decoded. limit keeps the newest `limit`; site (URL or
+    host), crawl_id and the since/until timestamps (datetime or ISO string, until
+    exclusive) filter.
+    """
+    log, index = _event_store()
+    if not (limit or site or crawl_id or since or until):
+        # everything: one sequential pass over the segments beats seeking line by line
+        return sorted(_decode_events(list(log.lines())), key=lambda ev: ev.timestamp)
+    return _decode_events(index.read(site=site, crawl_id=crawl_id, since=since, until=until, limit=limit))
+
+def iter_events(site: str = None) -> Iterator[SecurityEvent]:
+    """Developer Note: Stream every event of a site (or all sites) segment by segment, without the index."""
+    log, _ = _event_store()
+    for line in log.lines(site):
+        try:
+            yield SecurityEvent.model_validate_json(line)
+        except ValueError:
+            continue
+
+def compact_events(keep: int = None) -> List[dict]:
+    """Developer Note: The log's maintenance job: rotate idle segments, drop superseded events (see event_store)."""
+    log, _ = _event_store()
+    return log.maintain(keep)
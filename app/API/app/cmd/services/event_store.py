@@ -0,0 +1,518 @@
+# ===============================
+# Chapter 1: Purpose
+# ===============================
+# The events log: append-only JSON lines, one directory per target site, cut into
+# segments, plus an index so readers stop re-reading all of it.
+#
+#   V1  <root>/<site>/000001-20241017T120000.jsonl   the active segment (appended to)
+#       <root>/<site>/000000-20241016T080000.jsonl.gz closed segments (gzip, read-only)
+#   V2  the active segment is closed and compressed once it passes EVENTS_SEGMENT_BYTES
+#       or is older than EVENTS_SEGMENT_HOURS (checked on append, and by maintain()
+#       for sites nobody writes to)
+#   V3  compact() drops superseded events from closed segments: exact repeats (same
+#       page, same timestamp, including a copy already in the active segment) and an
+#       event re-recorded later in the same crawl (same page and crawl_id: the newest
+#       stays). Every crawl's events are kept, unless EVENTS_COMPACT_KEEP (or --keep)
+#       asks for only the newest N per page. The active segment is never rewritten
+#   V4  lines() streams a site (or every site) segment by segment, compressed or not
+#   V5  appends, rotation and compaction of a site hold its .lock (flock), so several
+#       API processes can share one data directory; readers take it shared just long
+#       enough to find and open a segment. An open segment stays whole after that
+#       (rotation and compaction write new files and only unlink the old ones)
+#
+# Settings (env):
+#   EVENTS_SEGMENT_BYTES   rotate the active segment past this size   (default 16 MiB)
+#   EVENTS_SEGMENT_HOURS   ... or past this age                       (default 24)
+#   EVENTS_COMPACT_KEEP    events kept per page by compact()          (default 0: all crawls)
+import argparse
+import calendar
+import fcntl
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+from urllib.parse import urlparse
+
+SEGMENT_BYTES = int(os.getenv("EVENTS_SEGMENT_BYTES", str(16 << 20)))
+SEGMENT_HOURS = float(os.getenv("EVENTS_SEGMENT_HOURS", "24"))
+COMPACT_KEEP = int(os.getenv("EVENTS_COMPACT_KEEP", "0"))
+
+ACTIVE, CLOSED = ".jsonl", ".jsonl.gz"
+SEGMENT_RE = re.compile(r"^(\d{6})-(\d{8}T\d{6})\.jsonl(\.gz)?$")
+INDEX_VERSION = "2"
+INSERT_BATCH = 10_000
+MAX_READ = 1 << 20  # merge neighbouring lines into reads of at most this many bytes
+READ_ATTEMPTS = 5  # reads retried when segments change underneath them
+
+def site_key(url) -> str:
+    """Developer Note: The site a URL belongs to: its host, lower case ("example.com")."""
+    url = str(url or "")
+    if "://" not in url:
+        url = "//" + url
+    return (urlparse(url).hostname or "").lower()
+
+def _site_dir(site: str) -> str:
+    # hosts are already safe names; IPv6 colons and the like are not
+    return re.sub(r"[^a-z0-9.-]", "_", site_key(site)) or "_unknown"
+
+def _ts(value: Union[str, datetime, None]) -> Optional[str]:
+    # timestamps are compared as the ISO strings the log holds
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _file_id(path: str, st: os.stat_result) -> str:
+    return f"{os.path.basename(path)}:{st.st_dev}:{st.st_ino}"
+
+def _complete_lines(f) -> Iterator[bytes]:
+    for line in f:
+        if not line.endswith(b"\n"):
+            return  # a writer is halfway through this line
+        yield line
+
+# ===============================
+# Chapter 2: The Segmented Log
+# ===============================
+class EventLog:
+    """Developer Note: Per-site directories of rotated, compressed JSON-lines segments."""
+
+    def __init__(self, root, segment_bytes: int = None, segment_hours: float = None):
+        self.root = str(root)
+        self.segment_bytes = SEGMENT_BYTES if segment_bytes is None else segment_bytes
+        self.segment_seconds = 3600 * (SEGMENT_HOURS if segment_hours is None else segment_hours)
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- layout ---------------------------------------------------------
+    def sites(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def segments(self, site: str) -> List[str]:
+        """Developer Note: Segment names (without extension) of a site, oldest first."""
+        folder = os.path.join(self.root, _site_dir(site))
+        if not os.path.isdir(folder):
+            return []
+        return sorted({m.group(1) + "-" + m.group(2) for m in map(SEGMENT_RE.match, os.listdir(folder)) if m})
+
+    def segment_path(self, site: str, name: str) -> Optional[str]:
+        """Developer Note: The file holding a segment: the plain one while it exists, else the .gz."""
+        base = os.path.join(self.root, _site_dir(site), name)
+        for ext in (ACTIVE, CLOSED):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    @staticmethod
+    def _open(path: str):
+        return gzip.open(path, "rb") if path.endswith(CLOSED) else open(path, "rb")
+
+    def open_segment(self, site: str, name: str):
+        """
+        Developer Note: (open file, file id) of a segment, found and opened under the
+        site's shared lock, or None if it is gone. The file id (name, device, inode)
+        tells the index whether this is still the file it indexed.
+        """
+        with self._site_lock(site, shared=True):
+            path = self.segment_path(site, name)
+            if path is None:
+                return None
+            f = self._open(path)
+        return f, _file_id(path, os.fstat(f.fileno()))
+
+    @contextmanager
+    def _site_lock(self, site: str, shared: bool = False):
+        folder = os.path.join(self.root, _site_dir(site))
+        os.makedirs(folder, exist_ok=True)
+        # a fresh descriptor per call: flock then serialises threads as well as processes
+        with open(os.path.join(folder, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield folder
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # --- writing --------------------------------------------------------
+    def _active(self, folder: str, create: bool = True) -> Optional[str]:
+        names = sorted(n for n in os.listdir(folder) if SEGMENT_RE.match(n))
+        if names and names[-1].endswith(ACTIVE):
+            return os.path.join(folder, names[-1])
+        if not create:
+            return None
+        seq = int(names[-1][:6]) + 1 if names else 0
+        path = os.path.join(folder, f"{seq:06d}-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}{ACTIVE}")
+        open(path, "ab").close()
+        return path
+
+    def _due(self, path: str) -> bool:
+        size = os.path.getsize(path)
+        if size >= self.segment_bytes:
+            return True
+        opened = calendar.timegm(time.strptime(SEGMENT_RE.match(os.path.basename(path)).group(2), "%Y%m%dT%H%M%S"))
+        return size > 0 and time.time() - opened >= self.segment_seconds
+
+    @staticmethod
+    def _close(path: str):
+        """Developer Note: Compress a segment next to itself; the plain file goes once the .gz is whole."""
+        tmp = path + ".gz.tmp"
+        with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+            while chunk := src.read(MAX_READ):
+                dst.write(chunk)
+        os.replace(tmp, path[:-len(ACTIVE)] + CLOSED)
+        os.unlink(path)
+
+    def append(self, site: str, lines: Union[str, List[str]]):
+        """Developer Note: Append JSON lines (each ending in a newline) to a site's active segment."""
+        if isinstance(lines, str):
+            lines = [lines]
+        if not lines:
+            return
+        data = "".join(lines).encode()
+        with self._site_lock(site) as folder:
+            active = self._active(folder)
+            if self._due(active):
+                self._close(active)
+                active = self._active(folder)
+            with open(active, "ab") as f:
+                f.write(data)
+
+    def rotate(self, site: str, force: bool = False) -> bool:
+        """Developer Note: Close the active segment if it is due (or, with force, if it holds anything)."""
+        with self._site_lock(site) as folder:
+            active = self._active(folder, create=False)
+            if active and os.path.getsize(active) and (force or self._due(active)):
+                self._close(active)
+                return True
+            return False
+
+    # --- reading --------------------------------------------------------
+    def lines(self, site: str = None) -> Iterator[bytes]:
+        """Developer Note: Every complete line of a site (or of all sites), segment by segment."""
+        for s in ([_site_dir(site)] if site else self.sites()):
+            for name in self.segments(s):
+                opened = self.open_segment(s, name)
+                if opened is None:
+                    continue  # compacted away meanwhile
+                with opened[0] as f:
+                    yield from _complete_lines(f)
+
+    # --- compaction -----------------------------------------------------
+    def compact(self, site: str, keep: int = None) -> dict:
+        """
+        Developer Note: Rewrite the closed segments of a site without superseded events.
+        Two streaming passes: find the newest timestamp of each page in each crawl (and,
+        with keep > 0, each page's newest `keep` timestamps) over every segment, then
+        rewrite each closed segment that loses a line (dropped if empty).
+        """
+        keep = COMPACT_KEEP if keep is None else keep
+        stats = {"site": _site_dir(site), "segments_rewritten": 0, "events_dropped": 0,
+                 "bytes_before": 0, "bytes_after": 0}
+        with self._site_lock(site) as folder:
+            in_crawl: Dict[tuple, str] = {}
+            newest: Dict[str, List[str]] = {}
+            in_active = set()
+            for name in self.segments(site):
+                path = self.segment_path(site, name)
+                if path is None:
+                    continue
+                with self._open(path) as f:
+                    for line in _complete_lines(f):
+                        try:
+                            data = json.loads(line)
+                            url, ts, crawl_id = str(data["page_url"]), str(data["timestamp"]), data.get("crawl_id")
+                        except (ValueError, KeyError, TypeError):
+                            continue
+                        if path.endswith(ACTIVE):
+                            in_active.add((url, ts))
+                        if crawl_id is not None and ts > in_crawl.get((url, crawl_id), ""):
+                            in_crawl[(url, crawl_id)] = ts
+                        if keep > 0:
+                            kept = newest.setdefault(url, [])
+                            if ts not in kept:
+                                kept.append(ts)
+                                if len(kept) > keep:
+                                    kept.sort(reverse=True)
+                                    del kept[keep:]
+
+            def wanted(data) -> bool:
+                url, ts, crawl_id = str(data["page_url"]), str(data["timestamp"]), data.get("crawl_id")
+                if crawl_id is not None and in_crawl[(url, crawl_id)] != ts:
+                    return False
+                return keep <= 0 or ts in newest[url]
+
+            seen = set(in_active)  # a closed line repeated in the active segment goes
+            for name in self.segments(site):
+                path = os.path.join(folder, name + CLOSED)
+                if not os.path.exists(path):
+                    continue  # the active segment
+                before = os.path.getsize(path)
+                tmp, dropped, written = path + ".tmp", 0, 0
+                with self._open(path) as src, gzip.open(tmp, "wb") as dst:
+                    for line in _complete_lines(src):
+                        try:
+                            data = json.loads(line)
+                            key = (str(data["page_url"]), str(data["timestamp"]))
+                        except (ValueError, KeyError, TypeError):
+                            key = None
+                        if key is not None and key not in seen and wanted(data):
+                            seen.add(key)
+                            dst.write(line)
+                            written += 1
+                        else:
+                            dropped += 1
+                stats["bytes_before"] += before
+                if not dropped:
+                    os.unlink(tmp)
+                    stats["bytes_after"] += before
+                    continue
+                if written:
+                    os.replace(tmp, path)
+                    stats["bytes_after"] += os.path.getsize(path)
+                else:
+                    os.unlink(tmp)
+                    os.unlink(path)
+                stats["segments_rewritten"] += 1
+                stats["events_dropped"] += dropped
+        return stats
+
+    def maintain(self, keep: int = None) -> List[dict]:
+        """Developer Note: The periodic job: rotate aged segments of idle sites, then compact every site."""
+        out = []
+        for site in self.sites():
+            self.rotate(site)
+            out.append(self.compact(site, keep))
+        return out
+
+# ===============================
+# Chapter 3: The Index
+# ===============================
+# One SQLite file (<root>/index.sqlite3) says where each line is: its site, segment,
+# crawl_id, timestamp, page_url and byte offset/length in the uncompressed segment.
+#   V1  indexed by (site, ts), (crawl_id, ts), (ts) and (page_url, ts)
+#   V2  refresh() reads only what was appended to each segment since last time; a
+#       segment whose file changed (compressed, compacted) is indexed again, and a
+#       segment that is gone leaves the index. The file can always be deleted
+#   V3  read() filters and orders in SQL, then reads only the chosen lines, each
+#       segment front to back (forward seeks, which gzip files do well)
+class EventIndex:
+    """Developer Note: (site, crawl_id, timestamp) -> line of the events log."""
+
+    def __init__(self, log: EventLog, index_path=None):
+        self.log = log
+        self.path = str(index_path or os.path.join(log.root, "index.sqlite3"))
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._db.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        if not row or row[0] != INDEX_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS events")
+            self._db.execute("DROP TABLE IF EXISTS segments")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (INDEX_VERSION,))
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+          seq INTEGER PRIMARY KEY,
+          site TEXT NOT NULL,
+          segment TEXT NOT NULL,
+          crawl_id TEXT,
+          ts TEXT NOT NULL,
+          page_url TEXT NOT NULL,
+          offset INTEGER NOT NULL,
+          length INTEGER NOT NULL
+        )""")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS segments (
+          site TEXT NOT NULL,
+          segment TEXT NOT NULL,
+          file TEXT NOT NULL,
+          indexed_to INTEGER NOT NULL,
+          PRIMARY KEY (site, segment)
+        )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_site_ts ON events (site, ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_crawl_ts ON events (crawl_id, ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_ts ON events (ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_url_ts ON events (page_url, ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_segment ON events (site, segment)")
+
+    @staticmethod
+    def _row(site, segment, line: bytes, offset: int):
+        try:
+            data = json.loads(line)
+            return (site, segment, data.get("crawl_id"), str(data["timestamp"]), str(data["page_url"]),
+                    offset, len(line))
+        except (ValueError, KeyError, TypeError):
+            return None  # a broken line stays in the log, out of the index
+
+    def _forget(self, site, segment):
+        self._db.execute("DELETE FROM events WHERE site=? AND segment=?", (site, segment))
+        self._db.execute("DELETE FROM segments WHERE site=? AND segment=?", (site, segment))
+
+    def refresh(self) -> int:
+        """Developer Note: Index whatever was appended, compressed or compacted since last time; returns new lines."""
+        with self._lock:
+            known = {(s, g): (f, n) for s, g, f, n in self._db.execute("SELECT * FROM segments")}
+            added, present = 0, set()
+            for site in self.log.sites():
+                for segment in self.log.segments(site):
+                    old_file, start = known.get((site, segment), (None, 0))
+                    path = self.log.segment_path(site, segment)
+                    try:
+                        st = os.stat(path) if path else None
+                    except FileNotFoundError:
+                        st = None
+                    if st and old_file == _file_id(path, st) and (path.endswith(CLOSED) or st.st_size == start):
+                        present.add((site, segment))
+                        continue  # nothing new (closed segments do not change in place)
+                    opened = self.log.open_segment(site, segment)
+                    if opened is None:
+                        continue
+                    f, file = opened
+                    with f:
+                        present.add((site, segment))
+                        if old_file != file:
+                            if old_file is not None:
+                                self._forget(site, segment)
+                            start = 0
+                        added += self._index_segment(site, segment, f, file, start)
+            for gone in set(known) - present:
+                self._forget(*gone)
+            return added
+
+    def _index_segment(self, site, segment, f, file, start) -> int:
+        added, rows, pos = 0, [], start
+        f.seek(start)
+        for line in _complete_lines(f):
+            row = self._row(site, segment, line, pos)
+            pos += len(line)
+            if row:
+                rows.append(row)
+            if len(rows) >= INSERT_BATCH:
+                added += self._insert(site, segment, file, rows, pos)
+                rows = []
+        return added + self._insert(site, segment, file, rows, pos)
+
+    def _insert(self, site, segment, file, rows, indexed_to: int) -> int:
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany("INSERT INTO events (site, segment, crawl_id, ts, page_url, offset, length) "
+                                 "VALUES (?,?,?,?,?,?,?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO segments (site, segment, file, indexed_to) VALUES (?,?,?,?)",
+                             (site, segment, file, indexed_to))
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def locate(self, site: str = None, crawl_id: str = None, since=None, until=None,
+               limit: int = None) -> List[tuple]:
+        """Developer Note: (site, segment, offset, length) of matching lines, oldest first; with a limit, the newest `limit`."""
+        self.refresh()
+        where, args = [], []
+        if site:
+            where.append("site = ?")
+            args.append(_site_dir(site))
+        if crawl_id:
+            where.append("crawl_id = ?")
+            args.append(crawl_id)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(_ts(since))
+        if until is not None:
+            where.append("ts < ?")
+            args.append(_ts(until))
+        sql = "SELECT site, segment, offset, length FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if limit:
+            sql += " ORDER BY ts DESC, seq DESC LIMIT ?"
+            args.append(int(limit))
+        else:
+            sql += " ORDER BY ts, seq"
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return rows[::-1] if limit else rows
+
+    def read(self, site: str = None, crawl_id: str = None, since=None, until=None,
+             limit: int = None) -> List[bytes]:
+        """
+        Developer Note: The matching log lines (bytes, oldest first). A segment rotated or
+        compacted between the lookup and the read is no longer the file its offsets point
+        into: the index is refreshed and the read tried again.
+        """
+        for _ in range(READ_ATTEMPTS):
+            spans = self.locate(site=site, crawl_id=crawl_id, since=since, until=until, limit=limit)
+            lines = self._read_spans(spans)
+            if lines is not None:
+                return [lines[(s, g, o)] for s, g, o, _ in spans if (s, g, o) in lines]
+        raise RuntimeError(f"events log kept changing under a read ({READ_ATTEMPTS} attempts)")
+
+    def _read_spans(self, spans) -> Optional[Dict[tuple, bytes]]:
+        # None: some segment is not the file the index knows; refresh and look again
+        by_segment: Dict[tuple, List[tuple]] = {}
+        for s, g, offset, length in spans:
+            by_segment.setdefault((s, g), []).append((offset, length))
+        lines = {}
+        for (s, g), wanted in by_segment.items():
+            opened = self.log.open_segment(s, g)
+            if opened is None:
+                return None  # compacted away between lookup and read
+            f, file = opened
+            with f:
+                with self._lock:
+                    row = self._db.execute("SELECT file FROM segments WHERE site=? AND segment=?", (s, g)).fetchone()
+                if not row or row[0] != file:
+                    return None
+                run, run_start, run_end = [], None, None
+                for offset, length in sorted(wanted) + [(None, 0)]:
+                    if offset is not None and run and offset == run_end and run_end - run_start + length <= MAX_READ:
+                        run.append((offset, length))
+                        run_end += length
+                        continue
+                    if run:
+                        f.seek(run_start)
+                        chunk = f.read(run_end - run_start)
+                        for o, n in run:
+                            lines[(s, g, o)] = chunk[o - run_start:o - run_start + n]
+                    if offset is not None:
+                        run, run_start, run_end = [(offset, length)], offset, offset + length
+        return lines
+
+    def contains(self, page_url: str, timestamp) -> bool:
+        """Developer Note: Is (page_url, timestamp) indexed? A plain lookup: refresh() first if the log moved on."""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM events WHERE page_url=? AND ts=? LIMIT 1",
+                                    (str(page_url), _ts(timestamp))).fetchone() is not None
+
+    def contains_many(self, keys) -> set:
+        """Developer Note: Which of the (page_url, timestamp) keys are in the log: one refresh for the batch."""
+        keys = {(str(url), _ts(ts)) for url, ts in keys}
+        self.refresh()
+        with self._lock:
+            return {key for key in keys
+                    if self._db.execute("SELECT 1 FROM events WHERE page_url=? AND ts=? LIMIT 1", key).fetchone()}
+
+    def count(self) -> int:
+        self.refresh()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# ===============================
+# Chapter 4: The Maintenance Job
+# ===============================
+# Run from cron (or any scheduler), next to the API's data directory:
+#   python -m services.event_store --events-dir data/events [--keep N]
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rotate idle event segments and compact superseded events.")
+    ap.add_argument("--events-dir", default=os.path.join(os.getenv("DATA_DIR", "data"), "events"))
+    ap.add_argument("--keep", type=int, default=COMPACT_KEEP, help="events kept per page (0: every crawl's)")
+    args = ap.parse_args()
+    for result in EventLog(args.events_dir).maintain(args.keep):
+        print(f"[*] {result['site']}: {result['events_dropped']} events dropped from "
+              f"{result['segments_rewritten']} segments, {result['bytes_before']} -> {result['bytes_after']} bytes")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading events - the old load_events (read and model_validate_json every
+line of one events.jsonl) versus data_service.load_events through the per-site,
+segmented log and its index: all events (bulk decode), the newest N, one site's
+events, and a plain stream of every segment. Also prints the size on disk of the
+single file versus the gzipped segments.
+
+  python services/tests/bench/bench_event_store.py --events 20000 100000 --sites 20 --limit 500
+
+The logs are synthetic (N events spread over --sites hosts) in a temporary DATA_DIR.
+The first indexed read builds the index once and is reported separately.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench_events_"))
+
+from models.events import SecurityEvent  # noqa: E402
+from services import data_service  # noqa: E402
+from services.event_store import site_key  # noqa: E402
+
+
+def write_logs(path, log, n, sites):
+    """The same events twice: one flat file (the old layout) and the segmented log."""
+    t0 = datetime(2024, 1, 1)
+    batch = {}
+    with open(path, "w") as f:
+        for i in range(n):
+            ev = SecurityEvent(timestamp=t0 + timedelta(seconds=i), page_url=f"https://site{i % sites}.example.com/p/{i}",
+                               https=True, num_links=i % 50, num_forms=i % 3, has_login_form=i % 7 == 0,
+                               headers={"server": "nginx", "content-type": "text/html"})
+            line = data_service._log_line(ev, f"crawl-{i // 1000}")
+            f.write(line)
+            batch.setdefault(site_key(ev.page_url), []).append(line)
+    for site, lines in batch.items():
+        for j in range(0, len(lines), 500):
+            log.append(site, lines[j:j + 500])
+
+
+def disk_bytes(root):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files
+               if ".jsonl" in f)
+
+
+def old_load_events(path):
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(SecurityEvent.model_validate_json(line))
+            except Exception:
+                continue
+    return events
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - t0, len(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, nargs="+", default=[20000, 100000])
+    ap.add_argument("--sites", type=int, default=20)
+    ap.add_argument("--limit", type=int, default=500)
+    ap.add_argument("--segment-mib", type=float, default=1, help="EVENTS_SEGMENT_BYTES for the run, MiB")
+    args = ap.parse_args()
+
+    print(f"{'read':<30} {'events':>9} {'returned':>9} {'ms':>9}")
+    for n in args.events:
+        path = data_service.DATA_DIR / f"flat-{n}.jsonl"
+        data_service.EVENTS_DIR = data_service.DATA_DIR / f"events-{n}"
+        log, _ = data_service._event_store()
+        log.segment_bytes = int(args.segment_mib * (1 << 20))
+        write_logs(path, log, n, args.sites)
+        rows = [("old: full scan", *timed(old_load_events, path)),
+                ("index build (first read)", *timed(data_service.load_events, limit=1)),
+                ("all: segments, bulk decode", *timed(data_service.load_events)),
+                (f"indexed: newest {args.limit}", *timed(data_service.load_events, limit=args.limit)),
+                ("indexed: one site", *timed(data_service.load_events, site="site3.example.com")),
+                ("stream: all segments", *timed(lambda: list(data_service.iter_events())))]
+        for name, seconds, returned in rows:
+            print(f"{name:<30} {n:>9,} {returned:>9,} {seconds * 1000:>9.1f}")
+        print(f"{'disk: flat file / segments':<30} {os.path.getsize(path) / 2**20:>8.1f}M "
+              f"{disk_bytes(data_service.EVENTS_DIR) / 2**20:>8.1f}M")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the crawl's parse stage - the old path (html.parser for the event, then
+a second parse for the links, one thread) versus crawl_engine's single lxml parse,
+inline and on a process pool of 1..N parse workers.
+
+  python services/tests/bench/bench_parse_pool.py --pages 400 --links 300 --workers 1 2 4 8
+
+Pages are synthetic HTML (N anchors, a few forms, filler text) wrapped in real
+requests.Response objects and run through data_service's event extractor, so the
+numbers are pages per second of the parse + extract stage alone (no network).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench_parse_"))
+
+import requests  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+from services import crawl_engine  # noqa: E402
+from services.data_service import _EventExtractor, _event_from_soup  # noqa: E402
+
+BASE = "https://bench.example.com/"
+
+
+def synthetic_page(n_links):
+    parts = ["<html><head><title>Bench page</title><meta name='description' content='synthetic'></head><body>"]
+    for i in range(n_links):
+        parts.append(f"<div class='row'><p>Item {i} lorem ipsum dolor sit amet</p>"
+                     f"<a href='/page/{i}?ref=nav'>link {i}</a></div>")
+        if i % 100 == 0:
+            parts.append(f"<form action='/login/{i}' method='post'><input name='user'>"
+                         "<input type='password' name='pw'></form>")
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def response(url, body):
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r.headers["Content-Type"] = "text/html; charset=utf-8"
+    r._content = body
+    r._content_consumed = True
+    r.body_bytes, r.truncated = len(body), False
+    return r
+
+
+def old_path(pages):
+    """What data_service did before: html.parser for the event, a second parse for links."""
+    for url, r in pages:
+        _event_from_soup(url, r, BeautifulSoup(r.text, "html.parser"))
+        [a["href"] for a in BeautifulSoup(r.text, "html.parser").find_all("a", href=True)]
+
+
+def inline(pages, extractor, parser):
+    for url, r in pages:
+        crawl_engine._extract(extractor, url, r, parser)
+
+
+def pooled(pages, extractor, parser, workers):
+    with crawl_engine.parse_pool(workers) as pool:
+        # warm the pool up: spawning and importing are not parse time
+        wait([pool.submit(crawl_engine._extract_remote, extractor, *pages[0], len(pages[0][1].content), False, parser)
+              for _ in range(workers)])
+        t0 = time.perf_counter()
+        futures = [pool.submit(crawl_engine._extract_remote, extractor, url, r, len(r.content), False, parser)
+                   for url, r in pages]
+        for f in futures:
+            f.result()
+        return time.perf_counter() - t0
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=400)
+    ap.add_argument("--links", type=int, default=300, help="anchors per page")
+    ap.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    ap.add_argument("--parser", default=crawl_engine.PARSER)
+    args = ap.parse_args()
+
+    body = synthetic_page(args.links)
+    pages = [(f"{BASE}p/{i}", response(f"{BASE}p/{i}", body)) for i in range(args.pages)]
+    extractor = _EventExtractor()
+    print(f"{args.pages} pages of {len(body) / 1024:.0f} KiB, {args.links} links each, {os.cpu_count()} cores")
+    print(f"{'stage':<34} {'pages/s':>9}")
+    rows = [("old: html.parser x2, one thread", timed(old_path, pages)),
+            (f"{args.parser} once, inline", timed(inline, pages, extractor, args.parser))]
+    for n in args.workers:
+        rows.append((f"{args.parser} once, {n} parse worker(s)", pooled(pages, extractor, args.parser, n)))
+    for name, seconds in rows:
+        print(f"{name:<34} {args.pages / seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
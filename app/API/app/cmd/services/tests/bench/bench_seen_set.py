@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the crawl frontier's seen set - a plain set of canonical URLs (exact)
+versus 64-bit fingerprints in an array (fingerprint) and a Bloom filter (bloom).
+
+  python services/tests/bench/bench_seen_set.py --sizes 1000000 10000000 --fp-rate 0.001
+
+URLs are synthetic canonical URLs spread over a few hosts. For each structure and
+size it reports the time to add N URLs, lookups per second, the structure's own
+size (what the crawl reports as seen_bytes), bytes per URL and the false-positive
+rate measured on URLs never added. --trace adds a second, traced build for the
+peak Python memory (slow: tracemalloc overhead, so build time comes from the first).
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from services.crawl_frontier import new_seen  # noqa: E402
+
+KINDS = ("exact", "fingerprint", "bloom")
+
+
+def url(i, prefix="p"):
+    return f"https://site{i % 17}.example.com/catalog/{prefix}/{i}?page={i % 97}&sort=name"
+
+
+def build(kind, n, fp_rate):
+    seen = new_seen(kind, capacity=n, fp_rate=fp_rate)
+    for i in range(n):
+        seen.add(url(i))
+    return seen
+
+
+def traced_peak(kind, n, fp_rate):
+    tracemalloc.start()
+    seen = build(kind, n, fp_rate)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del seen
+    return peak
+
+
+def run(kind, n, fp_rate, probes, trace):
+    t0 = time.perf_counter()
+    seen = build(kind, n, fp_rate)
+    build_s = time.perf_counter() - t0
+
+    step = max(1, n // probes)
+    t0 = time.perf_counter()
+    hits = sum(url(i) in seen for i in range(0, n, step))
+    misses = sum(url(i, "q") in seen for i in range(probes))
+    lookup = time.perf_counter() - t0
+    assert hits == len(range(0, n, step)), f"{kind} lost URLs"
+    return {
+        "kind": kind,
+        "n": n,
+        "build_s": build_s,
+        "lookups_per_s": (len(range(0, n, step)) + probes) / lookup,
+        "seen_mb": seen.nbytes() / 1e6,
+        "peak_mb": traced_peak(kind, n, fp_rate) / 1e6 if trace else None,
+        "bytes_per_url": seen.nbytes() / n,
+        "fp_rate": misses / probes,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    ap.add_argument("--fp-rate", type=float, default=0.001)
+    ap.add_argument("--probes", type=int, default=200_000, help="lookups of absent URLs per run")
+    ap.add_argument("--trace", action="store_true", help="also measure peak traced memory")
+    args = ap.parse_args()
+
+    print(f"{'kind':<12} {'urls':>11} {'build s':>9} {'lookups/s':>11} {'seen MB':>9} {'peak MB':>9} "
+          f"{'B/url':>7} {'fp rate':>9}")
+    for n in args.sizes:
+        for kind in args.kinds:
+            r = run(kind, n, args.fp_rate, args.probes, args.trace)
+            peak = f"{r['peak_mb']:>9.1f}" if r["peak_mb"] is not None else f"{'-':>9}"
+            print(f"{r['kind']:<12} {r['n']:>11,} {r['build_s']:>9.2f} {r['lookups_per_s']:>11,.0f} "
+                  f"{r['seen_mb']:>9.1f} {peak} {r['bytes_per_url']:>7.1f} {r['fp_rate']:>9.5f}")
+
+
+if __name__ == "__main__":
+    main()
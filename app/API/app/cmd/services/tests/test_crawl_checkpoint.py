@@ -0,0 +1,78 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl checkpoints and resume
+# ===============================
+import json
+
+import pytest
+from app.services import crawl_engine, data_service
+from app.services.crawl_checkpoint import CrawlCheckpoint
+
+SITE = "https://example.com/"
+HTML = {"Content-Type": "text/html"}
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-crawl."""
+
+def _site(requests_mock, crash_on=None):
+    requests_mock.get(SITE, text="<a href='/a'>a</a><a href='/b'>b</a>", headers=HTML)
+    requests_mock.get(SITE + "b", text="<a href='/c'>c</a>", headers=HTML)
+    requests_mock.get(SITE + "c", text="end", headers=HTML)
+    if crash_on:
+        requests_mock.get(SITE + crash_on, exc=Crash)
+    else:
+        requests_mock.get(SITE + "a", text="<a href='/'>home</a>", headers=HTML)
+
+def _fetches(requests_mock, url):
+    return sum(1 for r in requests_mock.request_history if r.url == url)
+
+def test_resume_skips_journaled_pages(requests_mock, tmp_path):
+    _site(requests_mock, crash_on="a")
+    with pytest.raises(Crash):
+        crawl_engine.crawl(SITE, max_pages=10, concurrency=1, crawl_id="c1", checkpoint_dir=tmp_path)
+    state = json.loads((tmp_path / "c1.state.json").read_text())
+    assert state["status"] == "running" and state["start_url"] == SITE
+
+    requests_mock.reset_mock()
+    _site(requests_mock)
+    pages = crawl_engine.crawl("https://ignored.example/", max_pages=10, concurrency=1,
+                               crawl_id="c1", checkpoint_dir=tmp_path)
+    assert [p["url"] for p in pages] == [SITE, SITE + "a", SITE + "b", SITE + "c"]
+    assert pages.stats["resumed"] is True and pages.stats["pages_replayed"] == 1
+    assert _fetches(requests_mock, SITE) == 0
+    assert list(tmp_path.iterdir()) == []  # finished: the checkpoint is gone
+
+def test_completed_crawl_leaves_no_checkpoint(requests_mock, tmp_path):
+    _site(requests_mock)
+    pages = crawl_engine.crawl(SITE, max_pages=10, concurrency=1, crawl_id="c2", checkpoint_dir=tmp_path)
+    assert len(pages) == 4
+    assert list(tmp_path.iterdir()) == []
+
+def test_torn_journal_line_is_dropped(tmp_path):
+    ckpt = CrawlCheckpoint("torn", tmp_path)
+    ckpt.snapshot({"start_url": SITE, "status": "running", "frontier": {}})
+    ckpt.append({"order": 0, "url": SITE, "added": [], "record": None})
+    ckpt.close()
+    with open(tmp_path / "torn.journal.jsonl", "a") as f:
+        f.write('{"order": 1, "ur')
+    assert [e["order"] for e in CrawlCheckpoint("torn", tmp_path).load()["entries"]] == [0]
+    assert (tmp_path / "torn.journal.jsonl").read_text().endswith("}\n")
+
+def test_invalid_crawl_id_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CrawlCheckpoint("../escape", tmp_path)
+
+def test_data_service_resume_writes_each_event_once(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    monkeypatch.setattr(data_service, "get_target_site", lambda: SITE)
+    monkeypatch.setattr(data_service, "CRAWLS_DIR", tmp_path / "crawls")
+    _site(requests_mock, crash_on="b")
+    with pytest.raises(Crash):
+        data_service.crawl_site(max_pages=10, crawl_id="resume-me")
+
+    requests_mock.reset_mock()
+    _site(requests_mock)
+    events = data_service.crawl_site(max_pages=10, crawl_id="resume-me")
+    assert events.stats["crawl_id"] == "resume-me"
+    logged = [json.loads(l)["page_url"] for l in data_service._event_store()[0].lines()]
+    assert sorted(logged) == sorted(str(e.page_url) for e in events) == [SITE, SITE + "a", SITE + "b", SITE + "c"]
+    assert list((tmp_path / "crawls").iterdir()) == []
@@ -0,0 +1,108 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl_engine.py
+# ===============================
+import sys
+import time
+
+import requests
+
+from app.services import crawl_engine, data_service
+
+SITE = "https://example.com/"
+
+def _site(requests_mock):
+    requests_mock.get(SITE, text="<a href='/a'>a</a><a href='/b#top'>b</a><a href='https://other.com/'>x</a>",
+                      headers={"Content-Type": "text/html"})
+    requests_mock.get(SITE + "a", text="<a href='/'>home</a><a href='/b'>b</a><form><input type='password'></form>",
+                      headers={"Content-Type": "text/html"})
+    requests_mock.get(SITE + "b", status_code=404, text="gone", headers={"Content-Type": "text/html"})
+
+def test_page_stats_in_discovery_order(requests_mock):
+    _site(requests_mock)
+    requests_mock.get(SITE, text="<a href='/a'>a</a><a href='/a/'>a</a><a href='/b#top'>b</a>",
+                      headers={"Content-Type": "text/html"})
+    pages = crawl_engine.crawl(SITE, max_pages=10)
+    assert [p["url"] for p in pages] == [SITE, SITE + "a", SITE + "b"]
+    assert pages[2] == {"url": SITE + "b", "status": 404, "bytes": 4}
+    # only "/a/" is a saving: "/" and "/b" linked again from /a are the same strings
+    # ("/b#top" is fetched as "/b"), which a crawler without canonical keys skips too
+    assert pages.stats["duplicates_avoided"] == 1
+
+def test_seen_set_is_reported_per_crawl(requests_mock):
+    _site(requests_mock)
+    exact = crawl_engine.crawl(SITE, max_pages=10)
+    compact = crawl_engine.crawl(SITE, max_pages=10, seen="bloom", seen_fp_rate=0.001)
+    assert [p["url"] for p in compact] == [p["url"] for p in exact]
+    assert exact.stats["seen_kind"] == "exact" and exact.stats["seen_entries"] == 3
+    assert compact.stats["seen_kind"] == "bloom" and compact.stats["seen_bytes"] > 0
+
+def test_max_pages_and_other_hosts(requests_mock):
+    _site(requests_mock)
+    assert len(crawl_engine.crawl(SITE, max_pages=2)) == 2
+    urls = [p["url"] for p in crawl_engine.crawl(SITE, max_pages=10, same_host=False)]
+    assert "https://other.com/" in urls
+
+def test_custom_extractor_and_errors(requests_mock):
+    _site(requests_mock)
+
+    class Titles(crawl_engine.Extractor):
+        def page(self, url, response, soup):
+            response.raise_for_status()
+            return url
+
+        def error(self, url, exc):
+            return "error:" + url
+
+    assert crawl_engine.crawl(SITE, Titles(), max_pages=10) == [SITE, SITE + "a", "error:" + SITE + "b"]
+
+def test_host_rate_limits_pages(requests_mock):
+    _site(requests_mock)
+    t0 = time.monotonic()
+    crawl_engine.crawl(SITE, max_pages=3, host_rate=10, host_burst=1)
+    assert time.monotonic() - t0 >= 0.18
+
+def test_data_service_crawl_site_uses_engine(requests_mock, monkeypatch, tmp_path):
+    _site(requests_mock)
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    monkeypatch.setattr(data_service, "CRAWLS_DIR", tmp_path / "crawls")
+    monkeypatch.setattr(data_service, "get_target_site", lambda: SITE)
+    events = data_service.crawl_site(max_pages=10)
+    assert [str(e.page_url) for e in events] == [SITE, SITE + "a", SITE + "b"]
+    assert events[1].has_login_form is True
+    assert events[2].note.startswith("error: HTTPError")
+    assert len(list(data_service._event_store()[0].lines())) == 3
+
+def test_fetch_keeps_html_and_only_counts_the_rest(requests_mock):
+    requests_mock.get(SITE + "big.zip", content=b"\0" * 300_000,
+                      headers={"Content-Type": "application/zip", "Content-Length": "300000"})
+    requests_mock.get(SITE + "blob", content=b"\0" * 300_000, headers={"Content-Type": "application/octet-stream"})
+    requests_mock.get(SITE + "long", text="<p>" + "x" * 300_000 + "</p>", headers={"Content-Type": "text/html"})
+    with requests.Session() as s:
+        z = crawl_engine.fetch(s, SITE + "big.zip", timeout=5)
+        assert z.content == b"" and z.body_bytes == 300_000 and not z.truncated
+        b = crawl_engine.fetch(s, SITE + "blob", timeout=5, max_body=100_000)
+        assert b.content == b"" and b.truncated and 100_000 < b.body_bytes < 300_000
+        h = crawl_engine.fetch(s, SITE + "long", timeout=5, max_body=100_000)
+        assert len(h.content) == 100_000 and h.truncated and h.content.startswith(b"<p>xxx")
+
+def test_crawl_does_not_buffer_downloads(requests_mock):
+    requests_mock.get(SITE, text="<a href='/file.iso'>iso</a>", headers={"Content-Type": "text/html"})
+    requests_mock.get(SITE + "file.iso", content=b"\0" * 10, headers={"Content-Type": "application/x-iso9660-image",
+                                                                      "Content-Length": "4700000000"})
+    pages = crawl_engine.crawl(SITE, max_pages=5, robots=False, sitemaps=False)
+    assert pages[1] == {"url": SITE + "file.iso", "status": 200, "bytes": 4_700_000_000}
+
+def test_parse_stage_on_a_process_pool(requests_mock, monkeypatch, tmp_path):
+    _site(requests_mock)
+    inline = crawl_engine.crawl(SITE, max_pages=10)
+    pooled = crawl_engine.crawl(SITE, max_pages=10, parse_workers=2)
+    assert list(pooled) == list(inline) and pooled.stats["parse_workers"] == 2
+
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    monkeypatch.setattr(data_service, "CRAWLS_DIR", tmp_path / "crawls")
+    monkeypatch.setattr(data_service, "get_target_site", lambda: SITE)
+    # data_service may hold its own import of the engine (services.* vs app.services.*)
+    monkeypatch.setattr(sys.modules[data_service.crawl_pages.__module__], "PARSE_WORKERS", 2)
+    events = data_service.crawl_site(max_pages=10)
+    assert events.stats["parse_workers"] == 2
+    assert events[1].has_login_form is True and events[1].num_links == 2
@@ -0,0 +1,74 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl_frontier.py
+# ===============================
+import pytest
+from app.services.crawl_frontier import BloomSeen, FingerprintSeen, Frontier, canonicalize, new_seen, seen_from_state
+
+@pytest.mark.parametrize("a, b", [
+    ("HTTP://Example.COM:80/a", "http://example.com/a"),
+    ("https://example.com:443", "https://example.com/"),
+    ("https://example.com/a/./b/../c", "https://example.com/a/c"),
+    ("https://example.com/%7euser/%2f", "https://example.com/~user/%2F"),
+    ("https://example.com/a?b=2&a=1#frag", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a/?utm_source=x&id=7&gclid=y", "https://example.com/a?id=7"),
+])
+def test_canonicalize_equivalent_urls(a, b):
+    assert canonicalize(a) == canonicalize(b)
+
+def test_canonicalize_keeps_meaningful_differences():
+    assert canonicalize("https://example.com/a?id=1") != canonicalize("https://example.com/a?id=2")
+    assert canonicalize("https://example.com:8443/") != canonicalize("https://example.com/")
+    assert canonicalize("https://example.com/a/", ignore_trailing_slash=False) != canonicalize("https://example.com/a")
+    assert canonicalize("https://example.com/?page=2", strip_params=["page"]) == "https://example.com/"
+
+def test_frontier_is_fifo_and_counts_duplicates():
+    f = Frontier(max_pages=3)
+    assert f.add("https://example.com/")
+    assert not f.add("https://EXAMPLE.com:443/#top")
+    assert not f.add("https://EXAMPLE.com:443/#top")  # the same spelling again: not a saving
+    assert not f.add("https://example.com/")  # the admitted spelling: not a saving either
+    assert f.add("https://example.com/a?utm_medium=mail")
+    assert not f.add("https://example.com/a/")
+    assert f.add("https://example.com/b")
+    assert not f.add("https://example.com/c")
+    assert f.pop() == (0, "https://example.com/")
+    assert f.pop() == (1, "https://example.com/a?utm_medium=mail")
+    assert len(f) == 1 and "https://example.com/b/" in f
+    assert f.stats() == {"pages_admitted": 3, "duplicates_avoided": 2, "links_over_limit": 1}
+
+@pytest.mark.parametrize("kind", ["exact", "fingerprint", "bloom"])
+def test_frontier_with_each_seen_set(kind):
+    f = Frontier(max_pages=10, seen=kind)
+    assert f.add("https://example.com/a")
+    assert not f.add("https://example.com/a/#x")
+    assert "https://example.com/a" in f and "https://example.com/b" not in f
+    memory = f.memory()
+    assert memory["seen_kind"] == kind and memory["seen_entries"] == 1 and memory["seen_bytes"] > 0
+    again = Frontier.from_state(f.to_state())
+    assert again.memory()["seen_kind"] == kind
+    assert not again.add("https://example.com/a") and again.add("https://example.com/b")
+    assert not again.add("https://example.com/a/#x") and again.stats()["duplicates_avoided"] == 1
+
+def test_fingerprint_seen_grows_and_round_trips():
+    seen = FingerprintSeen()
+    keys = [f"https://example.com/p/{i}" for i in range(5000)]
+    for k in keys:
+        seen.add(k)
+        seen.add(k)
+    assert len(seen) == 5000 and all(k in seen for k in keys)
+    assert "https://example.com/p/5000" not in seen
+    restored = seen_from_state(seen.to_state())
+    assert len(restored) == 5000 and keys[1234] in restored
+
+def test_bloom_seen_stays_near_its_false_positive_rate():
+    seen = BloomSeen(capacity=2000, fp_rate=0.01)
+    for i in range(8000):  # four times the capacity: extra layers keep the rate bounded
+        seen.add(f"https://example.com/p/{i}")
+    assert all(f"https://example.com/p/{i}" in seen for i in range(8000))
+    false_positives = sum(f"https://example.com/q/{i}" in seen for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert seen.nbytes() < 8000 * 4
+
+def test_unknown_seen_set():
+    with pytest.raises(ValueError):
+        new_seen("trie")
@@ -0,0 +1,69 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl_rate.py (adaptive per-host rate)
+# ===============================
+from email.utils import formatdate
+
+from app.services import crawl_engine
+from app.services.crawl_rate import AimdRate, retry_after_seconds
+
+SITE = "https://example.com/"
+HTML = {"Content-Type": "text/html"}
+
+class Bucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.held = None
+
+    def hold(self, seconds):
+        self.held = seconds
+
+def test_retry_after_forms():
+    assert retry_after_seconds("7") == 7.0
+    assert 25 <= retry_after_seconds(formatdate(1_000_030, usegmt=True), now=1_000_000) <= 30
+    assert retry_after_seconds("soon") is None and retry_after_seconds(None) is None
+
+def test_additive_increase_while_latency_holds():
+    bucket = Bucket(2.0)
+    control = AimdRate(bucket, floor=0.25, ceiling=3, step=0.5)
+    for _ in range(2):
+        control.success(0.05)
+    assert bucket.rate == 2.5
+    for _ in range(10):
+        control.success(0.05)
+    assert bucket.rate == 3  # ceiling
+    assert control.as_dict()["peak"] == 3 and control.backoffs == 0
+
+def test_multiplicative_decrease_once_per_cooldown():
+    bucket = Bucket(8.0)
+    control = AimdRate(bucket, floor=0.25, ceiling=32)
+    control.backoff("429", retry_after=5)
+    control.backoff("429")  # same burst: no second halving
+    assert bucket.rate == 4.0 and bucket.held == 5
+    assert control.events == [{"at": control.events[0]["at"], "reason": "429", "rate": 4.0, "retry_after": 5}]
+
+def test_rising_latency_backs_off():
+    bucket = Bucket(4.0)
+    control = AimdRate(bucket, floor=0.25, ceiling=32)
+    for latency in (0.05, 0.05, 0.9, 0.9):
+        control.success(latency)
+    assert bucket.rate < 4.0
+    assert [e["reason"] for e in control.events] == ["latency"]
+
+def test_engine_retries_429_and_records_backoff(requests_mock):
+    requests_mock.get(SITE, [
+        {"status_code": 429, "headers": {"Retry-After": "0"}, "text": "slow down"},
+        {"status_code": 200, "headers": HTML, "text": "<a href='/a'>a</a>"},
+    ])
+    requests_mock.get(SITE + "a", text="<p>a</p>", headers=HTML)
+    pages = crawl_engine.crawl(SITE, max_pages=5, host_rate=50, robots=False, sitemaps=False)
+    assert [(p["url"], p["status"]) for p in pages] == [(SITE, 200), (SITE + "a", 200)]
+    assert pages.stats["retries"] == 1
+    rate = pages.stats["rate"]["example.com"]
+    assert rate["backoffs"] == 1 and rate["events"][0]["reason"] == "429"
+    assert rate["rate"] < rate["initial"]
+
+def test_fixed_rate_when_not_adaptive(requests_mock):
+    requests_mock.get(SITE, status_code=503, text="busy", headers=HTML)
+    pages = crawl_engine.crawl(SITE, max_pages=5, adaptive=False, robots=False, sitemaps=False)
+    assert pages[0]["status"] == 503 and "rate" not in pages.stats
+    assert len(requests_mock.request_history) == 1
@@ -0,0 +1,105 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl_seeds.py (robots.txt and sitemaps)
+# ===============================
+import gzip
+import time
+
+import requests
+
+from app.services import crawl_engine, crawl_seeds
+from app.services.crawl_seeds import Robots, sitemap_urls
+
+SITE = "https://example.com/"
+HTML = {"Content-Type": "text/html"}
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+def _urlset(*paths):
+    return f"<?xml version='1.0'?><urlset {NS}>" + "".join(f"<url><loc>{SITE}{p}</loc></url>" for p in paths) + "</urlset>"
+
+def _site(requests_mock, robots):
+    requests_mock.get(SITE + "robots.txt", text=robots)
+    requests_mock.get(SITE + "sitemap_index.xml", text=(
+        f"<sitemapindex {NS}><sitemap><loc>{SITE}pages.xml.gz</loc></sitemap>"
+        f"<sitemap><loc>{SITE}more.xml</loc></sitemap></sitemapindex>"))
+    requests_mock.get(SITE + "pages.xml.gz", content=gzip.compress(_urlset("orphan", "private/x").encode()))
+    requests_mock.get(SITE + "more.xml", text=_urlset("deep?utm_source=feed", "orphan"))
+    requests_mock.get(SITE + "sitemap.xml", status_code=404)
+    requests_mock.get(SITE, text="<a href='/a'>a</a><a href='/private/y'>y</a>", headers=HTML)
+    for path in ("a", "orphan", "deep", "private/x", "private/y"):
+        requests_mock.get(SITE + path, text="<p>page</p>", headers=HTML)
+
+ROBOTS = f"User-agent: *\nDisallow: /private/\nSitemap: {SITE}sitemap_index.xml\n"
+
+def test_robots_rules():
+    rules = Robots("https://example.com", "SEA-SEQ/1.0", ROBOTS.splitlines() + ["Crawl-delay: 2"])
+    assert rules.allowed(SITE + "a") and not rules.allowed(SITE + "private/x")
+    assert rules.crawl_delay == 2.0
+    assert rules.sitemaps == [SITE + "sitemap_index.xml"]
+
+def test_sitemap_index_and_gzip_are_streamed(requests_mock):
+    _site(requests_mock, ROBOTS)
+    with requests.Session() as s:
+        urls = list(sitemap_urls(s, [SITE + "sitemap_index.xml"], timeout=5))
+    assert urls == [SITE + "orphan", SITE + "private/x", SITE + "deep?utm_source=feed", SITE + "orphan"]
+
+def test_sitemap_is_capped_in_bytes_and_urls(requests_mock, monkeypatch):
+    # 2 MB of padding before the first <url>: a few KB on the wire
+    bomb = gzip.compress(f"<urlset {NS}>".encode() + b" " * 2_000_000 + f"<url><loc>{SITE}a</loc></url></urlset>".encode())
+    requests_mock.get(SITE + "bomb.xml.gz", content=bomb)
+    requests_mock.get(SITE + "long.xml", text=_urlset(*(f"p{i}" for i in range(10))))
+    monkeypatch.setattr(crawl_seeds, "MAX_SITEMAP_BYTES", 100_000)
+    monkeypatch.setattr(crawl_seeds, "MAX_SITEMAP_URLS", 4)
+    with requests.Session() as s:
+        assert list(sitemap_urls(s, [SITE + "bomb.xml.gz"], timeout=5)) == []  # cut off before its first <url>
+        assert list(sitemap_urls(s, [SITE + "long.xml"], timeout=5)) == [SITE + f"p{i}" for i in range(4)]
+
+def test_parsed_entries_leave_the_tree(requests_mock, monkeypatch):
+    requests_mock.get(SITE + "big.xml", text=_urlset(*(f"p{i}" for i in range(500))))
+    roots = []
+    iterparse = crawl_seeds.ET.iterparse
+
+    def spy(source, events):
+        for event, elem in iterparse(source, events=events):
+            if not roots:
+                roots.append(elem)
+            yield event, elem
+    monkeypatch.setattr(crawl_seeds.ET, "iterparse", spy)
+    with requests.Session() as s:
+        assert len(list(sitemap_urls(s, [SITE + "big.xml"], timeout=5))) == 500
+    assert len(roots[0]) == 0
+
+def test_sitemaps_seed_the_frontier_and_robots_is_honoured(requests_mock):
+    _site(requests_mock, ROBOTS)
+    pages = crawl_engine.crawl(SITE, max_pages=20)
+    urls = [p["url"] for p in pages]
+    # unlinked sitemap pages are found; /private/ is never fetched
+    assert urls == [SITE, SITE + "orphan", SITE + "deep?utm_source=feed", SITE + "a"]
+    assert not any("private" in r.url for r in requests_mock.request_history)
+    assert pages.stats["sitemap_urls"] == 2
+    assert pages.stats["robots_disallowed"] == 2
+
+def test_robots_can_be_switched_off(requests_mock):
+    _site(requests_mock, ROBOTS)
+    urls = [p["url"] for p in crawl_engine.crawl(SITE, max_pages=20, robots=False, sitemaps=False)]
+    assert urls == [SITE, SITE + "a", SITE + "private/y"]
+
+def test_crawl_delay_slows_the_host(requests_mock):
+    _site(requests_mock, "User-agent: *\nCrawl-delay: 1\n")
+    t0 = time.monotonic()
+    pages = crawl_engine.crawl(SITE, max_pages=2, host_rate=100, host_burst=10)
+    assert time.monotonic() - t0 >= 0.9
+    assert pages.stats["crawl_delay"] == {"example.com": 1.0}
+
+def test_forbidden_robots_disallows_everything(requests_mock):
+    _site(requests_mock, ROBOTS)
+    requests_mock.get(SITE + "robots.txt", status_code=403)
+    pages = crawl_engine.crawl(SITE, max_pages=20, sitemaps=False)
+    assert list(pages) == [] and pages.stats["robots_disallowed"] == 1
+
+def test_disallowed_pages_are_counted_once(requests_mock):
+    requests_mock.get(SITE + "robots.txt", text="User-agent: *\nDisallow: /private/\n")
+    requests_mock.get(SITE, text="<a href='/a'>a</a><a href='/private/y'>y</a>", headers=HTML)
+    requests_mock.get(SITE + "a", text="<a href='/private/y'>y</a><a href='/private/y#top'>y</a>", headers=HTML)
+    pages = crawl_engine.crawl(SITE, max_pages=20, sitemaps=False)
+    assert [p["url"] for p in pages] == [SITE, SITE + "a"]
+    assert pages.stats["robots_disallowed"] == 1  # one page, linked three times
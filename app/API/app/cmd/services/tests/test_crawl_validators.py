@@ -0,0 +1,75 @@
+# ===============================
+# Chapter 1: Unit Tests for crawl_validators.py (incremental crawls)
+# ===============================
+from app.services import crawl_engine, data_service
+from app.services.crawl_validators import ValidatorStore
+
+SITE = "https://example.com/"
+HTML = {"Content-Type": "text/html"}
+
+def _etag_site(requests_mock, bodies):
+    """Home answers 304 to a matching If-None-Match; /a and /b carry no validators."""
+    def home(request, context):
+        context.headers.update(HTML)
+        context.headers["ETag"] = '"v1"'
+        if request.headers.get("If-None-Match") == '"v1"':
+            context.status_code = 304
+            return ""
+        return "<a href='/a'>a</a><a href='/b'>b</a>"
+    requests_mock.get(SITE, text=home)
+    requests_mock.get(SITE + "a", text=lambda request, context: bodies["a"], headers=HTML)
+    requests_mock.get(SITE + "b", text=lambda request, context: bodies["b"], headers=HTML)
+
+def test_store_round_trip(tmp_path):
+    store = ValidatorStore(tmp_path / "v.sqlite3", scope="pages")
+    assert store.get(SITE) is None
+    store.put(SITE, '"v1"', None, "abc", {"url": SITE}, ["/a"])
+    store.touch(SITE, last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    got = store.get(SITE)
+    assert got == {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "hash": "abc",
+                   "record": {"url": SITE}, "links": ["/a"]}
+    assert ValidatorStore(tmp_path / "v.sqlite3", scope="other").get(SITE) is None
+
+def test_second_crawl_skips_unchanged_pages(requests_mock, tmp_path):
+    bodies = {"a": "<p>one</p>", "b": "<p>two</p>"}
+    _etag_site(requests_mock, bodies)
+    store = ValidatorStore(tmp_path / "v.sqlite3")
+    first = crawl_engine.crawl(SITE, max_pages=10, validators=store)
+    assert first.stats["pages_changed"] == 3
+
+    bodies["b"] = "<p>two, edited</p>"
+    seen = []
+    second = crawl_engine.crawl(SITE, max_pages=10, validators=store, on_record=seen.append)
+    # home is a 304 but its stored links still lead to /a and /b
+    assert [p["url"] for p in second] == [SITE, SITE + "a", SITE + "b"]
+    assert second[0] == first[0]
+    assert second.stats["pages_not_modified"] == 1
+    assert second.stats["pages_same_hash"] == 1
+    assert second.stats["pages_changed"] == 1
+    assert [p["url"] for p in seen] == [SITE + "b"]
+    home = [r for r in requests_mock.request_history if r.url == SITE]
+    assert home[1].headers["If-None-Match"] == '"v1"'
+
+def test_changed_page_is_parsed_again(requests_mock, tmp_path):
+    bodies = {"a": "<p>one</p>", "b": "<p>two</p>"}
+    _etag_site(requests_mock, bodies)
+    store = ValidatorStore(tmp_path / "v.sqlite3")
+    crawl_engine.crawl(SITE, max_pages=10, validators=store)
+    bodies["a"] = "<a href='/c'>c</a>"
+    requests_mock.get(SITE + "c", text="<p>new</p>", headers=HTML)
+    pages = crawl_engine.crawl(SITE, max_pages=10, validators=store)
+    assert [p["url"] for p in pages] == [SITE, SITE + "a", SITE + "b", SITE + "c"]
+    assert store.get(SITE + "a")["links"] == ["/c"]
+
+def test_data_service_incremental_carries_events_forward(requests_mock, monkeypatch, tmp_path):
+    bodies = {"a": "<p>one</p>", "b": "<p>two</p>"}
+    _etag_site(requests_mock, bodies)
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    monkeypatch.setattr(data_service, "CRAWLS_DIR", tmp_path / "crawls")
+    monkeypatch.setattr(data_service, "VALIDATORS_PATH", tmp_path / "v.sqlite3")
+    monkeypatch.setattr(data_service, "get_target_site", lambda: SITE)
+    first = data_service.crawl_site(max_pages=10, incremental=True)
+    second = data_service.crawl_site(max_pages=10, incremental=True)
+    assert [e.model_dump() for e in second] == [e.model_dump() for e in first]
+    assert second.stats["pages_changed"] == 0
+    assert len(list(data_service._event_store()[0].lines())) == 3
@@ -0,0 +1,148 @@
+# ===============================
+# Chapter 1: Unit Tests for event_store.py (segmented, indexed events log)
+# ===============================
+import json
+import os
+from datetime import datetime
+
+from app.services import data_service
+from app.services.event_store import EventIndex, EventLog, site_key
+
+def _line(url, ts, crawl_id=None, **extra):
+    return json.dumps({"timestamp": ts, "page_url": url, "https": True, "num_links": 1, "num_forms": 0,
+                       "has_login_form": False, "headers": {}, "crawl_id": crawl_id, **extra}) + "\n"
+
+def _urls(lines):
+    return [json.loads(l)["page_url"] for l in lines]
+
+def test_site_key():
+    assert site_key("https://Example.com:8443/a?b=1") == site_key("example.com") == "example.com"
+
+def test_segments_rotate_by_size_and_compress(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=500)
+    for i in range(12):
+        log.append("https://a.com/", _line(f"https://a.com/{i}", f"2024-01-01T00:00:{i:02d}"))
+    log.append("b.com", _line("https://b.com/", "2024-01-02T00:00:00"))
+    files = sorted(os.listdir(tmp_path / "a.com"))
+    assert [f for f in files if f.endswith(".jsonl")] == [files[-1]]  # one active segment
+    assert len([f for f in files if f.endswith(".jsonl.gz")]) >= 2
+    assert _urls(log.lines("a.com")) == [f"https://a.com/{i}" for i in range(12)]
+    assert log.sites() == ["a.com", "b.com"] and len(list(log.lines())) == 13
+
+def test_time_based_rotation(tmp_path):
+    log = EventLog(tmp_path, segment_hours=0)
+    log.append("a.com", _line("https://a.com/", "2024-01-01T00:00:00"))
+    assert log.rotate("a.com") and not log.rotate("a.com")  # nothing left to close
+    assert [f[-9:] for f in os.listdir(tmp_path / "a.com") if not f.startswith(".")] == [".jsonl.gz"]
+
+def test_compaction_keeps_newest_per_page(tmp_path):
+    log = EventLog(tmp_path)
+    log.append("a.com", [_line("https://a.com/", "2024-01-01T00:00:00"), _line("https://a.com/x", "2024-01-01T00:00:00")])
+    log.rotate("a.com", force=True)
+    log.append("a.com", [_line("https://a.com/", "2024-01-02T00:00:00"), _line("https://a.com/", "2024-01-02T00:00:00")])
+    log.rotate("a.com", force=True)
+    log.append("a.com", _line("https://a.com/", "2024-01-03T00:00:00"))  # active: never rewritten
+    stats = log.compact("a.com", keep=1)
+    assert stats["events_dropped"] == 3 and stats["segments_rewritten"] == 2
+    assert _urls(log.lines("a.com")) == ["https://a.com/x", "https://a.com/"]
+    assert log.compact("a.com", keep=1)["events_dropped"] == 0
+
+def test_compaction_keeps_every_crawl_by_default(tmp_path):
+    log = EventLog(tmp_path)
+    log.append("a.com", [_line("https://a.com/", "2024-01-01T00:00:00", "c1"),
+                         _line("https://a.com/", "2024-01-01T00:05:00", "c1"),  # re-recorded in c1
+                         _line("https://a.com/x", "2024-01-01T00:00:00", "c1"),
+                         _line("https://a.com/", "2024-01-02T00:00:00", "c2")])
+    log.rotate("a.com", force=True)
+    log.append("a.com", _line("https://a.com/x", "2024-01-01T00:00:00", "c1"))  # active: an exact repeat
+    stats = log.compact("a.com")
+    assert stats["events_dropped"] == 2 and stats["segments_rewritten"] == 1
+    assert [(json.loads(l)["page_url"], json.loads(l)["crawl_id"]) for l in log.lines("a.com")] == [
+        ("https://a.com/", "c1"), ("https://a.com/", "c2"), ("https://a.com/x", "c1")]
+    assert log.compact("a.com")["events_dropped"] == 0
+
+def test_index_follows_rotation_and_compaction(tmp_path):
+    log = EventLog(tmp_path / "events")
+    index = EventIndex(log)
+    log.append("a.com", [_line("https://a.com/", "2024-01-01T00:00:00", "c1"),
+                         _line("https://a.com/x", "2024-01-03T00:00:00", "c3"), "not json\n"])
+    log.append("b.com", _line("https://b.com/", "2024-01-02T00:00:00", "c2"))
+    assert index.count() == 3
+    assert _urls(index.read(site="https://a.com/")) == ["https://a.com/", "https://a.com/x"]
+    assert _urls(index.read(crawl_id="c2")) == ["https://b.com/"]
+    assert _urls(index.read(limit=2)) == ["https://b.com/", "https://a.com/x"]
+    assert _urls(index.read(since=datetime(2024, 1, 2), until="2024-01-03")) == ["https://b.com/"]
+
+    log.rotate("a.com", force=True)
+    log.append("a.com", _line("https://a.com/", "2024-01-04T00:00:00", "c4"))
+    assert _urls(index.read(site="a.com")) == ["https://a.com/", "https://a.com/x", "https://a.com/"]
+    log.compact("a.com", keep=1)
+    assert _urls(index.read(site="a.com")) == ["https://a.com/x", "https://a.com/"]
+    assert index.contains_many([("https://a.com/", "2024-01-01T00:00:00"), ("https://a.com/x", "2024-01-03T00:00:00")]) \
+        == {("https://a.com/x", "2024-01-03T00:00:00")}
+    log.append("a.com", _line("https://a.com/y", "2024-01-05T00:00:00", "c4"))
+    assert not index.contains("https://a.com/y", "2024-01-05T00:00:00")  # a plain lookup: not refreshed
+    index.refresh()
+    assert index.contains("https://a.com/y", "2024-01-05T00:00:00")
+
+def test_read_survives_a_compaction_between_lookup_and_read(tmp_path, monkeypatch):
+    log = EventLog(tmp_path / "events")
+    index = EventIndex(log)
+    log.append("a.com", [_line("https://a.com/", "2024-01-01T00:00:00", "c1"),
+                         _line("https://a.com/", "2024-01-01T00:00:00", "c1"),  # a repeat compaction drops
+                         _line("https://a.com/x", "2024-01-01T00:01:00", "c1")])
+    log.rotate("a.com", force=True)
+    locate, calls = index.locate, []
+
+    def locate_then_compact(**kwargs):
+        spans = locate(**kwargs)
+        if not calls:
+            log.compact("a.com")  # rewrites the segment the spans point into
+        calls.append(spans)
+        return spans
+    monkeypatch.setattr(index, "locate", locate_then_compact)
+    assert _urls(index.read(site="a.com")) == ["https://a.com/", "https://a.com/x"]
+    assert len(calls) == 2  # the stale offsets were looked up again, not read from the new file
+
+def test_lines_open_segments_under_the_shared_lock(tmp_path, monkeypatch):
+    log = EventLog(tmp_path)
+    log.append("a.com", _line("https://a.com/", "2024-01-01T00:00:00"))
+    locks = []
+    site_lock = log._site_lock
+
+    def spy(site, shared=False):
+        locks.append(shared)
+        return site_lock(site, shared)
+    monkeypatch.setattr(log, "_site_lock", spy)
+    assert _urls(log.lines("a.com")) == ["https://a.com/"] and locks == [True]
+
+def test_load_events_reads_newest_through_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    legacy = tmp_path / "events.jsonl"  # a log from before partitioning is imported once
+    legacy.write_text("".join(_line(f"https://a.com/{i}", f"2024-01-01T00:00:{i:02d}", "c1") for i in range(10)))
+    log, _ = data_service._event_store()
+    log.append("b.com", _line("https://b.com/", "2024-01-02T00:00:00", "c2"))
+    assert not legacy.exists() and (tmp_path / "events.jsonl.imported").exists()
+    newest = data_service.load_events(limit=3)
+    assert [str(e.page_url) for e in newest] == ["https://a.com/8", "https://a.com/9", "https://b.com/"]
+    assert len(data_service.load_events(site="a.com")) == 10
+    assert [str(e.page_url) for e in data_service.load_events(crawl_id="c2")] == ["https://b.com/"]
+    assert len(list(data_service.iter_events())) == 11
+
+def test_persist_missing_writes_only_new_events(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_service, "EVENTS_DIR", tmp_path / "events")
+    log, index = data_service._event_store()
+    log.append("a.com", _line("https://a.com/", "2024-01-01T00:00:00", "c1"))
+    events = data_service._decode_events([_line(u, "2024-01-01T00:00:00").encode()
+                                          for u in ("https://a.com/", "https://a.com/x", "https://a.com/x")])
+    calls = []
+    real = index.contains_many
+    monkeypatch.setattr(index, "contains_many", lambda keys: calls.append(1) or real(keys))
+    data_service._persist_missing(events, "c1")
+    assert calls == [1]  # one lookup for the batch
+    assert _urls(log.lines("a.com")) == ["https://a.com/", "https://a.com/x"]
+
+def test_bulk_decode_skips_invalid_events():
+    lines = [_line("https://a.com/", "2024-01-01T00:00:00").encode(),
+             _line("https://a.com/bad", "2024-01-01T00:00:01", num_links="many").encode()]
+    assert [str(e.page_url) for e in data_service._decode_events(lines)] == ["https://a.com/"]
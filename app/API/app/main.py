@@ -18,18 +18,21 @@ CHAPTER 3: How to Read
 from fastapi import FastAPI
 from app.services.db import migrate_once, pool
 from app.models.schemas import RunRequest
-from app.services.crawl import crawl
+from app.services.crawl import crawl_async
 from app.services.rate_guard import detect_rate_abuse
 from app.services.vuln_scan import scan_headers
 from app.services.report import save_run
+from app.utils.dns_cache import install as install_dns_cache
 
 app = FastAPI(title="SEA-SEC API")
 
 # CHAPTER 4: Startup prayers
 # V1  Run simple migrations so tables exist even on a fresh machine.
+# V2  Ask the address book once per host, not once per page (crawls connect via the DNS cache).
 @app.on_event("startup")
 def _startup():
     migrate_once()
+    install_dns_cache()
 
 # CHAPTER 5: Health check
 # V1  Quick heartbeat to see if DB and API are awake.
@@ -46,8 +49,8 @@ def health():
 # V3  Output: a small summary for the caller.
 @app.post("/run")
 async def run(req: RunRequest):
-    # Verse 1: Crawl the website starting at the requested URL.
-    pages = crawl(str(req.url))
+    # Verse 1: Crawl the website starting at the requested URL (many pages at once, gently per host).
+    pages = await crawl_async(str(req.url))
 
     # Verse 2: Prepare header objects for the simple header scan.
     pages_for_headers = [{"url": p["url"], "headers": {}} for p in pages]
@@ -0,0 +1,216 @@
+"""
+dns_cache.py
+
+Process-wide DNS cache with TTL. The scanner (app/crawler/app/dns_cache.py) and
+the API (app/API/app/cmd/utils/dns_cache.py) each ship an identical copy, because
+the scanner's image only has its own directory; change both together (the
+crawler's unit tests fail while they differ).
+
+ - resolve(host) answers from cache while fresh; concurrent lookups of the same
+   host share one resolver call (single flight); failures are cached briefly
+ - aresolve(host) is the asyncio flavour (loop.getaddrinfo), sharing the cache
+ - prefetch(hosts) warms the cache for every host of a page in parallel
+ - every address getaddrinfo returned is kept, in its order (IPv4 first); resolve()
+   answers the first, resolve_all() all of them
+ - install() routes urllib3 (and so requests) connections through the cache,
+   so keep-alive misses and new sessions stop paying resolver latency; each
+   cached address is tried in turn, and one that refuses or times out is moved
+   to the back, so a dead A record costs one failed connect, not every request
+
+getaddrinfo does not expose record TTLs, so entries live for a fixed time.
+
+Tuning (env):
+  DNS_CACHE_TTL           seconds a resolved address is reused   (default 300)
+  DNS_CACHE_NEGATIVE_TTL  seconds a failed lookup is remembered  (default 30)
+"""
+
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_TTL = float(os.environ.get("DNS_CACHE_TTL", "300"))
+DEFAULT_NEGATIVE_TTL = float(os.environ.get("DNS_CACHE_NEGATIVE_TTL", "30"))
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class DNSCache:
+    """host -> IPv4/IPv6 addresses from getaddrinfo, reused until they expire."""
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}   # host -> (tuple of ips, empty if unresolved; expires_at)
+        self._inflight = {}  # host -> Future shared by concurrent lookups
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _addresses(infos):
+        # prefer IPv4 like gethostbyname did; otherwise keep getaddrinfo's order
+        ips = []
+        for info in sorted(infos, key=lambda i: i[0] != socket.AF_INET):
+            if info[4][0] not in ips:
+                ips.append(info[4][0])
+        return ips
+
+    @classmethod
+    def _query(cls, host):
+        """Every address of host, best first."""
+        return cls._addresses(socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+
+    def _fresh(self, host):
+        # caller holds the lock
+        entry = self._entries.get(host)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def lookup(self, host):
+        """Cached address for host, or None when unknown/expired (never queries)."""
+        ips = self.lookup_all(host)
+        return ips[0] if ips else None
+
+    def lookup_all(self, host):
+        host = (host or "").lower()
+        if _is_ip(host):
+            return [host]
+        with self._lock:
+            return list(self._fresh(host) or ())
+
+    def _store(self, host, ips):
+        if isinstance(ips, str):
+            ips = [ips]
+        ips = tuple(ips or ())
+        ttl = self.ttl if ips else self.negative_ttl
+        self._entries[host] = (ips, time.monotonic() + ttl)
+
+    def resolve(self, host):
+        """Address for host (cached, single-flight) or None if it does not resolve."""
+        ips = self.resolve_all(host)
+        return ips[0] if ips else None
+
+    def resolve_all(self, host):
+        """Every address of host (cached, single-flight), best first; [] if it does not resolve."""
+        host = (host or "").lower()
+        if not host:
+            return []
+        if _is_ip(host):
+            return [host]
+        with self._lock:
+            ips = self._fresh(host)
+            if ips is not None:
+                self.hits += 1
+                return list(ips)
+            fut = self._inflight.get(host)
+            owner = fut is None
+            if owner:
+                self.misses += 1
+                fut = self._inflight[host] = Future()
+        if not owner:
+            return list(fut.result())
+        ips = ()
+        try:
+            ips = self._query(host)
+        except (OSError, UnicodeError):
+            ips = ()
+        finally:
+            with self._lock:
+                self._store(host, ips)
+                ips = self._entries[host][0]
+                del self._inflight[host]
+            fut.set_result(ips)
+        return list(ips)
+
+    def demote(self, host, ip):
+        """An address failed to connect: try the host's other addresses first from now on."""
+        host = (host or "").lower()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and ip in entry[0] and len(entry[0]) > 1:
+                ips = tuple(a for a in entry[0] if a != ip) + (ip,)
+                self._entries[host] = (ips, entry[1])
+
+    async def aresolve(self, host):
+        """asyncio variant of resolve(); shares the same cache."""
+        host = (host or "").lower()
+        cached = self.lookup(host)
+        if cached or not host:
+            return cached
+        loop = asyncio.get_running_loop()
+        try:
+            ips = self._addresses(await loop.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+        except (OSError, UnicodeError):
+            ips = ()
+        with self._lock:
+            self.misses += 1
+            self._store(host, ips)
+        return ips[0] if ips else None
+
+    def prefetch(self, hosts, workers=16):
+        """Resolve many hosts in parallel; returns {host: ip or None}."""
+        hosts = sorted({(h or "").lower() for h in hosts if h})
+        if not hosts:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(hosts)), thread_name_prefix="dns") as pool:
+            return dict(zip(hosts, pool.map(self.resolve, hosts)))
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+DNS = DNSCache()
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install(cache=DNS):
+    """
+    Make urllib3 connect via the cache. Only the address used for the TCP
+    connect changes: Host headers, SNI and certificate checks keep the name.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from urllib3.util import connection
+
+        original = connection.create_connection
+
+        def create_connection(address, *args, **kwargs):
+            host, port = address
+            ips = cache.resolve_all(host)
+            if not ips:
+                return original(address, *args, **kwargs)  # let urllib3 raise its usual error
+            error = None
+            for ip in ips:
+                try:
+                    return original((ip, port), *args, **kwargs)
+                except OSError as e:
+                    error = e
+                    cache.demote(host, ip)
+            raise error
+
+        connection.create_connection = create_connection
+        _installed = True
+
+
+def resolve_host(host):
+    return DNS.resolve(host)
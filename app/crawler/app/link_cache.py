@@ -0,0 +1,106 @@
+"""
+link_cache.py
+
+On-disk link-status cache for the link checker (SQLite, one row per URL).
+
+ - fresh entries (younger than the TTL) are served without touching the network
+ - stale entries keep their ETag / Last-Modified so the checker can revalidate
+   with If-None-Match / If-Modified-Since and accept a cheap 304
+ - the table is kept under a size bound by evicting least-recently-used rows
+
+Tuning (env):
+  LINK_CACHE_TTL          seconds a result stays fresh       (default 21600 = 6h)
+  LINK_CACHE_MAX_ENTRIES  rows kept before LRU eviction      (default 50000)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = int(os.environ.get("LINK_CACHE_TTL", "21600"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("LINK_CACHE_MAX_ENTRIES", "50000"))
+
+
+class LinkCache:
+    """URL -> last known link status, with validators for conditional revalidation."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS link_status (
+          url TEXT PRIMARY KEY,
+          status TEXT NOT NULL,
+          code INTEGER,
+          reason TEXT,
+          etag TEXT,
+          last_modified TEXT,
+          checked_at REAL NOT NULL,
+          last_used REAL NOT NULL
+        )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS link_status_last_used ON link_status(last_used)")
+
+    def get(self, url):
+        """Return the cached entry (with a `fresh` flag) or None; marks the row as recently used."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, code, reason, etag, last_modified, checked_at FROM link_status WHERE url=?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE link_status SET last_used=? WHERE url=?", (now, url))
+        status, code, reason, etag, last_modified, checked_at = row
+        return {
+            "status": status,
+            "code": code,
+            "reason": reason,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": now - checked_at < self.ttl,
+        }
+
+    def put(self, url, status, code, reason, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO link_status (url, status, code, reason, etag, last_modified, checked_at, last_used) "
+                "VALUES (?,?,?,?,?,?,?,?)",
+                (url, status, code, reason, etag, last_modified, now, now),
+            )
+
+    def refresh(self, url):
+        """A 304 confirmed the entry: restart its TTL."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE link_status SET checked_at=?, last_used=? WHERE url=?", (now, now, url))
+
+    def prune(self):
+        """Evict least-recently-used rows beyond max_entries; returns the number removed."""
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM link_status").fetchone()
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self._db.execute(
+                "DELETE FROM link_status WHERE url IN "
+                "(SELECT url FROM link_status ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            return excess
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM link_status").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,259 @@
+"""
+link_checker.py
+
+Concurrent link-check engine used by mcp_site_scanner.check_links.
+
+ - one shared requests.Session with a pooled HTTPAdapter (keep-alive connections)
+ - a bounded worker pool (ThreadPoolExecutor) so a page with hundreds of assets
+   is checked in parallel instead of one request after another; the pool lives as
+   long as the checker, so concurrent scans sharing a checker share its bound
+ - a per-host concurrency cap so a single origin is never hit by the whole pool
+ - results come back in the same order as the input links, with the same
+   status / code / reason fields the scanner has always produced
+ - when HEAD is refused (405/501) or fails, the fallback GET is streamed and closed
+   right after the headers so asset bodies are never downloaded; hosts that refuse
+   HEAD are remembered and get the streamed GET directly; each result records the
+   approximate bytes received
+ - with a DNSCache attached, each result carries the resolved ip of its host
+   (callers prefetch the page's hosts so this is a cache hit)
+ - with a LinkCache attached, fresh results are served from disk and stale ones
+   are revalidated conditionally; each result carries cache = hit | revalidated | miss.
+   Only definitive answers are cached (2xx/3xx, and 4xx other than 408/429); 5xx,
+   408 and 429 are transient and are checked again next time
+ - with a LinkMemo passed to check(), a URL is checked once for every caller sharing
+   the memo (e.g. all targets of a batch scan); repeats carry cache = batch
+
+Tuning (env):
+  LINK_CHECK_WORKERS   total in-flight checks           (default 16)
+  LINK_CHECK_PER_HOST  in-flight checks per host:port   (default 4)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = int(os.environ.get("LINK_CHECK_WORKERS", "16"))
+DEFAULT_PER_HOST = int(os.environ.get("LINK_CHECK_PER_HOST", "4"))
+TRANSIENT_CODES = (408, 429)  # 4xx that say "try again", not "broken"
+
+
+def _wire_bytes(resp):
+    """
+    Approximate bytes received for a response chain: status lines and headers of
+    every hop, plus any body actually consumed (0 for HEAD and closed streamed GETs).
+    """
+    total = 0
+    for r in list(resp.history) + [resp]:
+        total += len(str(r.reason or "")) + 15
+        total += sum(len(k) + len(v) + 4 for k, v in r.headers.items())
+        if r._content_consumed and isinstance(r._content, bytes):
+            total += len(r._content)
+    return total
+
+
+class LinkMemo:
+    """
+    URL -> result shared by the check() calls of one batch. The first caller of a
+    URL checks it; concurrent and later callers wait for and reuse that result.
+    """
+
+    def __init__(self):
+        self._results = {}  # url -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def claim(self, url):
+        """Return (future, owner); the owner must set the future's result."""
+        with self._lock:
+            fut = self._results.get(url)
+            if fut is not None:
+                self.hits += 1
+                return fut, False
+            fut = self._results[url] = Future()
+            return fut, True
+
+    def unique(self):
+        with self._lock:
+            return len(self._results)
+
+
+class LinkChecker:
+    """Checks links concurrently over pooled connections with per-host caps."""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, timeout=10, user_agent=None, cache=None, resolver=None):
+        self.cache = cache  # optional link_cache.LinkCache
+        self.resolver = resolver  # optional dns_cache.DNSCache: results then carry the host's ip
+        self.max_workers = max(1, int(max_workers))
+        self.per_host = max(1, int(per_host))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self._host_slots = {}
+        self._head_rejecters = set()  # hosts that refuse or mishandle HEAD: go straight to a streamed GET
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="linkcheck")
+            return self._pool
+
+    # per-host concurrency -------------------------------------------------
+
+    def _slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            sem = self._host_slots.get(host)
+            if sem is None:
+                sem = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    # single link ----------------------------------------------------------
+
+    def check_one(self, link):
+        if self.resolver:
+            link = {**link, "ip": self.resolver.resolve(urlparse(link["url"]).hostname)}
+        url = link["url"]
+        entry = self.cache.get(url) if self.cache else None
+        if entry and entry["fresh"]:
+            return self._from_cache(link, entry, "hit")
+        conditional = {}
+        if entry and entry["etag"]:
+            conditional["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            conditional["If-Modified-Since"] = entry["last_modified"]
+        host = urlparse(url).netloc.lower()
+        with self._slot(url):
+            try:
+                sent = 0
+                head_code = None
+                if host not in self._head_rejecters:
+                    # HEAD first
+                    r = self.session.head(url, headers=conditional, timeout=self.timeout, allow_redirects=True)
+                    sent += _wire_bytes(r)
+                    head_code = code = r.status_code
+                if head_code is None or head_code >= 400:
+                    # HEAD refused or unreliable here: GET, but stop right after the headers
+                    r = self.session.get(url, headers=conditional, timeout=self.timeout, allow_redirects=True, stream=True)
+                    r.close()
+                    sent += _wire_bytes(r)
+                    code = r.status_code
+                    if head_code in (405, 501) or (head_code is not None and code < 400):
+                        with self._lock:
+                            self._head_rejecters.add(host)
+                if code == 304 and entry:
+                    self.cache.refresh(url)
+                    return {**self._from_cache(link, entry, "revalidated"), "bytes": sent}
+                ok = 200 <= code < 400
+                status, reason = ("ok" if ok else "broken"), (None if ok else f"{code}")
+                if self.cache and (ok or (400 <= code < 500 and code not in TRANSIENT_CODES)):
+                    self.cache.put(url, status, code, reason,
+                                   etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"))
+                return {**link, "status": status, "code": code, "reason": reason,
+                        "cache": "miss" if self.cache else None, "bytes": sent}
+            except Exception as e:
+                return {**link, "status": "error", "code": None, "reason": str(e), "error": type(e).__name__, "cache": None, "bytes": 0}
+
+    def head_rejecting_hosts(self):
+        with self._lock:
+            return sorted(self._head_rejecters)
+
+    @staticmethod
+    def _from_cache(link, entry, how):
+        return {**link, "status": entry["status"], "code": entry["code"], "reason": entry["reason"], "cache": how, "bytes": 0}
+
+    # batch ----------------------------------------------------------------
+
+    def check(self, links, max_checks=200, progress=None, on_result=None, memo=None):
+        """
+        Check links concurrently and return results in input order.
+
+        Non-http(s) links are reported as skipped and do not count towards
+        max_checks; once max_checks http(s) links are taken the rest are dropped,
+        matching the sequential checker this engine replaces.
+
+        progress (optional, e.g. scan_jobs.ScanJob): ticked with links_checked per
+        result; once progress.cancelled is set, unstarted links are skipped.
+        on_result (optional): called with each result in input order as soon as
+        it and every earlier result are available, e.g. to stream report rows.
+        memo (optional, a LinkMemo): URLs already checked by another caller sharing
+        the memo are answered from it instead of the network.
+        """
+        results = []
+        pending = []  # (result index, link)
+        count = 0
+        for l in links:
+            if count >= max_checks:
+                break
+            if not urlparse(l["url"]).scheme.startswith("http"):
+                results.append({**l, "status": "skipped", "code": None, "reason": "non-http(s) URI"})
+                continue
+            results.append(None)
+            pending.append((len(results) - 1, l))
+            count += 1
+        if not pending:
+            if on_result:
+                for r in results:
+                    on_result(r)
+            return results
+
+        # interleave hosts so workers are not all parked on one host's slots
+        by_host = OrderedDict()
+        for idx, l in pending:
+            by_host.setdefault(urlparse(l["url"]).netloc.lower(), []).append((idx, l))
+        order = []
+        while by_host:
+            for host in list(by_host):
+                order.append(by_host[host].pop(0))
+                if not by_host[host]:
+                    del by_host[host]
+
+        pool = self._executor()
+        futures = {idx: pool.submit(self._check_tracked, l, progress, memo) for idx, l in order}
+        for idx in range(len(results)):
+            if idx in futures:
+                results[idx] = futures[idx].result()
+            if on_result:
+                on_result(results[idx])
+        if self.cache:
+            self.cache.prune()
+        return results
+
+    def _check_tracked(self, link, progress, memo=None):
+        if progress is not None and progress.cancelled:
+            return {**link, "status": "skipped", "code": None, "reason": "cancelled", "cache": None, "bytes": 0}
+        result = self._check_memo(link, memo) if memo is not None else self.check_one(link)
+        if progress is not None:
+            progress.tick("links_checked")
+        return result
+
+    def _check_memo(self, link, memo):
+        fut, owner = memo.claim(link["url"])
+        if not owner:
+            # the owner is already running on another worker, so this wait always ends
+            done = fut.result()
+            return {**link, "ip": done.get("ip"), "status": done["status"], "code": done["code"],
+                    "reason": done["reason"], "cache": "batch", "bytes": 0}
+        result = None
+        try:
+            result = self.check_one(link)
+        finally:
+            fut.set_result(result or {"status": "error", "code": None, "reason": "check failed"})
+        return result
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        self.session.close()
@@ -3,10 +3,15 @@
 mcp_site_scanner.py
 
 Minimal MCP-friendly HTTP tool that:
- - exposes two JSON endpoints for MCP/agent calls:
-    POST /mcp/scrape    -> run link checks + form detection on target URL
+ - exposes JSON endpoints for MCP/agent calls:
+    POST /mcp/scrape    -> queue link checks + form detection on target URL (returns a job id)
+    POST /mcp/scrape_batch -> queue one job scanning many targets; shared links are checked once
+    GET  /mcp/jobs/<id> -> job status, progress counters, summary and report path
+    POST /mcp/jobs/<id>/cancel -> cancel a queued or running scan
+    GET  /metrics       -> Prometheus text: per-phase latency histograms, link/byte/error counters
     POST /mcp/add_member -> attempt to submit a detected "add member" form (or a user-specified form)
- - writes an HTML report to ./reports/report.html (uses report_template.html if present)
+ - writes one HTML report per scan to ./reports/REPORT_<scan_id>.html, streamed while the
+   scan runs, and copies the latest to ./reports/report.html (uses report_template.html if present)
  - optional: send the report over SMTP (configure via env or YAML)
  
 Dependencies:
@@ -19,22 +24,39 @@ can call the endpoints to run scans. The JSON API is intentionally simple.
 import os
 import re
 import json
-import socket
 import uuid
 import datetime
-from urllib.parse import urljoin, urlparse
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 import yaml
 
+import dns_cache
+from dns_cache import DNS
+from link_cache import LinkCache
+from link_checker import LinkChecker, LinkMemo
+from report_writer import SITE_TEMPLATE, ReportWriter, attempts_table_html, forms_table_html, links_table_html  # noqa: F401 (re-exported)
+from scan_metrics import REGISTRY, ScanTimer
+from scan_jobs import ChildProgress, QueueFull, ScanCancelled, ScanJobManager
+
 # Config defaults
 OUT_DIR = os.environ.get("OUT_DIR", "reports")
 REPORT_FILE = os.path.join(OUT_DIR, "report.html")
 TEMPLATE_FILE = "report_template.html"  # optional template in working dir
 DEFAULT_USER_AGENT = "MCP-Site-Scanner/1.0 (+https://example.com)"
 TIMEOUT = 10  # seconds for requests
+LINK_CACHE_FILE = os.path.join(OUT_DIR, "link_cache.sqlite3")
+SITE_MAX_DEPTH = int(os.environ.get("SITE_MAX_DEPTH", "2"))  # site mode: link hops from the start page
+SITE_MAX_PAGES = int(os.environ.get("SITE_MAX_PAGES", "25"))  # site mode: pages fetched per scan
+SITE_FETCH_WORKERS = int(os.environ.get("SITE_FETCH_WORKERS", "8"))  # site mode: concurrent page fetches
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "4"))  # batch mode: targets scanned at once
+BATCH_MAX_TARGETS = int(os.environ.get("BATCH_MAX_TARGETS", "500"))  # batch mode: targets accepted per request
+LINK_CACHE_ENABLED = os.environ.get("LINK_CACHE", "on").lower() not in ("0", "off", "false", "no")
 
 app = Flask(__name__)
 
@@ -47,7 +69,8 @@ def fetch_url(url, method="GET", headers=None, allow_redirects=True, data=None):
     headers = headers or {}
     headers.setdefault("User-Agent", DEFAULT_USER_AGENT)
     try:
-        resp = requests.request(method, url, headers=headers, timeout=TIMEOUT, allow_redirects=allow_redirects, data=data)
+        # share the link checker's keep-alive pool: pages and their assets usually live on the same hosts
+        resp = get_link_checker().session.request(method, url, headers=headers, timeout=TIMEOUT, allow_redirects=allow_redirects, data=data)
         return resp
     except Exception as e:
         return e
@@ -57,30 +80,32 @@ def same_origin(a, b):
     pb = urlparse(b)
     return (pa.scheme, pa.netloc) == (pb.scheme, pb.netloc)
 
-def extract_links(base_url, html_text):
-    soup = BeautifulSoup(html_text, "lxml")
-    links = []
-    for tag, attr in (("a", "href"), ("link", "href"), ("img", "src"), ("script", "src")):
-        for node in soup.find_all(tag):
-            url = node.get(attr)
-            if not url:
-                continue
-            full = urljoin(base_url, url)
-            links.append({"tag": tag, "raw": url, "url": full})
+LINK_TAGS = (("a", "href"), ("link", "href"), ("img", "src"), ("script", "src"))
+MEMBER_FORM_KEYWORDS = ("member", "signup", "register", "join", "invite", "email", "add-member", "add-member", "new-member")
+
+def _links_from_soup(base_url, soup):
+    # one traversal for all link-bearing tags, bucketed so the output keeps the
+    # historical a -> link -> img -> script ordering
+    buckets = {tag: [] for tag, _ in LINK_TAGS}
+    attrs = dict(LINK_TAGS)
+    for node in soup.find_all(list(attrs)):
+        url = node.get(attrs[node.name])
+        if not url:
+            continue
+        buckets[node.name].append({"tag": node.name, "raw": url, "url": urljoin(base_url, url)})
     # deduplicate while preserving order
     seen = set()
     dedup = []
-    for l in links:
-        if l["url"] not in seen:
-            dedup.append(l)
-            seen.add(l["url"])
+    for tag, _ in LINK_TAGS:
+        for l in buckets[tag]:
+            if l["url"] not in seen:
+                dedup.append(l)
+                seen.add(l["url"])
     return dedup
 
-def find_possible_member_forms(base_url, html_text):
-    """Try to heuristically detect forms that look like 'add member' or 'signup' or 'invite' forms."""
-    soup = BeautifulSoup(html_text, "lxml")
+def _forms_from_soup(base_url, soup):
     candidate_forms = []
-    keywords = ("member", "signup", "register", "join", "invite", "email", "add-member", "add-member", "new-member")
+    keywords = MEMBER_FORM_KEYWORDS
     for form in soup.find_all("form"):
         form_info = {"action": form.get("action") or base_url,
                      "method": form.get("method", "get").lower(),
@@ -106,32 +131,86 @@ def find_possible_member_forms(base_url, html_text):
     candidate_forms.sort(key=lambda x: (not x["clue"], -x["score"]))
     return candidate_forms
 
-def check_links(links, base_url, max_checks=200):
-    results = []
-    count = 0
-    for l in links:
-        if count >= max_checks:
-            break
-        url = l["url"]
-        # only HTTP/HTTPS
-        if not urlparse(url).scheme.startswith("http"):
-            results.append({**l, "status": "skipped", "code": None, "reason": "non-http(s) URI"})
-            continue
-        try:
-            # HEAD first
-            r = requests.head(url, timeout=TIMEOUT, allow_redirects=True, headers={"User-Agent": DEFAULT_USER_AGENT})
-            code = r.status_code
-            ok = 200 <= code < 400
-            # If server does not respond to HEAD properly, fallback to GET
-            if code >= 400 or r.status_code == 405:
-                r = requests.get(url, timeout=TIMEOUT, allow_redirects=True, headers={"User-Agent": DEFAULT_USER_AGENT})
-                code = r.status_code
-                ok = 200 <= code < 400
-            results.append({**l, "status": "ok" if ok else "broken", "code": code, "reason": None if ok else f"{code}"})
-        except Exception as e:
-            results.append({**l, "status": "error", "code": None, "reason": str(e)})
-        count += 1
-    return results
+def _metadata_from_soup(soup):
+    meta = {}
+    for name in ("description", "keywords", "robots"):
+        node = soup.find("meta", attrs={"name": name})
+        meta[name] = (node.get("content") or "") if node else ""
+    return meta
+
+def extract_links(base_url, html_text):
+    return _links_from_soup(base_url, BeautifulSoup(html_text, "lxml"))
+
+def find_possible_member_forms(base_url, html_text):
+    """Try to heuristically detect forms that look like 'add member' or 'signup' or 'invite' forms."""
+    return _forms_from_soup(base_url, BeautifulSoup(html_text, "lxml"))
+
+def analyze_page(base_url, html_text):
+    """
+    Parse the page once and return everything run_scan needs:
+      { "title": str, "meta": {description, keywords, robots},
+        "links": extract_links(...) shape, "forms": find_possible_member_forms(...) shape }
+    """
+    soup = BeautifulSoup(html_text, "lxml")
+    title = (soup.title.string.strip() if soup.title and soup.title.string else "")
+    analysis = {
+        "title": title,
+        "meta": _metadata_from_soup(soup),
+        "links": _links_from_soup(base_url, soup),
+        "forms": _forms_from_soup(base_url, soup),
+    }
+    soup.decompose()
+    return analysis
+
+_link_checker = None
+
+def get_link_checker():
+    """Shared LinkChecker so keep-alive connections survive across scans."""
+    global _link_checker
+    if _link_checker is None:
+        cache = LinkCache(LINK_CACHE_FILE) if LINK_CACHE_ENABLED else None
+        dns_cache.install()  # requests connects via the shared DNS cache from here on
+        _link_checker = LinkChecker(timeout=TIMEOUT, user_agent=DEFAULT_USER_AGENT, cache=cache, resolver=DNS)
+    return _link_checker
+
+def check_links(links, base_url, max_checks=200, progress=None, on_result=None, memo=None):
+    # concurrent, pooled checks backed by the on-disk link cache; results keep the order of `links`
+    return get_link_checker().check(links, max_checks=max_checks, progress=progress, on_result=on_result, memo=memo)
+
+def new_scan_id():
+    return datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
+
+def report_path_for(scan_id):
+    """Per-scan report file; REPORT_FILE always holds a copy of the latest finished one."""
+    return os.path.join(OUT_DIR, f"REPORT_{scan_id}.html")
+
+def _load_template():
+    # if user supplied report template, use it ({{KEY}} placeholders)
+    if os.path.exists(TEMPLATE_FILE):
+        with open(TEMPLATE_FILE, "r", encoding="utf-8") as f:
+            return f.read()
+    return None
+
+def open_report(context, default_template=None):
+    """Start a streaming report for this scan; rows can be added while it runs."""
+    ensure_out_dir()
+    path = context.get("report_path") or report_path_for(context.setdefault("scan_id", new_scan_id()))
+    context["report_path"] = path
+    return ReportWriter(path, context, template=_load_template() or default_template).start()
+
+def publish_latest_report(report_path):
+    """Atomically copy a finished report to REPORT_FILE (what run-scan.sh and the tests look for)."""
+    tmp = REPORT_FILE + f".{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        shutil.copyfile(report_path, tmp)
+        os.replace(tmp, REPORT_FILE)
+    except OSError as e:
+        print(f"⚠️ Failed to create standard test report: {e} - mcp_site_scanner.py")
+
+def finish_report(writer, context):
+    path = writer.finish(context)
+    publish_latest_report(path)
+    return path
 
 def render_report(context):
     """
@@ -141,85 +220,102 @@ def render_report(context):
       - forms (list)
       - add_member_attempts (list)
       - summary (dict)
+      - scan_id / report_path (optional; a new per-scan path is chosen otherwise)
     """
-    ensure_out_dir()
-    # if user supplied report template, use it and inject placeholders if present
-    if os.path.exists(TEMPLATE_FILE):
-        with open(TEMPLATE_FILE, "r", encoding="utf-8") as f:
-            template = f.read()
-        # simple placeholder replacements ({{KEY}} style)
-        html = template
-        replacements = {
-            "{{TARGET}}": context.get("target_url", ""),
-            "{{REPORT_DATE}}": context.get("fetched_time", ""),
-            "{{SUMMARY}}": json.dumps(context.get("summary", {}), indent=2),
-            "{{LINKS_TABLE}}": links_table_html(context.get("link_results", [])),
-            "{{FORMS}}": forms_table_html(context.get("forms", [])),
-            "{{ATTEMPTS}}": attempts_table_html(context.get("add_member_attempts", [])),
-        }
-        for k, v in replacements.items():
-            html = html.replace(k, v)
-    else:
-        # fallback: build a simple report like sample_report.html
-        html = f"""
-        <!doctype html>
-        <html><head><meta charset="utf-8"><title>Scan Report - {context.get('target_url')}</title>
-        <style>body{{font-family:sans-serif;padding:20px}}table{{border-collapse:collapse;width:100%}}td,th{{border:1px solid #ccc;padding:8px}}</style>
-        </head><body>
-        <h1>Website Security Scan Report</h1>
-        <p>Target: {context.get('target_url')}</p>
-        <p>Report time: {context.get('fetched_time')}</p>
-        <h2>Summary</h2><pre>{json.dumps(context.get('summary', {}), indent=2)}</pre>
-        <h2>Links</h2>{links_table_html(context.get("link_results", []))}
-        <h2>Detected Forms</h2>{forms_table_html(context.get("forms", []))}
-        <h2>Add-member Attempts</h2>{attempts_table_html(context.get("add_member_attempts", []))}
-        </body></html>
-        """
-    with open(REPORT_FILE, "w", encoding="utf-8") as f:
-        f.write(html)
-    return REPORT_FILE
-
-def links_table_html(link_results):
-    rows = []
-    rows.append("<table><thead><tr><th>Tag</th><th>URL</th><th>Status</th><th>Code</th><th>Reason</th></tr></thead><tbody>")
-    for r in link_results:
-        rows.append(f"<tr><td>{r.get('tag')}</td><td><a href=\"{r.get('url')}\" target=_blank>{r.get('url')}</a></td><td>{r.get('status')}</td><td>{r.get('code') or ''}</td><td>{r.get('reason') or ''}</td></tr>")
-    rows.append("</tbody></table>")
-    return "\n".join(rows)
-
-def forms_table_html(forms):
-    rows = []
-    if not forms:
-        return "<p>No forms detected.</p>"
-    rows.append("<table><thead><tr><th>Action</th><th>Method</th><th>Inputs</th><th>Clue</th><th>Score</th></tr></thead><tbody>")
-    for f in forms:
-        inputs = ", ".join([i["name"] for i in f.get("inputs", [])])
-        rows.append(f"<tr><td>{f.get('action')}</td><td>{f.get('method')}</td><td>{inputs}</td><td>{f.get('clue')}</td><td>{f.get('score')}</td></tr>")
-    rows.append("</tbody></table>")
-    return "\n".join(rows)
-
-def attempts_table_html(attempts):
-    if not attempts:
-        return "<p>No attempts performed.</p>"
-    rows = []
-    rows.append("<table><thead><tr><th>Form Action</th><th>Method</th><th>Payload</th><th>Result</th><th>Response Code</th></tr></thead><tbody>")
-    for a in attempts:
-        rows.append("<tr>")
-        rows.append(f"<td>{a.get('action')}</td>")
-        rows.append(f"<td>{a.get('method')}</td>")
-        rows.append(f"<td><pre>{json.dumps(a.get('payload', {}), indent=2)}</pre></td>")
-        rows.append(f"<td>{a.get('result')}</td>")
-        rows.append(f"<td>{a.get('code') or ''}</td>")
-        rows.append("</tr>")
-    rows.append("</tbody></table>")
-    return "\n".join(rows)
+    writer = open_report(context)
+    for r in context.get("link_results", []):
+        writer.add_link(r)
+    writer.add_forms(context.get("forms", []))
+    writer.add_attempts(context.get("add_member_attempts", []))
+    return finish_report(writer, context)
 
 # main scan logic -----------------------------------------------------------
 
-def run_scan(target_url, max_link_checks=200, try_add_member=True, member_payload=None):
-    summary = {"total_links": 0, "broken_links": 0, "forms_detected": 0, "add_member_attempts": 0}
+def attempt_add_member(target_url, forms, member_payload=None):
+    """Submit a test member to the best candidate form, or probe common signup endpoints."""
+    attempts = []
+    # prepare default payload if not provided
+    default_payload = {"name": "SecurityScanTest", "email": f"scanner+{uuid.uuid4().hex[:8]}@example.com"}
+    payload = (member_payload or default_payload)
+    # if forms found, attempt the first candidate (highest score)
+    if forms:
+        form = forms[0]
+        action = urljoin(target_url, form.get("action") or "")
+        method = form.get("method", "post").lower()
+        # map inputs heuristically
+        form_data = {}
+        for inp in form.get("inputs", []):
+            n = inp.get("name") or ""
+            if not n:
+                continue
+            ln = n.lower()
+            if "email" in ln:
+                form_data[n] = payload.get("email")
+            elif "name" in ln:
+                form_data[n] = payload.get("name")
+            elif "first" in ln and "name" in ln:
+                form_data[n] = payload.get("name").split()[0]
+            elif "last" in ln and "name" in ln:
+                form_data[n] = payload.get("name").split()[-1]
+            else:
+                # generic
+                form_data[n] = payload.get(n) or payload.get("name") or payload.get("email") or "test"
+        try:
+            resp = requests.request(method.upper(), action, data=form_data, timeout=TIMEOUT, headers={"User-Agent": DEFAULT_USER_AGENT})
+            attempts.append({"action": action, "method": method, "payload": form_data, "result": "ok" if resp.status_code < 400 else "error", "code": resp.status_code, "response_text": resp.text[:500]})
+        except Exception as e:
+            attempts.append({"action": action, "method": method, "payload": form_data, "result": "exception", "code": None, "error": str(e)})
+    else:
+        # attempt to look for common signup endpoints
+        common_paths = ["/signup", "/register", "/members/add", "/subscribe", "/join"]
+        for p in common_paths:
+            url_try = urljoin(target_url, p)
+            try:
+                resp = requests.post(url_try, data=(member_payload or default_payload), timeout=5, headers={"User-Agent": DEFAULT_USER_AGENT})
+                attempts.append({"action": url_try, "method": "post", "payload": (member_payload or default_payload), "result": "ok" if resp.status_code < 400 else "error", "code": resp.status_code})
+            except Exception as e:
+                attempts.append({"action": url_try, "method": "post", "payload": (member_payload or default_payload), "result": "exception", "error": str(e)})
+    return attempts
+
+def _checkpoint(progress, phase, **counters):
+    """Report progress to a job (if any) and stop the scan once it is cancelled."""
+    if progress is None:
+        return
+    progress.update(phase=phase, **counters)
+    if progress.cancelled:
+        raise ScanCancelled(phase)
+
+def _finish_scan(writer, ctx, timer, mode, outcome="done"):
+    """Render the final report (timed) and record the scan's metrics in its summary and REGISTRY."""
+    ctx["summary"]["metrics"] = timer.as_dict()
+    with timer.phase("render"):
+        if writer is None:
+            render_report(ctx)
+        elif outcome == "done":
+            finish_report(writer, ctx)
+        else:
+            writer.finish(ctx)
+    # the report shows metrics up to rendering; the returned summary includes the render time
+    ctx["summary"]["metrics"] = timer.as_dict()
+    timer.record(mode, outcome)
+    return ctx
+
+def run_scan(target_url, max_link_checks=200, try_add_member=True, member_payload=None, progress=None, scan_id=None,
+             link_memo=None):
+    """
+    Scan one page. progress (optional, a scan_jobs.ScanJob) receives phase and
+    counter updates; cancelling it raises ScanCancelled at the next phase boundary.
+    The report is streamed to report_path_for(scan_id) as results arrive.
+    link_memo (optional, a LinkMemo) shares link results with other scans of a batch.
+    summary["metrics"] holds per-phase timings and counters (see scan_metrics).
+    """
+    timer = ScanTimer()
+    summary = {"total_links": 0, "links_checked": 0, "link_check_seconds": 0.0, "links_from_cache": 0, "link_check_bytes": 0, "broken_links": 0, "forms_detected": 0, "add_member_attempts": 0}
     fetched_time = datetime.datetime.utcnow().isoformat() + "Z"
+    scan_id = scan_id or new_scan_id()
     ctx = {
+        "scan_id": scan_id,
+        "report_path": report_path_for(scan_id),
         "target_url": target_url,
         "fetched_time": fetched_time,
         "link_results": [],
@@ -228,110 +324,435 @@ def run_scan(target_url, max_link_checks=200, try_add_member=True, member_payloa
         "summary": summary,
     }
     # fetch page
-    r = fetch_url(target_url)
+    _checkpoint(progress, "fetch")
+    with timer.phase("fetch"):
+        r = fetch_url(target_url)
+        # hostname
+        ctx["host_ip"] = DNS.resolve(urlparse(target_url).hostname) or ""
     if isinstance(r, Exception):
         ctx["summary"]["error"] = str(r)
-        render_report(ctx)
-        return ctx
-    html = r.text
-    # hostname
-    try:
-        hostname = urlparse(target_url).hostname or ""
-        host_ip = socket.gethostbyname(hostname) if hostname else ""
-    except Exception:
-        host_ip = ""
-    ctx["host_ip"] = host_ip
-    # title
-    soup = BeautifulSoup(html, "lxml")
-    title = (soup.title.string.strip() if soup.title and soup.title.string else "")
-    ctx["fetched_title"] = title
-    # extract links
-    links = extract_links(target_url, html)
+        timer.error(type(r).__name__)
+        return _finish_scan(None, ctx, timer, "page", "fetch_error")
+    timer.count("pages_fetched")
+    timer.count("bytes_fetched", len(r.content))
+    # single parse: title, metadata, links and forms
+    _checkpoint(progress, "parse")
+    with timer.phase("parse"):
+        page = analyze_page(target_url, r.text)
+    ctx["fetched_title"] = page["title"]
+    ctx["meta"] = page["meta"]
+    links = page["links"]
     ctx["summary"]["total_links"] = len(links)
-    link_results = check_links(links, base_url=target_url, max_checks=max_link_checks)
-    ctx["link_results"] = link_results
-    ctx["summary"]["broken_links"] = sum(1 for L in link_results if L.get("status") not in ("ok", "skipped"))
-    # find forms
-    forms = find_possible_member_forms(target_url, html)
-    ctx["forms"] = forms
-    ctx["summary"]["forms_detected"] = len(forms)
-    # try adding member
-    attempts = []
-    if try_add_member:
-        # prepare default payload if not provided
-        default_payload = {"name": "SecurityScanTest", "email": f"scanner+{uuid.uuid4().hex[:8]}@example.com"}
-        payload = (member_payload or default_payload)
-        # if forms found, attempt the first candidate (highest score)
-        if forms:
-            form = forms[0]
-            action = urljoin(target_url, form.get("action") or "")
-            method = form.get("method", "post").lower()
-            # map inputs heuristically
-            form_data = {}
-            for inp in form.get("inputs", []):
-                n = inp.get("name") or ""
-                if not n:
-                    continue
-                ln = n.lower()
-                if "email" in ln:
-                    form_data[n] = payload.get("email")
-                elif "name" in ln:
-                    form_data[n] = payload.get("name")
-                elif "first" in ln and "name" in ln:
-                    form_data[n] = payload.get("name").split()[0]
-                elif "last" in ln and "name" in ln:
-                    form_data[n] = payload.get("name").split()[-1]
-                else:
-                    # generic
-                    form_data[n] = payload.get(n) or payload.get("name") or payload.get("email") or "test"
-            try:
-                resp = requests.request(method.upper(), action, data=form_data, timeout=TIMEOUT, headers={"User-Agent": DEFAULT_USER_AGENT})
-                attempts.append({"action": action, "method": method, "payload": form_data, "result": "ok" if resp.status_code < 400 else "error", "code": resp.status_code, "response_text": resp.text[:500]})
-            except Exception as e:
-                attempts.append({"action": action, "method": method, "payload": form_data, "result": "exception", "code": None, "error": str(e)})
-        else:
-            # attempt to look for common signup endpoints
-            common_paths = ["/signup", "/register", "/members/add", "/subscribe", "/join"]
-            for p in common_paths:
-                url_try = urljoin(target_url, p)
-                try:
-                    resp = requests.post(url_try, data=(member_payload or default_payload), timeout=5, headers={"User-Agent": DEFAULT_USER_AGENT})
-                    attempts.append({"action": url_try, "method": "post", "payload": (member_payload or default_payload), "result": "ok" if resp.status_code < 400 else "error", "code": resp.status_code})
-                except Exception as e:
-                    attempts.append({"action": url_try, "method": "post", "payload": (member_payload or default_payload), "result": "exception", "error": str(e)})
-        ctx["add_member_attempts"] = attempts
-        ctx["summary"]["add_member_attempts"] = len(attempts)
-    # finalize and render report
-    render_report(ctx)
+    _checkpoint(progress, "links", links_total=min(len(links), max_link_checks), links_checked=0)
+    writer = open_report(ctx)
+    try:
+        t0 = time.perf_counter()
+        with timer.phase("link_check"):
+            DNS.prefetch(urlparse(l["url"]).hostname for l in links if l["url"].startswith("http"))
+            link_results = check_links(links, base_url=target_url, max_checks=max_link_checks, progress=progress, on_result=writer.add_link, memo=link_memo)
+        timer.count_links(link_results)
+        ctx["summary"]["links_checked"] = len(link_results)
+        ctx["summary"]["link_check_seconds"] = round(time.perf_counter() - t0, 3)
+        ctx["summary"]["links_from_cache"] = sum(1 for L in link_results if L.get("cache") in ("hit", "revalidated"))
+        ctx["summary"]["link_check_bytes"] = sum(L.get("bytes") or 0 for L in link_results)
+        ctx["link_results"] = link_results
+        ctx["summary"]["broken_links"] = sum(1 for L in link_results if L.get("status") not in ("ok", "skipped"))
+        # find forms
+        forms = page["forms"]
+        ctx["forms"] = forms
+        ctx["summary"]["forms_detected"] = len(forms)
+        writer.add_forms(forms)
+        # try adding member
+        _checkpoint(progress, "forms", forms_detected=len(forms), broken_links=ctx["summary"]["broken_links"])
+        attempts = []
+        if try_add_member:
+            with timer.phase("form_probe"):
+                attempts = attempt_add_member(target_url, forms, member_payload)
+            ctx["add_member_attempts"] = attempts
+            ctx["summary"]["add_member_attempts"] = len(attempts)
+        # finalize and render report
+        _checkpoint(progress, "report", add_member_attempts=len(attempts))
+        writer.add_attempts(attempts)
+    except ScanCancelled:
+        # leave a complete (if short) report behind for the cancelled job
+        ctx["summary"]["cancelled"] = True
+        _finish_scan(writer, ctx, timer, "page", "cancelled")
+        raise
+    return _finish_scan(writer, ctx, timer, "page")
+
+# site mode -----------------------------------------------------------------
+
+def _scan_page(url, depth, timer=None):
+    """Fetch and analyse one page of a site scan (links/forms only for HTML responses)."""
+    timer = timer or ScanTimer()
+    page = {"url": url, "depth": depth, "code": None, "title": "", "links": [], "forms": []}
+    with timer.phase("fetch"):
+        r = fetch_url(url)
+    if isinstance(r, Exception):
+        page["error"] = str(r)
+        timer.error(type(r).__name__)
+        return page
+    timer.count("pages_fetched")
+    timer.count("bytes_fetched", len(r.content))
+    page["code"] = r.status_code
+    if r.ok and "html" in r.headers.get("content-type", "").lower():
+        with timer.phase("parse"):
+            analysis = analyze_page(url, r.text)
+        page.update(title=analysis["title"], links=analysis["links"], forms=analysis["forms"])
+    return page
+
+def crawl_site_pages(start_url, max_depth=SITE_MAX_DEPTH, max_pages=SITE_MAX_PAGES, progress=None, timer=None):
+    """
+    Breadth-first walk of same-origin <a href> pages from start_url.
+    Each depth level is fetched concurrently; returns pages in crawl order.
+    timer (optional, a ScanTimer) sums fetch and parse time over all pages.
+    """
+    seen = {urldefrag(start_url)[0]}
+    level = [start_url]
+    pages = []
+    with ThreadPoolExecutor(max_workers=SITE_FETCH_WORKERS, thread_name_prefix="sitecrawl") as pool:
+        for depth in range(max_depth + 1):
+            level = level[:max_pages - len(pages)]
+            if not level:
+                break
+            fetched = list(pool.map(lambda u: _scan_page(u, depth, timer), level))
+            pages.extend(fetched)
+            _checkpoint(progress, "crawl", pages_scanned=len(pages))
+            level = []
+            for page in fetched:
+                for l in page["links"]:
+                    if l["tag"] != "a":
+                        continue
+                    nxt = urldefrag(l["url"])[0]
+                    if nxt in seen or not same_origin(nxt, start_url):
+                        continue
+                    seen.add(nxt)
+                    level.append(nxt)
+    return pages
+
+def run_site_scan(target_url, max_depth=SITE_MAX_DEPTH, max_pages=SITE_MAX_PAGES, max_link_checks=1000,
+                  try_add_member=True, member_payload=None, progress=None, scan_id=None, link_memo=None):
+    """
+    Scan a whole site: crawl same-origin pages, check every unique link once,
+    and aggregate pages, links and forms into one report.
+    In summary["metrics"], fetch and parse are summed over concurrent page
+    fetches (so they can exceed crawl, the wall time of the whole crawl).
+    """
+    timer = ScanTimer()
+    summary = {"pages_scanned": 0, "total_links": 0, "link_occurrences": 0, "duplicate_link_checks_avoided": 0,
+               "links_checked": 0, "link_check_seconds": 0.0, "links_from_cache": 0, "link_check_bytes": 0,
+               "broken_links": 0, "forms_detected": 0, "add_member_attempts": 0}
+    scan_id = scan_id or new_scan_id()
+    ctx = {
+        "mode": "site",
+        "scan_id": scan_id,
+        "report_path": report_path_for(scan_id),
+        "target_url": target_url,
+        "fetched_time": datetime.datetime.utcnow().isoformat() + "Z",
+        "pages": [],
+        "link_results": [],
+        "forms": [],
+        "add_member_attempts": [],
+        "summary": summary,
+    }
+    ctx["host_ip"] = DNS.resolve(urlparse(target_url).hostname) or ""
+    _checkpoint(progress, "crawl", pages_scanned=0)
+    with timer.phase("crawl"):
+        pages = crawl_site_pages(target_url, max_depth=max_depth, max_pages=max_pages, progress=progress, timer=timer)
+    summary["pages_scanned"] = len(pages)
+
+    # one check per unique URL, remembering the first page it was found on
+    unique, first_seen = [], {}
+    for page in pages:
+        for l in page["links"]:
+            summary["link_occurrences"] += 1
+            if l["url"] not in first_seen:
+                first_seen[l["url"]] = page["url"]
+                unique.append({**l, "page": page["url"]})
+    summary["total_links"] = len(unique)
+    summary["duplicate_link_checks_avoided"] = summary["link_occurrences"] - len(unique)
+
+    writer = open_report(ctx, default_template=SITE_TEMPLATE)
+    try:
+        _checkpoint(progress, "links", links_total=min(len(unique), max_link_checks), links_checked=0)
+        t0 = time.perf_counter()
+        with timer.phase("link_check"):
+            DNS.prefetch(urlparse(l["url"]).hostname for l in unique if l["url"].startswith("http"))
+            link_results = check_links(unique, base_url=target_url, max_checks=max_link_checks, progress=progress, on_result=writer.add_link, memo=link_memo)
+        timer.count_links(link_results)
+        summary["links_checked"] = len(link_results)
+        summary["link_check_seconds"] = round(time.perf_counter() - t0, 3)
+        summary["links_from_cache"] = sum(1 for L in link_results if L.get("cache") in ("hit", "revalidated"))
+        summary["link_check_bytes"] = sum(L.get("bytes") or 0 for L in link_results)
+        summary["broken_links"] = sum(1 for L in link_results if L.get("status") not in ("ok", "skipped"))
+        ctx["link_results"] = link_results
+
+        # per-page aggregation
+        status_by_url = {L["url"]: L.get("status") for L in link_results}
+        forms = []
+        for page in pages:
+            page_forms = [{**f, "page": page["url"]} for f in page["forms"]]
+            forms.extend(page_forms)
+            ctx["pages"].append({
+                "url": page["url"], "depth": page["depth"], "code": page["code"], "error": page.get("error"),
+                "title": page["title"], "links": len(page["links"]), "forms": len(page_forms),
+                "broken_links": sum(1 for l in page["links"] if status_by_url.get(l["url"]) in ("broken", "error")),
+            })
+        writer.add_pages(ctx["pages"])
+        forms.sort(key=lambda x: (not x["clue"], -x["score"]))
+        ctx["forms"] = forms
+        summary["forms_detected"] = len(forms)
+        writer.add_forms(forms)
+
+        _checkpoint(progress, "forms", forms_detected=len(forms), broken_links=summary["broken_links"])
+        attempts = []
+        if try_add_member:
+            # best form across the site, submitted relative to the page it was found on
+            base = forms[0]["page"] if forms else target_url
+            with timer.phase("form_probe"):
+                attempts = attempt_add_member(base, forms, member_payload)
+            ctx["add_member_attempts"] = attempts
+            summary["add_member_attempts"] = len(attempts)
+        _checkpoint(progress, "report", add_member_attempts=len(attempts))
+        writer.add_attempts(attempts)
+    except ScanCancelled:
+        summary["cancelled"] = True
+        _finish_scan(writer, ctx, timer, "site", "cancelled")
+        raise
+    return _finish_scan(writer, ctx, timer, "site")
+
+# batch mode ----------------------------------------------------------------
+
+def batch_summary_path(batch_id):
+    return os.path.join(OUT_DIR, f"BATCH_{batch_id}.json")
+
+def read_targets_file(path):
+    """One target URL per line; blank lines and # comments are ignored."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+def run_batch_scan(targets, mode="page", max_link_checks=None, max_depth=SITE_MAX_DEPTH, max_pages=SITE_MAX_PAGES,
+                   try_add_member=True, member_payload=None, progress=None, batch_id=None, workers=BATCH_WORKERS):
+    """
+    Scan many targets at once. Up to `workers` targets run concurrently and all of
+    them share the link checker's bounded pool; a LinkMemo makes each unique URL
+    (in practice the analytics, CDN and font assets sites have in common) a single
+    check for the whole batch. Every target gets its own report; the batch summary
+    with throughput figures is written to batch_summary_path(batch_id).
+    """
+    targets = list(dict.fromkeys(t.strip() for t in targets if t and t.strip()))
+    batch_id = batch_id or new_scan_id()
+    if max_link_checks is None:
+        max_link_checks = 1000 if mode == "site" else 200
+    memo = LinkMemo()
+    timer = ScanTimer()
+    ctx = {
+        "mode": "batch",
+        "batch_id": batch_id,
+        "scan_id": batch_id,
+        "report_path": batch_summary_path(batch_id),
+        "started": datetime.datetime.utcnow().isoformat() + "Z",
+        "targets": [],
+    }
+    _checkpoint(progress, "targets", targets_total=len(targets), targets_done=0)
+
+    def scan_target(i, target):
+        scan_id = f"{batch_id}_{i:03d}"
+        p = {"target": target, "mode": mode, "max_link_checks": max_link_checks, "max_depth": max_depth,
+             "max_pages": max_pages, "try_add_member": try_add_member, "member_payload": member_payload}
+        row = {"target": target, "scan_id": scan_id, "report_path": report_path_for(scan_id), "state": "done"}
+        t0 = time.perf_counter()
+        try:
+            child = ChildProgress(progress) if progress is not None else None
+            row["summary"] = _scan_from_params(p, progress=child, scan_id=scan_id, link_memo=memo).get("summary", {})
+        except ScanCancelled:
+            row["state"] = "cancelled"
+        except Exception as e:
+            row.update(state="failed", error=f"{type(e).__name__}: {e}")
+        row["seconds"] = round(time.perf_counter() - t0, 3)
+        if progress is not None:
+            progress.tick("targets_done")
+        return row
+
+    t0 = time.perf_counter()
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets))), thread_name_prefix="batch") as pool:
+            ctx["targets"] = list(pool.map(scan_target, range(len(targets)), targets))
+    elapsed = time.perf_counter() - t0
+
+    done = [t for t in ctx["targets"] if t["state"] == "done"]
+    def total(key):
+        return sum((t.get("summary") or {}).get(key, 0) for t in done)
+    links_checked = total("links_checked")
+    ctx["summary"] = {
+        "targets": len(targets),
+        "targets_done": len(done),
+        "targets_failed": sum(1 for t in ctx["targets"] if t["state"] == "failed"),
+        "targets_cancelled": sum(1 for t in ctx["targets"] if t["state"] == "cancelled"),
+        "pages_scanned": total("pages_scanned") if mode == "site" else len(done),
+        "total_links": total("total_links"),
+        "links_checked": links_checked,
+        "unique_links_checked": memo.unique(),
+        "cross_target_checks_avoided": memo.hits,
+        "links_from_cache": total("links_from_cache"),
+        "link_check_bytes": total("link_check_bytes"),
+        "broken_links": total("broken_links"),
+        "forms_detected": total("forms_detected"),
+        "elapsed_seconds": round(elapsed, 3),
+        "targets_per_second": round(len(ctx["targets"]) / elapsed, 3) if elapsed else 0.0,
+        "links_per_second": round(links_checked / elapsed, 3) if elapsed else 0.0,
+    }
+    ctx["finished"] = datetime.datetime.utcnow().isoformat() + "Z"
+    ensure_out_dir()
+    tmp = ctx["report_path"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ctx, f, indent=2)
+    os.replace(tmp, ctx["report_path"])
+    # per-target phases are recorded by each scan; the batch adds its own duration
+    cancelled = progress is not None and progress.cancelled
+    timer.record("batch", "cancelled" if cancelled else "done")
+    if cancelled:
+        raise ScanCancelled("targets")
     return ctx
 
 # Flask endpoints (MCP-friendly minimal interface) -------------------------
 
+def _scan_from_params(p, progress=None, scan_id=None, link_memo=None):
+    common = dict(max_link_checks=p["max_link_checks"], try_add_member=p["try_add_member"],
+                  member_payload=p["member_payload"], progress=progress, scan_id=scan_id, link_memo=link_memo)
+    if p.get("mode") == "site":
+        return run_site_scan(p["target"], max_depth=p["max_depth"], max_pages=p["max_pages"], **common)
+    return run_scan(p["target"], **common)
+
+def _batch_from_params(p, progress=None, batch_id=None):
+    return run_batch_scan(p["targets"], mode=p["mode"], max_link_checks=p["max_link_checks"], max_depth=p["max_depth"],
+                          max_pages=p["max_pages"], try_add_member=p["try_add_member"],
+                          member_payload=p["member_payload"], progress=progress, batch_id=batch_id)
+
+def _run_scan_job(job):
+    # the report path is known up front so pollers can open the partial report
+    if job.params.get("kind") == "batch":
+        job.report_path = batch_summary_path(job.id)
+        return _batch_from_params(job.params, progress=job, batch_id=job.id)
+    job.report_path = report_path_for(job.id)
+    return _scan_from_params(job.params, progress=job, scan_id=job.id)
+
+jobs = ScanJobManager(_run_scan_job)
+
+def _job_response(job):
+    body = job.to_dict()
+    if body.get("report_path"):
+        body["report_host"] = request.host_url.rstrip("/") + "/" + body["report_path"]
+    return body
+
 @app.route("/mcp/scrape", methods=["POST"])
 def mcp_scrape():
     """
     POST JSON:
-      { "target": "https://example.com", "max_link_checks": 200, "try_add_member": true }
-    Response JSON:
-      { "status": "ok", "report": "/reports/report.html", "summary": {...} }
+      { "target": "https://example.com", "max_link_checks": 200, "try_add_member": true, "wait": false,
+        "mode": "page" | "site", "max_depth": 2, "max_pages": 25 }
+    mode "site" crawls same-origin pages up to max_depth/max_pages and checks each unique link once.
+    Response JSON (202, scan queued; poll status_url):
+      { "status": "queued", "job_id": "...", "status_url": "/mcp/jobs/<job_id>" }
+    With "wait": true the scan runs inline and the legacy response is returned:
+      { "status": "ok", "scan_id": "...", "report_path": "reports/REPORT_<scan_id>.html", "summary": {...} }
+    summary.metrics breaks the scan down: phase_seconds (fetch, parse, crawl, link_check,
+    form_probe, render), links_checked, bytes_fetched, pages_fetched and errors by class.
+    429 when the scan queue is full.
     """
     payload = request.get_json(force=True, silent=True) or {}
     target = payload.get("target")
     if not target:
         return jsonify({"status":"error","error":"missing 'target' in json body"}), 400
-    max_checks = int(payload.get("max_link_checks", 200))
-    try_add = bool(payload.get("try_add_member", True))
-    member_payload = payload.get("member_payload")
-    ctx = run_scan(target, max_link_checks=max_checks, try_add_member=try_add, member_payload=member_payload)
-    return jsonify({"status":"ok", "report_path": REPORT_FILE, "summary": ctx.get("summary", {}), "report_host": request.host_url.rstrip("/") + "/" + REPORT_FILE}), 200
-            # --- PATCH: Ensure consistent report name for tests ---
-import shutil
-try:
-                shutil.copy(report_path, "reports/report.html")
-                print("✅ Standard test report created: reports/report.html - mcp_site_scanner.py:331")
-except Exception as e:
-                print(f"⚠️ Failed to create standard test report: {e} - mcp_site_scanner.py:333")
-            # --- END PATCH ---
+    mode = payload.get("mode", "page")
+    if mode not in ("page", "site"):
+        return jsonify({"status":"error","error":"mode must be 'page' or 'site'"}), 400
+    params = {
+        "target": target,
+        "mode": mode,
+        "max_link_checks": int(payload.get("max_link_checks", 200 if mode == "page" else 1000)),
+        "max_depth": int(payload.get("max_depth", SITE_MAX_DEPTH)),
+        "max_pages": int(payload.get("max_pages", SITE_MAX_PAGES)),
+        "try_add_member": bool(payload.get("try_add_member", True)),
+        "member_payload": payload.get("member_payload"),
+    }
+    if payload.get("wait"):
+        ctx = _scan_from_params(params)
+        return jsonify({"status":"ok", "scan_id": ctx["scan_id"], "report_path": ctx["report_path"], "summary": ctx.get("summary", {}), "report_host": request.host_url.rstrip("/") + "/" + ctx["report_path"]}), 200
+    try:
+        job = jobs.submit(**params)
+    except QueueFull as e:
+        return jsonify({"status":"error", "error": str(e)}), 429
+    return jsonify({"status":"queued", "job_id": job.id, "status_url": f"/mcp/jobs/{job.id}"}), 202
+
+@app.route("/mcp/scrape_batch", methods=["POST"])
+def mcp_scrape_batch():
+    """
+    POST JSON:
+      { "targets": ["https://a.example", "https://b.example"], "mode": "page" | "site",
+        "max_link_checks": 200, "max_depth": 2, "max_pages": 25, "try_add_member": false, "wait": false }
+    Runs the targets as one job; links shared between targets are checked once per batch.
+    Response JSON (202, batch queued; poll status_url, its report_path is the batch summary JSON):
+      { "status": "queued", "job_id": "...", "targets": 2, "status_url": "/mcp/jobs/<job_id>" }
+    With "wait": true the batch runs inline:
+      { "status": "ok", "batch_id": "...", "report_path": "reports/BATCH_<id>.json", "summary": {...}, "targets": [...] }
+    429 when the scan queue is full.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    targets = payload.get("targets")
+    if not isinstance(targets, list) or not targets or not all(isinstance(t, str) for t in targets):
+        return jsonify({"status":"error","error":"'targets' must be a non-empty list of URLs"}), 400
+    if len(targets) > BATCH_MAX_TARGETS:
+        return jsonify({"status":"error","error":f"at most {BATCH_MAX_TARGETS} targets per batch"}), 400
+    mode = payload.get("mode", "page")
+    if mode not in ("page", "site"):
+        return jsonify({"status":"error","error":"mode must be 'page' or 'site'"}), 400
+    params = {
+        "kind": "batch",
+        "targets": targets,
+        "mode": mode,
+        "max_link_checks": int(payload.get("max_link_checks", 200 if mode == "page" else 1000)),
+        "max_depth": int(payload.get("max_depth", SITE_MAX_DEPTH)),
+        "max_pages": int(payload.get("max_pages", SITE_MAX_PAGES)),
+        "try_add_member": bool(payload.get("try_add_member", True)),
+        "member_payload": payload.get("member_payload"),
+    }
+    if payload.get("wait"):
+        ctx = _batch_from_params(params)
+        return jsonify({"status":"ok", "batch_id": ctx["batch_id"], "report_path": ctx["report_path"], "summary": ctx["summary"], "targets": ctx["targets"]}), 200
+    try:
+        job = jobs.submit(**params)
+    except QueueFull as e:
+        return jsonify({"status":"error", "error": str(e)}), 429
+    return jsonify({"status":"queued", "job_id": job.id, "targets": len(targets), "status_url": f"/mcp/jobs/{job.id}"}), 202
+
+@app.route("/mcp/jobs", methods=["GET"])
+def mcp_jobs():
+    """List known jobs (newest last) with the current queue depth."""
+    return jsonify({"status":"ok", "queue_depth": jobs.queue_depth(), "workers": jobs.workers,
+                    "jobs": [{"job_id": j.id, "kind": j.params.get("kind", "scan"), "state": j.state, "target": j.params.get("target")} for j in jobs.list()]}), 200
+
+@app.route("/mcp/jobs/<job_id>", methods=["GET"])
+def mcp_job_status(job_id):
+    """Job state, progress counters and, once done, the summary and report path."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status":"error", "error":"unknown job"}), 404
+    return jsonify({"status":"ok", **_job_response(job)}), 200
+
+@app.route("/mcp/jobs/<job_id>/cancel", methods=["POST"])
+def mcp_job_cancel(job_id):
+    """Cancel a queued job, or stop a running one at its next phase boundary."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"status":"error", "error":"unknown job"}), 404
+    return jsonify({"status":"ok", **_job_response(job)}), 200
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text exposition of scan metrics since the server started."""
+    running = sum(1 for j in jobs.list() if j.state == "running")
+    gauges = {"scan_queue_depth": jobs.queue_depth(), "scan_jobs_running": running, "dns_cache_entries": DNS.stats()["entries"]}
+    return Response(REGISTRY.render(gauges), mimetype="text/plain; version=0.0.4")
 
 @app.route("/mcp/add_member", methods=["POST"])
 def mcp_add_member():
@@ -372,13 +793,29 @@ if __name__ == "__main__":
     parser.add_argument("--port", default=8020, type=int)
     parser.add_argument("--target", help="If provided, run one-off scan and exit (prints summary).")
     parser.add_argument("--once", action="store_true", help="If used with --target, run scan once and exit.")
+    parser.add_argument("--site", action="store_true", help="With --target, crawl same-origin pages instead of one page.")
+    parser.add_argument("--max-depth", default=SITE_MAX_DEPTH, type=int, help="Site mode: link hops from the start page.")
+    parser.add_argument("--max-pages", default=SITE_MAX_PAGES, type=int, help="Site mode: maximum pages fetched.")
+    parser.add_argument("--targets-file", help="Scan every URL in this file (one per line) as one batch and exit.")
     args = parser.parse_args()
+    if args.targets_file:
+        targets = read_targets_file(args.targets_file)
+        print("Running batch scan of - mcp_site_scanner.py", len(targets), "targets")
+        ctx = run_batch_scan(targets, mode="site" if args.site else "page", max_depth=args.max_depth, max_pages=args.max_pages)
+        for t in ctx["targets"]:
+            print(" -", t["state"], t["target"], t["report_path"], t.get("error", ""))
+        print("Batch summary: - mcp_site_scanner.py", json.dumps(ctx["summary"], indent=2))
+        print("Batch summary written to - mcp_site_scanner.py", ctx["report_path"])
+        exit(0)
     # if target provided, run one-off scan and exit
     if args.target:
         print("Running oneoff scan of - mcp_site_scanner.py:378", args.target)
-        ctx = run_scan(args.target)
+        if args.site:
+            ctx = run_site_scan(args.target, max_depth=args.max_depth, max_pages=args.max_pages)
+        else:
+            ctx = run_scan(args.target)
         print("Summary: - mcp_site_scanner.py:380", json.dumps(ctx.get("summary", {}), indent=2))
-        print("Report written to - mcp_site_scanner.py:381", REPORT_FILE)
+        print("Report written to - mcp_site_scanner.py:381", ctx.get("report_path"), "(latest copy:", REPORT_FILE + ")")
         if args.once:
             exit(0)
     # otherwise run minimal HTTP tool server for MCP clients
@@ -0,0 +1,245 @@
+"""
+report_writer.py
+
+Streaming HTML report writer for mcp_site_scanner.
+
+ - every scan gets its own file (REPORT_<scan_id>.html under OUT_DIR), so
+   concurrent scans never overwrite each other
+ - rows are written to disk as results arrive; while the scan runs the file is
+   a readable "scan in progress" report that grows section by section
+ - finish() lays the streamed sections into the report template (a user
+   report_template.html or DEFAULT_TEMPLATE) by copying byte ranges in chunks,
+   so a 50k-link report renders with constant memory
+"""
+
+import json
+import os
+import re
+
+# {{KEY}} placeholders understood in report templates
+SECTION_PLACEHOLDERS = ("{{PAGES}}", "{{LINKS_TABLE}}", "{{FORMS}}", "{{ATTEMPTS}}")
+_PLACEHOLDER_RE = re.compile(r"(\{\{(?:PAGES|LINKS_TABLE|FORMS|ATTEMPTS)\}\})")
+
+DEFAULT_TEMPLATE = """
+        <!doctype html>
+        <html><head><meta charset="utf-8"><title>Scan Report - {{TARGET}}</title>
+        <style>body{font-family:sans-serif;padding:20px}table{border-collapse:collapse;width:100%}td,th{border:1px solid #ccc;padding:8px}</style>
+        </head><body>
+        <h1>Website Security Scan Report</h1>
+        <p>Target: {{TARGET}}</p>
+        <p>Report time: {{REPORT_DATE}}</p>
+        <h2>Summary</h2><pre>{{SUMMARY}}</pre>
+        <h2>Links</h2>{{LINKS_TABLE}}
+        <h2>Detected Forms</h2>{{FORMS}}
+        <h2>Add-member Attempts</h2>{{ATTEMPTS}}
+        </body></html>
+        """
+
+# site mode: same layout plus a per-page table
+SITE_TEMPLATE = DEFAULT_TEMPLATE.replace("<h2>Links</h2>", "<h2>Pages</h2>{{PAGES}}\n        <h2>Links</h2>")
+
+PAGES_TABLE_OPEN = "<table><thead><tr><th>Page</th><th>Depth</th><th>Code</th><th>Title</th><th>Links</th><th>Broken</th><th>Forms</th></tr></thead><tbody>"
+LINKS_TABLE_OPEN = "<table><thead><tr><th>Tag</th><th>URL</th><th>IP</th><th>Status</th><th>Code</th><th>Reason</th><th>Cache</th><th>Bytes</th></tr></thead><tbody>"
+FORMS_TABLE_OPEN = "<table><thead><tr><th>Action</th><th>Method</th><th>Inputs</th><th>Clue</th><th>Score</th></tr></thead><tbody>"
+ATTEMPTS_TABLE_OPEN = "<table><thead><tr><th>Form Action</th><th>Method</th><th>Payload</th><th>Result</th><th>Response Code</th></tr></thead><tbody>"
+TABLE_CLOSE = "</tbody></table>"
+NO_FORMS = "<p>No forms detected.</p>"
+NO_ATTEMPTS = "<p>No attempts performed.</p>"
+NO_PAGES = "<p>No pages crawled.</p>"
+
+FLUSH_EVERY = 100  # rows between flushes of the partial report
+COPY_CHUNK = 1 << 16
+
+# row renderers ---------------------------------------------------------------
+
+def page_row_html(p):
+    return f"<tr><td><a href=\"{p.get('url')}\" target=_blank>{p.get('url')}</a></td><td>{p.get('depth')}</td><td>{p.get('code') or p.get('error') or ''}</td><td>{p.get('title') or ''}</td><td>{p.get('links', 0)}</td><td>{p.get('broken_links', 0)}</td><td>{p.get('forms', 0)}</td></tr>"
+
+def link_row_html(r):
+    return f"<tr><td>{r.get('tag')}</td><td><a href=\"{r.get('url')}\" target=_blank>{r.get('url')}</a></td><td>{r.get('ip') or ''}</td><td>{r.get('status')}</td><td>{r.get('code') or ''}</td><td>{r.get('reason') or ''}</td><td>{r.get('cache') or ''}</td><td>{r.get('bytes', '')}</td></tr>"
+
+def form_row_html(f):
+    inputs = ", ".join([i["name"] for i in f.get("inputs", [])])
+    return f"<tr><td>{f.get('action')}</td><td>{f.get('method')}</td><td>{inputs}</td><td>{f.get('clue')}</td><td>{f.get('score')}</td></tr>"
+
+def attempt_row_html(a):
+    rows = []
+    rows.append("<tr>")
+    rows.append(f"<td>{a.get('action')}</td>")
+    rows.append(f"<td>{a.get('method')}</td>")
+    rows.append(f"<td><pre>{json.dumps(a.get('payload', {}), indent=2)}</pre></td>")
+    rows.append(f"<td>{a.get('result')}</td>")
+    rows.append(f"<td>{a.get('code') or ''}</td>")
+    rows.append("</tr>")
+    return "\n".join(rows)
+
+# whole-table renderers (kept for callers that already hold every row) --------
+
+def pages_table_html(pages):
+    if not pages:
+        return NO_PAGES
+    rows = [PAGES_TABLE_OPEN]
+    rows.extend(page_row_html(p) for p in pages)
+    rows.append(TABLE_CLOSE)
+    return "\n".join(rows)
+
+def links_table_html(link_results):
+    rows = [LINKS_TABLE_OPEN]
+    rows.extend(link_row_html(r) for r in link_results)
+    rows.append(TABLE_CLOSE)
+    return "\n".join(rows)
+
+def forms_table_html(forms):
+    if not forms:
+        return NO_FORMS
+    rows = [FORMS_TABLE_OPEN]
+    rows.extend(form_row_html(f) for f in forms)
+    rows.append(TABLE_CLOSE)
+    return "\n".join(rows)
+
+def attempts_table_html(attempts):
+    if not attempts:
+        return NO_ATTEMPTS
+    rows = [ATTEMPTS_TABLE_OPEN]
+    rows.extend(attempt_row_html(a) for a in attempts)
+    rows.append(TABLE_CLOSE)
+    return "\n".join(rows)
+
+# streaming writer ------------------------------------------------------------
+
+class ReportWriter:
+    """
+    Usage:
+        w = ReportWriter(path, ctx).start()
+        w.add_link(result) ...      # as results arrive, in report order
+        w.add_forms(forms); w.add_attempts(attempts)
+        w.finish(ctx)               # final report replaces the partial one
+    """
+
+    SECTIONS = (
+        ("{{PAGES}}", "Pages"),
+        ("{{LINKS_TABLE}}", "Links"),
+        ("{{FORMS}}", "Detected Forms"),
+        ("{{ATTEMPTS}}", "Add-member Attempts"),
+    )
+
+    def __init__(self, path, context, template=None):
+        self.path = path
+        self.context = context
+        self.template = template or DEFAULT_TEMPLATE
+        self.ranges = {}  # placeholder -> (start, end) byte offsets in the partial file
+        self._f = None
+        self._open = None  # placeholder of the section currently being written
+        self._rows = 0
+        self._has_rows = False
+
+    def start(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._f = open(self.path, "wb")
+        target = self.context.get("target_url", "")
+        self._write(
+            "<!doctype html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>Scan in progress - {target}</title>"
+            "<style>body{font-family:sans-serif;padding:20px}table{border-collapse:collapse;width:100%}td,th{border:1px solid #ccc;padding:8px}</style>"
+            "</head><body>\n<h1>Website Security Scan Report</h1>\n"
+            f"<p>Target: {target}</p>\n<p>Scan in progress - started {self.context.get('fetched_time', '')}</p>\n"
+        )
+        self._f.flush()
+        return self
+
+    # sections --------------------------------------------------------------
+
+    def _write(self, text):
+        self._f.write(text.encode("utf-8"))
+
+    def _begin(self, placeholder):
+        if placeholder in self.ranges or self._open == placeholder:
+            return
+        if self._open:
+            self._end()
+        heading = dict(self.SECTIONS)[placeholder]
+        self._write(f"<h2>{heading}</h2>\n")
+        self._open = placeholder
+        self._has_rows = False
+        self.ranges[placeholder] = (self._f.tell(), None)
+
+    def _end(self):
+        placeholder, self._open = self._open, None
+        if placeholder == "{{LINKS_TABLE}}":
+            self._write((LINKS_TABLE_OPEN + "\n" if not self._has_rows else "") + TABLE_CLOSE)
+        elif placeholder == "{{FORMS}}":
+            self._write(TABLE_CLOSE if self._has_rows else NO_FORMS)
+        elif placeholder == "{{ATTEMPTS}}":
+            self._write(TABLE_CLOSE if self._has_rows else NO_ATTEMPTS)
+        elif placeholder == "{{PAGES}}":
+            self._write(TABLE_CLOSE if self._has_rows else NO_PAGES)
+        self.ranges[placeholder] = (self.ranges[placeholder][0], self._f.tell())
+        self._write("\n")
+        self._f.flush()
+
+    def _row(self, placeholder, table_open, row_html):
+        self._begin(placeholder)
+        if self._open != placeholder:
+            raise ValueError(f"section {placeholder} is already closed")
+        self._write((row_html + "\n") if self._has_rows else (table_open + "\n" + row_html + "\n"))
+        self._has_rows = True
+        self._rows += 1
+        if self._rows % FLUSH_EVERY == 0:
+            self._f.flush()
+
+    def add_link(self, result):
+        self._row("{{LINKS_TABLE}}", LINKS_TABLE_OPEN, link_row_html(result))
+
+    def add_forms(self, forms):
+        self._begin("{{FORMS}}")
+        for f in forms:
+            self._row("{{FORMS}}", FORMS_TABLE_OPEN, form_row_html(f))
+
+    def add_pages(self, pages):
+        self._begin("{{PAGES}}")
+        for p in pages:
+            self._row("{{PAGES}}", PAGES_TABLE_OPEN, page_row_html(p))
+
+    def add_attempts(self, attempts):
+        self._begin("{{ATTEMPTS}}")
+        for a in attempts:
+            self._row("{{ATTEMPTS}}", ATTEMPTS_TABLE_OPEN, attempt_row_html(a))
+
+    # final document ----------------------------------------------------------
+
+    def finish(self, context=None):
+        """Close open sections and write the final report over the partial one."""
+        context = context or self.context
+        for placeholder, _ in self.SECTIONS:
+            if placeholder in self.template:
+                self._begin(placeholder)
+        if self._open:
+            self._end()
+        self._write("</body></html>\n")
+        self._f.close()
+
+        replacements = {
+            "{{TARGET}}": context.get("target_url", ""),
+            "{{REPORT_DATE}}": context.get("fetched_time", ""),
+            "{{SUMMARY}}": json.dumps(context.get("summary", {}), indent=2),
+        }
+        tmp = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp, "wb") as out:
+            for part in _PLACEHOLDER_RE.split(self.template):
+                if part in SECTION_PLACEHOLDERS:
+                    start, end = self.ranges[part]
+                    src.seek(start)
+                    remaining = end - start
+                    while remaining > 0:
+                        chunk = src.read(min(COPY_CHUNK, remaining))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        remaining -= len(chunk)
+                    continue
+                for k, v in replacements.items():
+                    part = part.replace(k, v)
+                out.write(part.encode("utf-8"))
+        os.replace(tmp, self.path)
+        return self.path
@@ -0,0 +1,200 @@
+"""
+scan_jobs.py
+
+Background job queue for /mcp/scrape.
+
+ - submit() puts a job on a bounded queue and returns immediately
+ - a fixed pool of worker threads runs the scans (runner is injected, normally
+   mcp_site_scanner.run_scan wrapped by the caller)
+ - jobs expose status, progress counters, cancellation and the final summary
+ - a full queue raises QueueFull so the HTTP layer can answer 429
+
+Tuning (env):
+  SCAN_WORKERS       concurrent scans                  (default 2)
+  SCAN_QUEUE_DEPTH   queued scans before 429           (default 16)
+  SCAN_JOB_HISTORY   finished jobs kept for polling    (default 200)
+"""
+
+import datetime
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+
+DEFAULT_WORKERS = int(os.environ.get("SCAN_WORKERS", "2"))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("SCAN_QUEUE_DEPTH", "16"))
+DEFAULT_HISTORY = int(os.environ.get("SCAN_JOB_HISTORY", "200"))
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the job queue is at capacity."""
+
+
+class ScanCancelled(Exception):
+    """Raised inside a running scan once its job has been cancelled."""
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat() + "Z"
+
+
+class ScanJob:
+    """One queued/running/finished scan. Also acts as the scan's progress sink."""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.state = "queued"
+        self.progress = {"phase": "queued"}
+        self.summary = None
+        self.report_path = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def update(self, **counters):
+        with self._lock:
+            self.progress.update(counters)
+
+    def tick(self, key, n=1):
+        with self._lock:
+            self.progress[key] = self.progress.get(key, 0) + n
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "state": self.state,
+                "kind": self.params.get("kind", "scan"),
+                "target": self.params.get("target"),
+                "progress": dict(self.progress),
+                "summary": self.summary,
+                "report_path": self.report_path,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class ChildProgress:
+    """
+    Progress sink for one scan inside a batch job: shares the parent's cancel
+    flag and counters (links_checked adds up across targets) but keeps its
+    phase to itself, since several targets run at once.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.phase = None
+
+    @property
+    def cancelled(self):
+        return self.parent.cancelled
+
+    def update(self, phase=None, **counters):
+        if phase:
+            self.phase = phase
+
+    def tick(self, key, n=1):
+        self.parent.tick(key, n)
+
+
+class ScanJobManager:
+    """Bounded queue + worker pool. runner(job) must return the scan ctx dict."""
+
+    def __init__(self, runner, workers=DEFAULT_WORKERS, queue_depth=DEFAULT_QUEUE_DEPTH, history=DEFAULT_HISTORY):
+        self.runner = runner
+        self.workers = max(1, int(workers))
+        self.history = history
+        self._queue = queue.Queue(maxsize=max(1, int(queue_depth)))
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _start(self):
+        # workers are started lazily so CLI one-off scans never spawn them
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"scan-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, **params):
+        self._start()
+        job = ScanJob(params)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(f"scan queue is full ({self._queue.maxsize} jobs waiting)")
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        with job._lock:
+            if job.state == "queued":
+                job.state = "cancelled"
+                job.finished_at = _now()
+        return job
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _trim(self):
+        # drop the oldest finished jobs beyond the history bound
+        finished = [j for j in self._jobs.values() if j.state in FINISHED]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                with job._lock:
+                    job.state = "running"
+                    job.started_at = _now()
+                try:
+                    ctx = self.runner(job)
+                    state, error = "done", None
+                except ScanCancelled:
+                    ctx, state, error = None, "cancelled", None
+                except Exception as e:
+                    ctx, state, error = None, "failed", f"{type(e).__name__}: {e}"
+                with job._lock:
+                    job.state = state
+                    job.error = error
+                    job.finished_at = _now()
+                    if ctx:
+                        job.summary = ctx.get("summary")
+                        job.report_path = ctx.get("report_path")
+                    job.progress["phase"] = state
+            finally:
+                self._queue.task_done()
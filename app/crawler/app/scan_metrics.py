@@ -0,0 +1,174 @@
+"""
+scan_metrics.py
+
+Per-phase timers and counters for mcp_site_scanner, plus a process-wide
+registry rendered in the Prometheus text format for GET /metrics.
+
+ - phases: fetch, parse, crawl (site mode), link_check, form_probe, render
+ - every scan gets a ScanTimer: `with timer.phase("fetch"): ...` adds wall time
+   to that phase (thread-safe, so concurrent page fetches add up), and counters
+   track links checked, bytes fetched and errors by class
+ - timer.as_dict() is what lands in the scan summary under "metrics"
+ - timer.record(mode, outcome) feeds the scan into REGISTRY: phase and scan
+   latency histograms and running totals
+
+No prometheus_client dependency: the exposition format is a few lines of text.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds; phases range from sub-millisecond parses to multi-minute site crawls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+def error_class(result):
+    """Error bucket for a link result: exception class name, HTTP_4xx / HTTP_5xx, or None."""
+    if result.get("status") == "error":
+        return result.get("error") or "Exception"
+    code = result.get("code")
+    if result.get("status") == "broken" and code:
+        return f"HTTP_{code // 100}xx"
+    return None
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name, **labels):
+        for bound, n in zip(self.buckets, self.counts):
+            yield f"{name}_bucket{_labels(le=bound, **labels)} {n}"
+        yield f"{name}_bucket{_labels(le='+Inf', **labels)} {self.count}"
+        yield f"{name}_sum{_labels(**labels)} {self.sum:.6f}"
+        yield f"{name}_count{_labels(**labels)} {self.count}"
+
+
+class MetricsRegistry:
+    """Process-wide totals since start-up; render() gives Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phase_seconds = {}  # phase -> Histogram
+        self.scan_seconds = {}   # mode -> Histogram
+        self.scans = {}          # (mode, outcome) -> n
+        self.counters = {}       # counter name -> n
+        self.errors = {}         # error class -> n
+
+    def record(self, timer, mode, outcome):
+        with self._lock:
+            for phase, seconds in timer.phases.items():
+                self.phase_seconds.setdefault(phase, Histogram()).observe(seconds)
+            self.scan_seconds.setdefault(mode, Histogram()).observe(timer.elapsed())
+            self.scans[(mode, outcome)] = self.scans.get((mode, outcome), 0) + 1
+            for name, n in timer.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for cls, n in timer.errors.items():
+                self.errors[cls] = self.errors.get(cls, 0) + n
+
+    def render(self, gauges=None):
+        out = []
+        with self._lock:
+            out.append("# HELP mcp_scan_phase_seconds Wall time spent per scan phase.")
+            out.append("# TYPE mcp_scan_phase_seconds histogram")
+            for phase, h in sorted(self.phase_seconds.items()):
+                out.extend(h.lines("mcp_scan_phase_seconds", phase=phase))
+            out.append("# HELP mcp_scan_duration_seconds Wall time of whole scans.")
+            out.append("# TYPE mcp_scan_duration_seconds histogram")
+            for mode, h in sorted(self.scan_seconds.items()):
+                out.extend(h.lines("mcp_scan_duration_seconds", mode=mode))
+            out.append("# HELP mcp_scans_total Scans finished, by mode and outcome.")
+            out.append("# TYPE mcp_scans_total counter")
+            for (mode, outcome), n in sorted(self.scans.items()):
+                out.append(f"mcp_scans_total{_labels(mode=mode, outcome=outcome)} {n}")
+            for name, n in sorted(self.counters.items()):
+                out.append(f"# TYPE mcp_{name}_total counter")
+                out.append(f"mcp_{name}_total {n}")
+            out.append("# HELP mcp_scan_errors_total Failed fetches and link checks, by error class.")
+            out.append("# TYPE mcp_scan_errors_total counter")
+            for cls, n in sorted(self.errors.items()):
+                out.append(f"mcp_scan_errors_total{_labels(error_class=cls)} {n}")
+        for name, value in sorted((gauges or {}).items()):
+            out.append(f"# TYPE mcp_{name} gauge")
+            out.append(f"mcp_{name} {value}")
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class ScanTimer:
+    """Timers and counters for one scan."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.phases = {}
+        self.counters = {"links_checked": 0, "bytes_fetched": 0, "pages_fetched": 0}
+        self.errors = {}
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def error(self, cls, n=1):
+        with self._lock:
+            self.errors[cls] = self.errors.get(cls, 0) + n
+
+    def count_links(self, link_results):
+        """links_checked, link bytes and error classes from LinkChecker results."""
+        checked = 0
+        for r in link_results:
+            if r.get("status") == "skipped":
+                continue
+            checked += 1
+            self.count("bytes_fetched", r.get("bytes") or 0)
+            cls = error_class(r)
+            if cls:
+                self.error(cls)
+        self.count("links_checked", checked)
+
+    def elapsed(self):
+        return time.perf_counter() - self._t0
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "phase_seconds": {k: round(v, 4) for k, v in self.phases.items()},
+                "total_seconds": round(self.elapsed(), 4),
+                **self.counters,
+                "errors": dict(self.errors),
+            }
+
+    def record(self, mode, outcome, registry=None):
+        (registry or REGISTRY).record(self, mode, outcome)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: three BeautifulSoup parses per page (title + extract_links +
+find_possible_member_forms) versus a single analyze_page() pass.
+
+  python tests/bench/bench_page_analysis.py --sizes 1000 10000 50000 --repeat 3
+
+Pages are synthetic: N anchors plus a proportional number of images, scripts,
+stylesheets and forms. Reports wall time and peak traced memory per strategy.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app")))
+
+from bs4 import BeautifulSoup  # noqa: E402
+import mcp_site_scanner as scanner  # noqa: E402
+
+BASE = "https://bench.example.com/"
+
+
+def synthetic_page(n_links):
+    parts = ["<html><head><title>Bench page</title>",
+             '<meta name="description" content="synthetic"><meta name="robots" content="index">']
+    parts += [f'<link rel="stylesheet" href="/css/{i}.css">' for i in range(n_links // 50)]
+    parts += [f'<script src="https://cdn.example.net/js/{i}.js"></script>' for i in range(n_links // 50)]
+    parts.append("</head><body>")
+    for i in range(n_links):
+        parts.append(f'<p>Item {i} <a href="/page/{i}?ref=nav">link {i}</a> <img src="/img/{i % 500}.png"></p>')
+        if i % 500 == 0:
+            parts.append(f'<form action="/join/{i}" method="post"><label>Join</label>'
+                         '<input name="email" type="email"><input name="name"><textarea name="bio"></textarea></form>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def three_parses(html):
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.title.string.strip() if soup.title and soup.title.string else ""
+    links = scanner.extract_links(BASE, html)
+    forms = scanner.find_possible_member_forms(BASE, html)
+    return title, links, forms
+
+
+def single_pass(html):
+    page = scanner.analyze_page(BASE, html)
+    return page["title"], page["links"], page["forms"]
+
+
+def measure(fn, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'links':>8} {'page MB':>8} {'3-parse s':>10} {'1-pass s':>10} {'speedup':>8} {'3-parse MB':>11} {'1-pass MB':>10}")
+    for n in args.sizes:
+        html = synthetic_page(n)
+        assert three_parses(html) == single_pass(html), "strategies disagree"
+        t3, m3 = measure(three_parses, html, args.repeat)
+        t1, m1 = measure(single_pass, html, args.repeat)
+        print(f"{n:>8} {len(html) / 1e6:>8.2f} {t3:>10.3f} {t1:>10.3f} {t3 / t1:>7.2f}x {m3 / 1e6:>11.1f} {m1 / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# scanner modules live next to mcp_site_scanner.py, not in a package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app")))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Tiny site: /ok -> 200, /missing -> 404, /busy -> 503, /nohead -> 405 on HEAD but 200 on GET
+    (/nohead/big with a 2 MB body),
+    /etag -> 200 with ETag "v1" (304 when revalidated with it), /page -> HTML linking to the rest,
+    /site/... -> a small three-page site that shares assets between pages."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, body=b"hello"):
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client hung up after the headers (streamed checks do this on purpose)
+
+    def do_HEAD(self):
+        if self.path.startswith("/nohead"):
+            self.server.hits.append((self.command, self.path))
+            return self._reply(405)
+        self.do_GET()
+
+    def do_GET(self):
+        self.server.hits.append((self.command, self.path))
+        if self.path.startswith("/missing"):
+            return self._reply(404)
+        if self.path.startswith("/busy"):
+            return self._reply(503)
+        if self.path.startswith("/nohead/big"):
+            return self._reply(200, b"x" * (2 << 20))
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._reply(304, b"")
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/page"):
+            return self._reply(200, PAGE_HTML)
+        if self.path in SITE_PAGES:
+            return self._reply(200, SITE_PAGES[self.path])
+        self._reply(200)
+
+
+PAGE_HTML = (b"<html><head><title>Local page</title></head><body>"
+             b"<a href='/ok'>ok</a><a href='/missing'>missing</a><img src='/nohead.png'>"
+             b"<form action='/join' method='post'>Join<input name='email'></form></body></html>")
+
+
+SITE_PAGES = {
+    "/site/": b"<html><title>Home</title><a href='/site/a'>a</a><a href='/site/b#top'>b</a>"
+              b"<img src='/ok.png'><a href='http://127.0.0.1:9/elsewhere'>out</a></html>",
+    "/site/a": b"<html><title>A</title><a href='/site/'>home</a><a href='/site/deep'>deep</a>"
+               b"<img src='/ok.png'><img src='/missing.png'></html>",
+    "/site/b": b"<html><title>B</title><form action='/signup'>Join<input name='email'></form>"
+               b"<img src='/ok.png'></html>",
+    "/site/deep": b"<html><title>Deep</title></html>",
+}
+
+
+class LocalSite(str):
+    """Base URL of the running test site; .hits lists (method, path) served."""
+
+    def __new__(cls, base, hits):
+        obj = super().__new__(cls, base)
+        obj.hits = hits
+        return obj
+
+
+@pytest.fixture
+def isolated_scanner(monkeypatch, tmp_path):
+    """The scanner writing into tmp_path, with a fresh link checker and metrics registry."""
+    import mcp_site_scanner as scanner
+    import scan_metrics
+    from link_checker import LinkChecker
+
+    monkeypatch.setattr(scanner, "OUT_DIR", str(tmp_path))
+    monkeypatch.setattr(scanner, "REPORT_FILE", str(tmp_path / "report.html"))
+    monkeypatch.setattr(scanner, "_link_checker", LinkChecker())
+    registry = scan_metrics.MetricsRegistry()
+    monkeypatch.setattr(scan_metrics, "REGISTRY", registry)
+    monkeypatch.setattr(scanner, "REGISTRY", registry)
+    return scanner
+
+
+@pytest.fixture
+def local_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.hits = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield LocalSite(f"http://127.0.0.1:{server.server_address[1]}", server.hits)
+    finally:
+        server.shutdown()
+        server.server_close()
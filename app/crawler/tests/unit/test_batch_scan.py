@@ -0,0 +1,33 @@
+import json
+
+import mcp_site_scanner as scanner
+from link_checker import LinkChecker, LinkMemo
+
+
+def test_memo_checks_each_url_once_across_callers(local_site):
+    checker, memo = LinkChecker(), LinkMemo()
+    links = [{"tag": "img", "raw": "/ok.png", "url": local_site + "/ok.png"}]
+    first = checker.check(links, memo=memo)[0]
+    second = checker.check(links, memo=memo)[0]
+    assert first["status"] == second["status"] == "ok"
+    assert second["cache"] == "batch"
+    assert [h for h in local_site.hits if h[1] == "/ok.png"] == [("HEAD", "/ok.png")]
+    assert memo.unique() == 1 and memo.hits == 1
+
+
+def test_batch_scan_reports_each_target_and_shares_links(isolated_scanner, local_site):
+    targets = [local_site + "/site/a", local_site + "/site/b", local_site + "/site/a", "http://127.0.0.1:9/down"]
+    ctx = scanner.run_batch_scan(targets, try_add_member=False, workers=2)
+    summary = ctx["summary"]
+    assert summary["targets"] == 3  # duplicate target dropped
+    assert [t["target"] for t in ctx["targets"]] == [local_site + "/site/a", local_site + "/site/b", "http://127.0.0.1:9/down"]
+    # /ok.png is on both pages but checked once for the batch
+    assert [h for h in local_site.hits if h[1] == "/ok.png"] == [("HEAD", "/ok.png")]
+    assert summary["cross_target_checks_avoided"] >= 1
+    assert summary["unique_links_checked"] < summary["links_checked"]
+    assert summary["links_per_second"] > 0
+    for t in ctx["targets"]:
+        with open(t["report_path"], encoding="utf-8") as f:
+            assert t["target"] in f.read()
+    with open(ctx["report_path"], encoding="utf-8") as f:
+        assert json.load(f)["summary"] == summary
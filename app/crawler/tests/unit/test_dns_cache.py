@@ -0,0 +1,86 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import dns_cache
+from dns_cache import DNSCache
+from link_checker import LinkChecker
+
+
+def test_resolve_is_cached_and_single_flight(monkeypatch):
+    calls = []
+
+    def slow_query(host):
+        calls.append(host)
+        time.sleep(0.05)
+        return "10.0.0.7"
+
+    cache = DNSCache(ttl=60)
+    monkeypatch.setattr(cache, "_query", slow_query)
+    threads = [threading.Thread(target=cache.resolve, args=("Example.COM",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.resolve("example.com") == "10.0.0.7"
+    assert calls == ["example.com"]
+    assert cache.lookup("example.com") == "10.0.0.7"
+
+
+def test_failures_are_negatively_cached_and_expire(monkeypatch):
+    cache = DNSCache(ttl=60, negative_ttl=0)
+
+    def fail(host):
+        raise OSError("nxdomain")
+
+    monkeypatch.setattr(cache, "_query", fail)
+    assert cache.resolve("nope.invalid") is None
+    monkeypatch.setattr(cache, "_query", lambda host: "10.0.0.8")
+    assert cache.resolve("nope.invalid") == "10.0.0.8"
+
+
+def test_prefetch_and_link_results_carry_ip(local_site):
+    cache = DNSCache()
+    assert cache.prefetch(["localhost", "127.0.0.1", None])["127.0.0.1"] == "127.0.0.1"
+    results = LinkChecker(resolver=cache).check([{"tag": "a", "raw": "/ok", "url": local_site + "/ok"}])
+    assert results[0]["ip"] == "127.0.0.1"
+
+
+def test_installed_hook_connects_through_cache(local_site, monkeypatch):
+    import requests
+
+    cache = DNSCache()
+    monkeypatch.setattr(cache, "_query", lambda host: "127.0.0.1")
+    monkeypatch.setattr(dns_cache, "_installed", False)
+    from urllib3.util import connection
+    monkeypatch.setattr(connection, "create_connection", connection.create_connection)
+    dns_cache.install(cache)
+    port = local_site.rsplit(":", 1)[1]
+    assert requests.get(f"http://scanner-test.invalid:{port}/ok", timeout=5).status_code == 200
+    assert cache.lookup("scanner-test.invalid") == "127.0.0.1"
+
+
+def test_installed_hook_falls_back_past_a_dead_address(local_site, monkeypatch):
+    import requests
+
+    cache = DNSCache()
+    # 127.0.0.2 has nothing listening: the first record is dead, the second serves
+    monkeypatch.setattr(cache, "_query", lambda host: ["127.0.0.2", "127.0.0.1"])
+    monkeypatch.setattr(dns_cache, "_installed", False)
+    from urllib3.util import connection
+    monkeypatch.setattr(connection, "create_connection", connection.create_connection)
+    dns_cache.install(cache)
+    port = local_site.rsplit(":", 1)[1]
+    assert requests.get(f"http://two-records.invalid:{port}/ok", timeout=5).status_code == 200
+    assert cache.lookup_all("two-records.invalid") == ["127.0.0.1", "127.0.0.2"]  # dead one demoted
+
+
+def test_api_copy_is_identical():
+    # the API ships its own copy (utils/dns_cache.py); the two must not drift apart
+    here = Path(dns_cache.__file__)
+    api_copy = here.parents[2] / "API" / "app" / "cmd" / "utils" / "dns_cache.py"
+    if not api_copy.exists():
+        pytest.skip("API tree not present")
+    assert api_copy.read_text() == here.read_text()
@@ -0,0 +1,51 @@
+import time
+
+from link_cache import LinkCache
+from link_checker import LinkChecker
+
+
+def test_fresh_entries_are_served_without_network(tmp_path, local_site):
+    cache = LinkCache(str(tmp_path / "links.sqlite3"))
+    checker = LinkChecker(cache=cache)
+    links = [{"tag": "a", "raw": "/ok", "url": local_site + "/ok"}]
+    first = checker.check(links)
+    served = len(local_site.hits)
+    second = checker.check(links)
+    assert first[0]["cache"] == "miss"
+    assert second[0]["cache"] == "hit"
+    assert second[0]["status"] == "ok" and second[0]["code"] == 200
+    assert len(local_site.hits) == served
+
+
+def test_stale_entries_revalidate_with_etag(tmp_path, local_site):
+    cache = LinkCache(str(tmp_path / "links.sqlite3"), ttl=0)
+    checker = LinkChecker(cache=cache)
+    links = [{"tag": "img", "raw": "/etag", "url": local_site + "/etag"}]
+    assert checker.check(links)[0]["cache"] == "miss"
+    again = checker.check(links)[0]
+    assert again["cache"] == "revalidated"
+    assert again["status"] == "ok" and again["code"] == 200
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = LinkCache(str(tmp_path / "links.sqlite3"), max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.put(f"https://x.test/{name}", "ok", 200, None)
+        time.sleep(0.01)
+    cache.get("https://x.test/a")  # touch: "b" is now the oldest
+    assert cache.prune() == 1
+    assert cache.get("https://x.test/b") is None
+    assert cache.get("https://x.test/a") is not None
+    assert cache.count() == 2
+
+
+def test_transient_failures_are_not_cached(tmp_path, local_site):
+    cache = LinkCache(str(tmp_path / "links.sqlite3"))
+    checker = LinkChecker(cache=cache)
+    links = [{"tag": "a", "raw": "/busy", "url": local_site + "/busy"},
+             {"tag": "a", "raw": "/missing", "url": local_site + "/missing"}]
+    checker.check(links)
+    again = checker.check(links)
+    assert again[0]["status"] == "broken" and again[0]["cache"] == "miss"  # 503: asked again
+    assert again[1]["cache"] == "hit"  # 404 is definitive
+    assert cache.get(local_site + "/busy") is None
@@ -0,0 +1,41 @@
+from link_checker import LinkChecker
+
+
+def _links(base, paths):
+    return [{"tag": "a", "raw": p, "url": base + p if p.startswith("/") else p} for p in paths]
+
+
+def test_results_keep_input_order_and_fields(local_site):
+    paths = ["/ok", "/missing", "mailto:team@example.com", "/nohead"] + [f"/ok?n={i}" for i in range(20)]
+    checker = LinkChecker(max_workers=8, per_host=3)
+    results = checker.check(_links(local_site, paths))
+    assert [r["raw"] for r in results] == paths
+    assert results[0]["status"] == "ok" and results[0]["code"] == 200
+    assert results[1]["status"] == "broken" and results[1]["reason"] == "404"
+    assert results[2]["status"] == "skipped" and results[2]["code"] is None
+    # HEAD rejected with 405 falls back to GET
+    assert results[3]["status"] == "ok" and results[3]["code"] == 200
+
+
+def test_max_checks_counts_only_http_links(local_site):
+    paths = ["/ok", "javascript:void(0)", "/missing", "/ok?x=1"]
+    results = LinkChecker().check(_links(local_site, paths), max_checks=2)
+    assert [r["raw"] for r in results] == paths[:3]
+
+
+def test_connection_errors_are_reported():
+    results = LinkChecker(timeout=2).check([{"tag": "a", "raw": "x", "url": "http://127.0.0.1:9/"}])
+    assert results[0]["status"] == "error"
+    assert results[0]["reason"]
+
+
+def test_head_fallback_skips_bodies_and_remembers_host(local_site):
+    checker = LinkChecker()
+    first = checker.check(_links(local_site, ["/nohead/big"]))[0]
+    assert first["status"] == "ok" and first["code"] == 200
+    assert first["bytes"] < 4096  # headers only, not the 2 MB body
+    assert checker.head_rejecting_hosts() == [local_site.split("//")[1]]
+
+    local_site.hits.clear()
+    checker.check(_links(local_site, ["/nohead/again"]))
+    assert local_site.hits == [("GET", "/nohead/again")]
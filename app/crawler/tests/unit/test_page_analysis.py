@@ -0,0 +1,25 @@
+import mcp_site_scanner as scanner
+
+PAGE = """<html><head><title> Members </title>
+<meta name="description" content="club site"><link rel="icon" href="/favicon.ico">
+<script src="/app.js"></script></head>
+<body><a href="/about">About</a><img src="/logo.png"><a href="/about">dup</a>
+<form action="/search"><input name="q"></form>
+<form action="/join" method="POST">Join us<input name="email"><select name="plan"></select></form>
+<a href="mailto:hi@example.com">mail</a></body></html>"""
+
+
+def test_analyze_page_matches_individual_helpers():
+    base = "https://club.example.com/"
+    page = scanner.analyze_page(base, PAGE)
+    assert page["links"] == scanner.extract_links(base, PAGE)
+    assert page["forms"] == scanner.find_possible_member_forms(base, PAGE)
+    assert page["title"] == "Members"
+    assert page["meta"] == {"description": "club site", "keywords": "", "robots": ""}
+
+
+def test_links_keep_tag_grouped_order():
+    page = scanner.analyze_page("https://club.example.com/", PAGE)
+    assert [l["tag"] for l in page["links"]] == ["a", "a", "link", "img", "script"]
+    assert page["forms"][0]["action"] == "/join"
+    assert page["forms"][0]["method"] == "post"
@@ -0,0 +1,62 @@
+import os
+
+import mcp_site_scanner as scanner
+from link_checker import LinkChecker
+from report_writer import (DEFAULT_TEMPLATE, ReportWriter, attempts_table_html,
+                           forms_table_html, links_table_html)
+
+
+def _ctx():
+    return {"target_url": "https://example.com", "fetched_time": "2025-10-15T10:00:00Z",
+            "summary": {"total_links": 2}}
+
+
+def test_final_report_matches_whole_document_rendering(tmp_path):
+    links = [{"tag": "a", "url": f"https://example.com/{i}", "status": "ok", "code": 200} for i in range(3)]
+    forms = [{"action": "/join", "method": "post", "inputs": [{"name": "email"}], "clue": True, "score": 4}]
+    path = str(tmp_path / "REPORT_x.html")
+    w = ReportWriter(path, _ctx()).start()
+    for r in links:
+        w.add_link(r)
+    w.add_forms(forms)
+    w.add_attempts([])
+    w.finish()
+
+    expected = DEFAULT_TEMPLATE
+    for k, v in {"{{TARGET}}": "https://example.com", "{{REPORT_DATE}}": "2025-10-15T10:00:00Z",
+                 "{{SUMMARY}}": '{\n  "total_links": 2\n}', "{{LINKS_TABLE}}": links_table_html(links),
+                 "{{FORMS}}": forms_table_html(forms), "{{ATTEMPTS}}": attempts_table_html([])}.items():
+        expected = expected.replace(k, v)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == expected
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_partial_report_is_readable_while_streaming(tmp_path):
+    path = str(tmp_path / "REPORT_y.html")
+    w = ReportWriter(path, _ctx(), template="<h1>{{TARGET}}</h1>{{ATTEMPTS}}|{{LINKS_TABLE}}").start()
+    for i in range(250):
+        w.add_link({"tag": "img", "url": f"https://example.com/{i}.png", "status": "ok", "code": 200})
+    with open(path, encoding="utf-8") as f:
+        partial = f.read()
+    assert "Scan in progress" in partial
+    assert "https://example.com/199.png" in partial
+    w.finish()
+    with open(path, encoding="utf-8") as f:
+        final = f.read()
+    assert final.startswith("<h1>https://example.com</h1><p>No attempts performed.</p>|<table>")
+    assert final.count("<tr><td>img</td>") == 250
+
+
+def test_run_scan_writes_per_scan_reports(tmp_path, monkeypatch, local_site):
+    monkeypatch.setattr(scanner, "OUT_DIR", str(tmp_path))
+    monkeypatch.setattr(scanner, "REPORT_FILE", str(tmp_path / "report.html"))
+    monkeypatch.setattr(scanner, "_link_checker", LinkChecker())
+    first = scanner.run_scan(local_site + "/page", try_add_member=False)
+    second = scanner.run_scan(local_site + "/page", try_add_member=False)
+    assert first["report_path"] != second["report_path"]
+    for ctx in (first, second):
+        assert os.path.exists(ctx["report_path"])
+    assert first["summary"]["broken_links"] == 1
+    with open(tmp_path / "report.html", encoding="utf-8") as f, open(second["report_path"], encoding="utf-8") as g:
+        assert f.read() == g.read()
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from scan_jobs import QueueFull, ScanCancelled, ScanJobManager
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in ("done", "failed", "cancelled") and time.time() < deadline:
+        time.sleep(0.01)
+    return job.state
+
+
+def test_job_runs_in_background_and_reports_summary():
+    def runner(job):
+        job.update(phase="links", links_checked=3)
+        return {"summary": {"total_links": 3}, "report_path": "reports/x.html"}
+
+    jobs = ScanJobManager(runner, workers=1, queue_depth=2)
+    job = jobs.submit(target="https://example.com")
+    assert _wait(job) == "done"
+    body = job.to_dict()
+    assert body["summary"] == {"total_links": 3}
+    assert body["report_path"] == "reports/x.html"
+    assert body["progress"]["links_checked"] == 3
+
+
+def test_full_queue_raises_and_cancel_stops_running_job():
+    release = threading.Event()
+
+    def runner(job):
+        release.wait(5)
+        if job.cancelled:
+            raise ScanCancelled("links")
+        return {"summary": {}}
+
+    jobs = ScanJobManager(runner, workers=1, queue_depth=1)
+    running = jobs.submit(target="https://a.example")
+    while running.state != "running":
+        time.sleep(0.01)
+    queued = jobs.submit(target="https://b.example")
+    with pytest.raises(QueueFull):
+        jobs.submit(target="https://c.example")
+
+    assert jobs.cancel(queued.id).state == "cancelled"
+    jobs.cancel(running.id)
+    release.set()
+    assert _wait(running) == "cancelled"
+    assert jobs.cancel("missing") is None
+
+
+def test_failed_runner_is_reported():
+    def runner(job):
+        raise RuntimeError("boom")
+
+    jobs = ScanJobManager(runner, workers=1)
+    job = jobs.submit(target="https://example.com")
+    assert _wait(job) == "failed"
+    assert "boom" in job.error
+
+
+def test_scrape_endpoint_queues_and_polls(monkeypatch):
+    import mcp_site_scanner as scanner
+
+    monkeypatch.setattr(scanner, "jobs", ScanJobManager(lambda job: {"summary": {"total_links": 0}}, workers=1))
+    client = scanner.app.test_client()
+    resp = client.post("/mcp/scrape", json={"target": "https://example.com"})
+    assert resp.status_code == 202
+    job_id = resp.get_json()["job_id"]
+    _wait(scanner.jobs.get(job_id))
+    status = client.get(f"/mcp/jobs/{job_id}").get_json()
+    assert status["state"] == "done"
+    assert client.get("/mcp/jobs/nope").status_code == 404
@@ -0,0 +1,52 @@
+import threading
+
+import mcp_site_scanner as scanner
+from scan_metrics import ScanTimer
+
+
+def test_scan_summary_has_phase_metrics(isolated_scanner, local_site):
+    metrics = scanner.run_scan(local_site + "/page", try_add_member=False)["summary"]["metrics"]
+    assert set(metrics["phase_seconds"]) == {"fetch", "parse", "link_check", "render"}
+    assert metrics["links_checked"] == 3 and metrics["pages_fetched"] == 1
+    assert metrics["bytes_fetched"] > 0
+    assert metrics["errors"] == {"HTTP_4xx": 1}
+    assert metrics["total_seconds"] >= sum(metrics["phase_seconds"].values()) * 0.99
+
+
+def test_fetch_errors_are_counted_by_class(isolated_scanner):
+    metrics = scanner.run_scan("http://127.0.0.1:9/", try_add_member=False)["summary"]["metrics"]
+    assert metrics["errors"] == {"ConnectionError": 1}
+
+
+def test_metrics_endpoint_renders_histograms(isolated_scanner, local_site):
+    scanner.run_scan(local_site + "/page", try_add_member=False)
+    body = scanner.app.test_client().get("/metrics").get_data(as_text=True)
+    assert '# TYPE mcp_scan_phase_seconds histogram' in body
+    assert 'mcp_scan_phase_seconds_count{phase="link_check"} 1' in body
+    assert 'mcp_scans_total{mode="page",outcome="done"} 1' in body
+    assert "mcp_links_checked_total 3" in body
+    assert 'mcp_scan_errors_total{error_class="HTTP_4xx"} 1' in body
+    assert "mcp_scan_queue_depth 0" in body
+
+
+def test_timer_phases_add_up_across_threads():
+    timer = ScanTimer()
+    start = threading.Barrier(8)
+
+    def work():
+        start.wait()  # all eight add at once
+        for _ in range(1000):
+            timer.add_time("fetch", 0.25)
+            timer.count("links_checked")
+        with timer.phase("parse"):
+            pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    summary = timer.as_dict()
+    assert summary["phase_seconds"]["fetch"] == 8 * 1000 * 0.25
+    assert summary["links_checked"] == 8000
+    assert "parse" in timer.phases
@@ -0,0 +1,23 @@
+import mcp_site_scanner as scanner
+
+
+def test_crawl_respects_depth_and_origin(isolated_scanner, local_site):
+    pages = scanner.crawl_site_pages(local_site + "/site/", max_depth=1, max_pages=10)
+    assert [p["url"] for p in pages] == [local_site + "/site/", local_site + "/site/a", local_site + "/site/b"]
+    assert scanner.crawl_site_pages(local_site + "/site/", max_depth=5, max_pages=2)[-1]["depth"] == 1
+
+
+def test_site_scan_checks_each_unique_link_once(isolated_scanner, local_site):
+    ctx = scanner.run_site_scan(local_site + "/site/", max_depth=2, max_pages=10, try_add_member=False)
+    summary = ctx["summary"]
+    assert summary["pages_scanned"] == 4
+    urls = [r["url"] for r in ctx["link_results"]]
+    assert len(urls) == len(set(urls)) == summary["total_links"]
+    assert urls.count(local_site + "/ok.png") == 1
+    assert summary["duplicate_link_checks_avoided"] > 0
+    assert summary["broken_links"] >= 1
+    page_a = next(p for p in ctx["pages"] if p["url"] == local_site + "/site/a")
+    assert page_a["broken_links"] == 1
+    assert ctx["forms"][0]["page"] == local_site + "/site/b"
+    with open(ctx["report_path"], encoding="utf-8") as f:
+        assert "<h2>Pages</h2>" in f.read()
@@ -1,61 +1,52 @@
-
-
-Light Bible notes for the crawler.
 """
+Light Bible notes for the crawler.
+
 BOOK: SEA-SEC Scroll of Crawl
 
 CHAPTER 1: Purpose
   V1  Walk pages starting from a URL.
   V2  Save basic facts: url, http status, size in bytes.
   V3  Keep it gentle so we don't hammer the site.
+  V4  The walk itself lives in crawl_engine (shared with the other crawlers);
+      this scroll only asks it for the status and size of each page.
+  V5  Sizes are counted as the bytes stream past; a big download is never held
+      in memory (a Content-Length is taken at its word without downloading).
 
 CHAPTER 2: Settings
   V1  MAX_PAGES = safety cap.
   V2  SAME_HOST_ONLY = stay on the same domain if True.
+  V3  CRAWL_CONCURRENCY / CRAWL_HOST_RATE / CRAWL_HOST_BURST / CRAWL_TIMEOUT
+      are read by crawl_engine: pages in flight, and the gentle per-host gate.
+  V4  CRAWL_MAX_BODY = most bytes of one page kept (HTML) or counted (anything else).
 """
 
 import os
-from collections import deque
-from urllib.parse import urljoin, urldefrag, urlparse
 
-import requests
-from bs4 import BeautifulSoup
+from app.services.crawl_engine import PageStats, normalize  # noqa: F401 (normalize kept for callers)
+from app.services.crawl_engine import crawl as engine_crawl, crawl_async as engine_crawl_async
 
 MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
 SAME_HOST_ONLY = os.getenv("CRAWL_SAME_HOST_ONLY", "true").lower() == "true"
 
-def normalize(u: str) -> str:
-    # CHAPTER 3, V1: Remove #fragments; trim spaces; keep clean links.
-    return urldefrag(u)[0].strip()
+def _options(options):
+    options.setdefault("max_pages", MAX_PAGES)
+    options.setdefault("same_host", SAME_HOST_ONLY)
+    return options
 
-def crawl(start_url: str):
+async def crawl_async(start_url: str, **options):
     """
     CHAPTER 4: The Walk
-      V1  Use a queue to explore pages.
-      V2  Record each page's status and size.
-      V3  Add new links until we hit MAX_PAGES.
+      V1  Many pages at once, each host behind its own gate (see crawl_engine).
+      V2  Record each page's status and size (status None when the page never answered).
+      V3  Stop adding links once we hit MAX_PAGES.
+    """
+    return await engine_crawl_async(start_url, PageStats(), **_options(options))
+
+def crawl(start_url: str, **options):
+    """
+    CHAPTER 5: The Plain Door
+      V1  Same call as before: crawl(url) -> [{"url", "status", "bytes"}, ...].
+      V2  crawl(url, crawl_id="...") checkpoints the walk; calling again with the same
+          id after a restart picks up where it stopped (see crawl_checkpoint).
     """
-    start_host = urlparse(start_url).netloc
-    seen, out = set(), []
-    q = deque([start_url])
-
-    while q and len(out) < MAX_PAGES:
-        url = q.popleft()
-        if url in seen:
-            continue
-        seen.add(url)
-
-        r = requests.get(url, timeout=20, headers={"User-Agent": "SEA-SEQ/1.0"})
-        out.append({"url": url, "status": r.status_code, "bytes": len(r.content)})
-
-        if "text/html" in r.headers.get("content-type", "") and r.ok:
-            soup = BeautifulSoup(r.text, "lxml")
-            for a in soup.find_all("a", href=True):
-                nxt = normalize(urljoin(url, a["href"]))
-                if not nxt.startswith("http"):
-                    continue
-                if SAME_HOST_ONLY and urlparse(nxt).netloc != start_host:
-                    continue
-                if nxt not in seen:
-                    q.append(nxt)
-    return out
+    return engine_crawl(start_url, PageStats(), **_options(options))
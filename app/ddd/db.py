@@ -6,15 +6,32 @@ CHAPTER 1: Purpose
   V2  Make sure shelves (tables) exist.
 
 CHAPTER 2: Tables
-  V1  page_screenshots -> images and notes per URL.
+  V1  page_screenshots -> image hash and notes per URL.
   V2  run_reports      -> one row per test run, with pass/fail and tier.
   V3  findings         -> each specific issue from a run.
+
+CHAPTER 3: Migrations
+  V1  Each change to the shelves is a numbered migration, applied once, in order,
+      each in its own transaction, and written down in schema_migrations.
+  V2  Only forward: to change something, add the next number; never edit an old one.
+  V3  An advisory lock keeps two app instances from migrating at the same time.
+  V4  DB_PARTITION_FINDINGS=true turns findings into monthly partitions (for years of
+      history); DB_PARTITION_MONTHS_AHEAD partitions are kept ready ahead of time.
+      Opt-ins like this one are not numbered: they are written down by name in
+      schema_opt_ins and run after the numbered migrations, so they can be turned
+      on at any schema version.
+  V5  Screenshot images moved out to a blob store on disk; page_screenshots keeps
+      image_hash and image_size (see screenshots.py).
 """
 
 import os
+from datetime import date
 from psycopg_pool import ConnectionPool
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+PARTITION_FINDINGS = os.getenv("DB_PARTITION_FINDINGS", "false").lower() == "true"
+PARTITION_MONTHS_AHEAD = int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3"))
+MIGRATION_LOCK = 0x5EA5EC  # pg_advisory_lock key shared by every SEA-SEC instance
 
 pool = ConnectionPool(
     DATABASE_URL,
@@ -23,40 +40,231 @@ pool = ConnectionPool(
     kwargs={"autocommit": True},
 )
 
-def migrate_once():
+# CHAPTER 3, V1: The shelves as they were first built (IF NOT EXISTS: old databases
+# already have them and only get the version written down).
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS page_screenshots (
+      id BIGSERIAL PRIMARY KEY,
+      url TEXT NOT NULL,
+      status TEXT NOT NULL,
+      http_status INT,
+      captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+      image_bytes BYTEA,
+      image_format TEXT DEFAULT 'png',
+      notes JSONB
+    );""",
+    """
+    CREATE TABLE IF NOT EXISTS run_reports (
+      id BIGSERIAL PRIMARY KEY,
+      run_id UUID NOT NULL,
+      started_at TIMESTAMPTZ NOT NULL,
+      finished_at TIMESTAMPTZ,
+      target_url TEXT NOT NULL,
+      pass BOOLEAN NOT NULL,
+      overall_tier SMALLINT NOT NULL,
+      totals JSONB,
+      notes JSONB
+    );""",
+    """
+    CREATE TABLE IF NOT EXISTS findings (
+      id BIGSERIAL PRIMARY KEY,
+      run_id UUID NOT NULL,
+      url TEXT,
+      ip INET,
+      category TEXT,
+      severity SMALLINT,
+      tier SMALLINT,
+      detail JSONB,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );""",
+]
+
+# The hot queries (tools/send_report_email.fetch_latest):
+#   newest run      -> ORDER BY started_at DESC LIMIT 1
+#   its findings    -> WHERE run_id = ? ORDER BY severity DESC, category
+# Built inside the migration transaction, so writes to the table wait while it builds.
+HOT_QUERY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS run_reports_started_at_idx ON run_reports (started_at DESC)",
+    "CREATE INDEX IF NOT EXISTS run_reports_run_id_idx ON run_reports (run_id)",
+    "CREATE INDEX IF NOT EXISTS findings_run_id_idx ON findings (run_id, severity DESC, category)",
+]
+
+# CHAPTER 3, V5: Screenshots live on disk (screenshots.py); the row keeps the hash.
+# image_bytes stays until screenshots.move_inline_images() has emptied it.
+SCREENSHOT_HASHES = [
+    "ALTER TABLE page_screenshots ADD COLUMN IF NOT EXISTS image_hash TEXT",
+    "ALTER TABLE page_screenshots ADD COLUMN IF NOT EXISTS image_size INT",
+    "CREATE INDEX IF NOT EXISTS page_screenshots_image_hash_idx ON page_screenshots (image_hash)",
+    "CREATE INDEX IF NOT EXISTS page_screenshots_url_idx ON page_screenshots (url, captured_at DESC)",
+]
+
+def _month(d: date, add: int = 0) -> date:
+    months = d.year * 12 + d.month - 1 + add
+    return date(months // 12, months % 12 + 1, 1)
+
+def _partition_findings(cur):
+    """
+    CHAPTER 3, V4: findings -> PARTITION BY RANGE (created_at).
+      V1  The old table becomes the partition for everything before next month.
+      V2  Its id sequence keeps counting for the new table.
+      V3  Attaching checks every old row once (a full scan, under lock): run it in a quiet hour.
+    """
+    cur.execute("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'findings'")
+    if cur.fetchone():
+        return
+    cur.execute("SELECT pg_get_serial_sequence('findings', 'id')")
+    sequence = cur.fetchone()[0]
+    cutover = _month(date.today(), 1)
+    cur.execute("ALTER TABLE findings RENAME TO findings_legacy")
+    cur.execute("ALTER INDEX IF EXISTS findings_pkey RENAME TO findings_legacy_pkey")
+    cur.execute("DROP INDEX IF EXISTS findings_run_id_idx")
+    cur.execute(f"""
+    CREATE TABLE findings (
+      id BIGINT NOT NULL DEFAULT nextval('{sequence}'::regclass),
+      run_id UUID NOT NULL,
+      url TEXT,
+      ip INET,
+      category TEXT,
+      severity SMALLINT,
+      tier SMALLINT,
+      detail JSONB,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+      PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);""")
+    cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY findings.id")
+    cur.execute(f"ALTER TABLE findings ATTACH PARTITION findings_legacy FOR VALUES FROM (MINVALUE) TO ('{cutover}')")
+    cur.execute("CREATE INDEX findings_run_id_idx ON findings (run_id, severity DESC, category)")
+    cur.execute("CREATE TABLE IF NOT EXISTS findings_default PARTITION OF findings DEFAULT")
+
+# CHAPTER 3, V2: (version, name, statements or a function of the cursor). Append only.
+MIGRATIONS = [
+    (1, "base tables", BASE_TABLES),
+    (2, "indexes for the hot queries", HOT_QUERY_INDEXES),
+    (3, "screenshot images by hash", SCREENSHOT_HASHES),
+]
+
+# CHAPTER 3, V4: (key, name, steps, turned on?). Run only when on, after every numbered
+# migration, and recorded by key; each must work on the newest numbered schema.
+OPT_INS = [
+    ("partition_findings", "partition findings by month", _partition_findings, lambda: PARTITION_FINDINGS),
+]
+
+def _month_partition(cur, start: date, end: date, only_if_needed: bool = False):
+    """
+    CHAPTER 3, V4: One month's partition, made once.
+      V1  Rows that already landed in findings_default for that month are moved into it
+          first (same transaction), or attaching the month would fail.
+      V2  only_if_needed: make it only when findings_default holds rows for it.
+    """
+    name = f"findings_y{start.year}m{start.month:02d}"
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    if cur.fetchone()[0]:
+        return
+    cur.execute("SELECT EXISTS (SELECT 1 FROM findings_default WHERE created_at >= %s AND created_at < %s)",
+                (start, end))
+    stranded = cur.fetchone()[0]
+    if not stranded:
+        if not only_if_needed:
+            cur.execute(f"CREATE TABLE {name} PARTITION OF findings FOR VALUES FROM ('{start}') TO ('{end}')")
+        return
+    cur.execute(f"CREATE TABLE {name} (LIKE findings INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cur.execute(f"""
+    WITH moved AS (
+      DELETE FROM findings_default WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *
+    ) INSERT INTO {name} SELECT * FROM moved""")
+    cur.execute(f"ALTER TABLE findings ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    print(f"[!] moved findings for {start:%Y-%m} out of findings_default into {name}")
+
+def ensure_findings_partitions(cur, months_ahead: int = None):
+    """
+    CHAPTER 3, V4: Monthly partitions from next month on, so the default one stays empty.
+      V1  Named findings_yYYYYmMM.
+      V2  This month gets one only if rows for it are sitting in findings_default
+          (the process outran its partitions).
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    today = date.today()
+    for i in range(0, months_ahead + 1):
+        _month_partition(cur, _month(today, i), _month(today, i + 1), only_if_needed=i == 0)
+
+_partitions_ensured = None
+
+def keep_partitions_ahead():
+    """
+    CHAPTER 3, V4: Called on run writes, so a process up for months keeps its partitions
+    ahead of the calendar. Once per month per process; the migration lock keeps two
+    instances from making the same partition.
+    """
+    global _partitions_ensured
+    month = _month(date.today())
+    if _partitions_ensured == month:
+        return
+    with pool.connection() as conn, conn.transaction(), conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+        ensure_findings_partitions(cur)
+    _partitions_ensured = month
+
+def schema_version() -> int:
     with pool.connection() as conn, conn.cursor() as cur:
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS page_screenshots (
-          id BIGSERIAL PRIMARY KEY,
-          url TEXT NOT NULL,
-          status TEXT NOT NULL,
-          http_status INT,
-          captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-          image_bytes BYTEA,
-          image_format TEXT DEFAULT 'png',
-          notes JSONB
-        );""")
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS run_reports (
-          id BIGSERIAL PRIMARY KEY,
-          run_id UUID NOT NULL,
-          started_at TIMESTAMPTZ NOT NULL,
-          finished_at TIMESTAMPTZ,
-          target_url TEXT NOT NULL,
-          pass BOOLEAN NOT NULL,
-          overall_tier SMALLINT NOT NULL,
-          totals JSONB,
-          notes JSONB
-        );""")
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS findings (
-          id BIGSERIAL PRIMARY KEY,
-          run_id UUID NOT NULL,
-          url TEXT,
-          ip INET,
-          category TEXT,
-          severity SMALLINT,
-          tier SMALLINT,
-          detail JSONB,
-          created_at TIMESTAMPTZ NOT NULL DEFAULT now()
-        );""")
+        cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return 0
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cur.fetchone()[0]
+
+def _pending(applied, opted_in):
+    """
+    CHAPTER 3, V4: What to run now, as (ledger, key, name, steps).
+      V1  The numbered migrations not yet applied, in order.
+      V2  Then the opt-ins that are on and not yet applied; an opt-in that is off is
+          neither run nor recorded, so turning it on later just runs it then.
+    """
+    pending = [("schema_migrations", version, name, steps)
+               for version, name, steps in MIGRATIONS if version not in applied]
+    pending += [("schema_opt_ins", key, name, steps)
+                for key, name, steps, enabled in OPT_INS if key not in opted_in and enabled()]
+    return pending
+
+def migrate_once():
+    """
+    CHAPTER 4: Bring the Library Up to Date
+      V1  Apply every migration not yet in schema_migrations, then every opt-in that is
+          on and not yet in schema_opt_ins; return their versions and keys.
+      V2  Safe to call at every startup (nothing to do is the usual answer).
+    """
+    applied_now = []
+    with pool.connection() as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK,))
+        try:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version INT PRIMARY KEY,
+              name TEXT NOT NULL,
+              applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );""")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_opt_ins (
+              key TEXT PRIMARY KEY,
+              name TEXT NOT NULL,
+              applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );""")
+            applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations").fetchall()}
+            opted_in = {row[0] for row in conn.execute("SELECT key FROM schema_opt_ins").fetchall()}
+            for ledger, key, name, steps in _pending(applied, opted_in):
+                with conn.transaction(), conn.cursor() as cur:
+                    if callable(steps):
+                        steps(cur)
+                    else:
+                        for sql in steps:
+                            cur.execute(sql)
+                    column = "version" if ledger == "schema_migrations" else "key"
+                    cur.execute(f"INSERT INTO {ledger} ({column}, name) VALUES (%s, %s)", (key, name))
+                applied_now.append(key)
+            if PARTITION_FINDINGS:
+                with conn.transaction(), conn.cursor() as cur:
+                    ensure_findings_partitions(cur)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK,))
+    return applied_now
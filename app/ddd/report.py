@@ -10,11 +10,22 @@ CHAPTER 2: Tiers
   V2  Tier 2 = medium risk.
   V3  Tier 1 = low risk.
   V4  Pass if overall tier ≤ 1. Fail otherwise.
+
+CHAPTER 5: One Trip to the Library
+  V1  A run and all its findings are written in one transaction: all of it or none.
+  V2  Findings go in with COPY (one stream, not one round trip per finding).
+  V3  REPORT_FINDINGS_WRITE=executemany uses batched inserts instead, for poolers
+      or proxies that do not pass COPY through.
 """
 
+import os
 from uuid import uuid4
 from datetime import datetime
-from .db import pool
+from psycopg.types.json import Jsonb
+from .db import pool, PARTITION_FINDINGS, keep_partitions_ahead
+
+FINDINGS_WRITE = os.getenv("REPORT_FINDINGS_WRITE", "copy").lower()
+FINDING_COLUMNS = "run_id, url, ip, category, severity, tier, detail"
 
 def tier_for(f):
     # CHAPTER 3: Simple tier map
@@ -26,6 +37,34 @@ def tier_for(f):
         return 2
     return 1
 
+def _finding_rows(run_id, findings):
+    # CHAPTER 5, V2: One row per finding, in FINDING_COLUMNS order.
+    for f in findings:
+        detail = f.get("detail") or {}
+        yield (run_id, detail.get("url"), None, f["category"], f["severity"], f["tier"], Jsonb(f["detail"]))
+
+def write_findings(cur, run_id, findings, method=None):
+    """
+    CHAPTER 5: Many Findings, One Trip
+      V1  "copy" streams every row through COPY ... FROM STDIN.
+      V2  "executemany" sends batched INSERTs (psycopg pipelines them).
+      V3  Runs inside the caller's transaction; returns how many rows went in.
+    """
+    method = (method or FINDINGS_WRITE).lower()
+    rows = _finding_rows(run_id, findings)
+    if method == "copy":
+        count = 0
+        with cur.copy(f"COPY findings ({FINDING_COLUMNS}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+        return count
+    if method == "executemany":
+        rows = list(rows)
+        cur.executemany(f"INSERT INTO findings ({FINDING_COLUMNS}) VALUES (%s,%s,%s,%s,%s,%s,%s)", rows)
+        return len(rows)
+    raise ValueError(f"unknown findings write method: {method!r} (copy or executemany)")
+
 def save_run(target_url, pages, extra_findings):
     """
     CHAPTER 4: Save the Story
@@ -33,7 +72,7 @@ def save_run(target_url, pages, extra_findings):
       V2  Merge findings.
       V3  Detect simple PHI/crypto paths.
       V4  Compute tier and pass/fail.
-      V5  Insert run and findings into Postgres.
+      V5  Insert run and findings into Postgres, together (see CHAPTER 5).
     """
     run_id = uuid4()
     started = datetime.utcnow()
@@ -54,20 +93,20 @@ def save_run(target_url, pages, extra_findings):
     overall_tier = max((f["tier"] for f in findings), default=1)
     passed = overall_tier <= 1
 
-    with pool.connection() as conn, conn.cursor() as cur:
+    # Verse: a long-running process makes next month's partition before it needs it
+    if PARTITION_FINDINGS:
+        keep_partitions_ahead()
+
+    # Verse: the pool hands out autocommit connections; this block is one transaction
+    with pool.connection() as conn, conn.transaction(), conn.cursor() as cur:
         cur.execute(
             "INSERT INTO run_reports (run_id, started_at, target_url, pass, overall_tier, totals, notes) "
             "VALUES (%s,%s,%s,%s,%s,%s,%s)",
             (
                 str(run_id), started, target_url, passed, overall_tier,
-                {"pages": len(pages), "findings": len(findings)}, None,
+                Jsonb({"pages": len(pages), "findings": len(findings)}), None,
             ),
         )
-        for f in findings:
-            cur.execute(
-                "INSERT INTO findings (run_id, url, ip, category, severity, tier, detail) "
-                "VALUES (%s,%s,%s,%s,%s,%s,%s)",
-                (str(run_id), f.get("detail", {}).get("url"), None, f["category"], f["severity"], f["tier"], f["detail"]),
-            )
+        write_findings(cur, str(run_id), findings)
 
     return {"run_id": str(run_id), "pass": passed, "overall_tier": overall_tier, "pages": len(pages), "findings": len(findings)}
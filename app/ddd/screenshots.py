@@ -0,0 +1,161 @@
+"""
+BOOK: SEA-SEC Album of Screenshots
+
+CHAPTER 1: Purpose
+  V1  Keep page pictures on disk, not inside Postgres rows.
+  V2  A picture's name is the SHA-256 of its bytes: the same picture is kept once,
+      however many runs take it again.
+  V3  page_screenshots keeps only the hash and a few facts (size, format, when, where).
+
+CHAPTER 2: The Shelf
+  V1  SCREENSHOT_DIR/ab/cd/abcd....png  (two levels of folders keep each one small).
+  V2  Written to a temp file first, then renamed: a reader never sees half a picture.
+  V3  Thumbnails are made the first time someone asks (needs Pillow), then kept
+      next to the picture as abcd....thumb320.png.
+
+CHAPTER 3: Moving House
+  V1  move_inline_images() copies old image_bytes rows onto the shelf in batches,
+      sets image_hash and empties image_bytes. Safe to stop and run again.
+  V2  python -m app.services.screenshots move   (run VACUUM FULL page_screenshots after,
+      to give the space back to the disk).
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCREENSHOT_DIR = Path(os.getenv("SCREENSHOT_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "screenshots")))
+THUMB_SIZE = int(os.getenv("SCREENSHOT_THUMB_SIZE", "320"))
+MOVE_BATCH = 200
+
+class BlobStore:
+    """CHAPTER 2: Content-addressed files: put(bytes) -> hash, path(hash) -> file."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or SCREENSHOT_DIR)
+
+    def path(self, digest, fmt="png"):
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.{fmt}"
+
+    def put(self, data, fmt="png"):
+        # V2: same bytes, same name; a second put of a known picture writes nothing
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest, fmt)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            self._write(target, data)
+        return digest
+
+    @staticmethod
+    def _write(target, data):
+        # V2: temp file then rename; the temp file never outlives a failed write
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def get(self, digest, fmt="png"):
+        return self.path(digest, fmt).read_bytes()
+
+    def exists(self, digest, fmt="png"):
+        return self.path(digest, fmt).exists()
+
+    def thumbnail(self, digest, fmt="png", size=None):
+        """CHAPTER 2, V3: Path of a thumbnail no wider or taller than `size`, made on first ask."""
+        size = size or THUMB_SIZE
+        thumb = self.path(digest, fmt).with_name(f"{digest}.thumb{size}.png")
+        if thumb.exists():
+            return thumb
+        try:
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("screenshot thumbnails need Pillow (pip install Pillow)")
+        with Image.open(self.path(digest, fmt)) as im:
+            im.thumbnail((size, size))
+            buf = io.BytesIO()
+            im.save(buf, "PNG")
+        self._write(thumb, buf.getvalue())
+        return thumb
+
+STORE = BlobStore()
+
+def save_screenshot(url, status, image_bytes=None, http_status=None, image_format="png", notes=None, store=None):
+    """
+    CHAPTER 4: Keep a Picture
+      V1  Picture to the shelf, its hash and facts to page_screenshots.
+      V2  Returns the row id and the hash.
+    """
+    from psycopg.types.json import Jsonb
+    from .db import pool
+
+    store = store or STORE
+    digest = store.put(image_bytes, image_format) if image_bytes else None
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO page_screenshots (url, status, http_status, image_hash, image_size, image_format, notes) "
+            "VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id",
+            (url, status, http_status, digest, len(image_bytes) if image_bytes else None, image_format,
+             Jsonb(notes) if notes is not None else None),
+        )
+        return {"id": cur.fetchone()[0], "image_hash": digest}
+
+def load_screenshot(screenshot_id, store=None):
+    """CHAPTER 4, V3: The picture's bytes for a row id (None when the row has no picture)."""
+    from .db import pool
+
+    store = store or STORE
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT image_hash, image_format FROM page_screenshots WHERE id=%s", (screenshot_id,))
+        row = cur.fetchone()
+    if not row or not row[0]:
+        return None
+    return store.get(row[0], row[1] or "png")
+
+def move_inline_images(store=None, batch=MOVE_BATCH, log=print):
+    """
+    CHAPTER 3: Moving House
+      V1  Oldest rows first, `batch` rows per transaction.
+      V2  Each picture is on the shelf before its row forgets the bytes.
+      V3  Returns (rows moved, distinct pictures written).
+    """
+    from .db import pool
+
+    store = store or STORE
+    moved, written = 0, set()
+    while True:
+        with pool.connection() as conn, conn.transaction(), conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, image_bytes, COALESCE(image_format, 'png') FROM page_screenshots "
+                "WHERE image_bytes IS NOT NULL ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED",
+                (batch,),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, data, fmt in rows:
+                data = bytes(data)
+                digest = store.put(data, fmt)
+                written.add(digest)
+                updates.append((digest, len(data), row_id))
+            cur.executemany(
+                "UPDATE page_screenshots SET image_hash=%s, image_size=%s, image_bytes=NULL WHERE id=%s", updates)
+        moved += len(rows)
+        log(f"[*] moved {moved} screenshots ({len(written)} distinct images)")
+    return moved, len(written)
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["move"]:
+        raise SystemExit("usage: python -m app.services.screenshots move")
+    from .db import migrate_once
+
+    migrate_once()
+    rows, images = move_inline_images()
+    print(f"[*] done: {rows} rows, {images} images on disk. Run VACUUM FULL page_screenshots to reclaim space.")
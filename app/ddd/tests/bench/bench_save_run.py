@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: persisting a run's findings - one autocommit INSERT per finding (the old
+save_run) versus report.write_findings in one transaction, with COPY and with
+executemany.
+
+  DATABASE_URL=postgresql://localhost/seasec python tests/bench/bench_save_run.py --sizes 1000 10000 50000
+
+Needs a reachable Postgres (a local one; latency is the point). Tables are created
+with db.migrate_once(); every row written is deleted again afterwards.
+"""
+
+import argparse
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from ddd import report  # noqa: E402
+from ddd.db import migrate_once, pool  # noqa: E402
+
+
+def synthetic_findings(n):
+    return [{"category": ("headers", "rate", "phi", "crypto")[i % 4], "severity": i % 4, "tier": 1 + i % 3,
+             "detail": {"url": f"https://bench.example.com/p/{i}", "header": "x-frame-options"}}
+            for i in range(n)]
+
+
+def per_row(run_id, findings):
+    """The old path: autocommit, one INSERT (one round trip, one transaction) per finding."""
+    with pool.connection() as conn, conn.cursor() as cur:
+        for row in report._finding_rows(run_id, findings):
+            cur.execute(f"INSERT INTO findings ({report.FINDING_COLUMNS}) VALUES (%s,%s,%s,%s,%s,%s,%s)", row)
+
+
+def bulk(method):
+    def write(run_id, findings):
+        with pool.connection() as conn, conn.transaction(), conn.cursor() as cur:
+            report.write_findings(cur, run_id, findings, method)
+    return write
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--skip-per-row-above", type=int, default=20000,
+                    help="the old path takes minutes on big runs; skip it past this size")
+    args = ap.parse_args()
+
+    migrate_once()
+    strategies = [("per-row autocommit", per_row), ("copy, 1 transaction", bulk("copy")),
+                  ("executemany, 1 transaction", bulk("executemany"))]
+    print(f"{'strategy':<28} {'findings':>9} {'seconds':>9} {'findings/s':>11}")
+    run_ids = []
+    try:
+        for n in args.sizes:
+            findings = synthetic_findings(n)
+            for name, write in strategies:
+                if write is per_row and n > args.skip_per_row_above:
+                    continue
+                run_id = str(uuid4())
+                run_ids.append(run_id)
+                t0 = time.perf_counter()
+                write(run_id, findings)
+                seconds = time.perf_counter() - t0
+                print(f"{name:<28} {n:>9,} {seconds:>9.2f} {n / seconds:>11,.0f}")
+    finally:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM findings WHERE run_id = ANY(%s::uuid[])", (run_ids,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import importlib.util
+import os
+import sys
+
+# ddd modules use relative imports (they ship as app.services); import them as package "ddd"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# report / db need psycopg; without it those tests are not collected instead of failing
+collect_ignore = []
+if not all(importlib.util.find_spec(m) for m in ("psycopg", "psycopg_pool")):
+    collect_ignore += ["test_report.py", "test_db.py"]
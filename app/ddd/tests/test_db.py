@@ -0,0 +1,59 @@
+from datetime import date
+
+from ddd import db
+
+
+def _keys(pending):
+    return [key for _, key, _, _ in pending]
+
+
+def test_opt_ins_run_after_the_numbered_migrations(monkeypatch):
+    monkeypatch.setattr(db, "PARTITION_FINDINGS", False)
+    assert _keys(db._pending({1}, set())) == [2, 3]  # off: neither run nor recorded
+    monkeypatch.setattr(db, "PARTITION_FINDINGS", True)
+    assert _keys(db._pending({1}, set())) == [2, 3, "partition_findings"]
+
+
+def test_opt_in_turned_on_at_the_newest_version_needs_no_override(monkeypatch):
+    monkeypatch.setattr(db, "PARTITION_FINDINGS", True)
+    applied = {version for version, _, _ in db.MIGRATIONS}
+    assert db._pending(applied, set()) == [("schema_opt_ins", "partition_findings", "partition findings by month",
+                                            db._partition_findings)]
+    assert db._pending(applied, {"partition_findings"}) == []
+
+
+class FakeCursor:
+    """Answers to_regclass / EXISTS from the given sets, records every statement."""
+
+    def __init__(self, existing=(), stranded=()):
+        self.existing, self.stranded, self.sql, self._row = set(existing), set(stranded), [], None
+
+    def execute(self, sql, params=()):
+        self.sql.append(" ".join(sql.split()))
+        if "to_regclass" in sql:
+            self._row = (params[0] in self.existing,)
+        elif "EXISTS" in sql:
+            self._row = (params[0] in self.stranded,)
+
+    def fetchone(self):
+        return self._row
+
+
+def test_partitions_ahead_skip_existing_and_this_month(monkeypatch):
+    class Nov15(date):
+        @classmethod
+        def today(cls):
+            return cls(2024, 11, 15)
+    monkeypatch.setattr(db, "date", Nov15)
+    cur = FakeCursor(existing={"findings_y2024m12"})
+    db.ensure_findings_partitions(cur, months_ahead=2)
+    created = [s for s in cur.sql if s.startswith("CREATE")]
+    assert created == ["CREATE TABLE findings_y2025m01 PARTITION OF findings FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')"]
+
+
+def test_rows_in_the_default_partition_are_moved_before_attaching():
+    cur = FakeCursor(stranded={date(2024, 11, 1)})
+    db._month_partition(cur, date(2024, 11, 1), date(2024, 12, 1), only_if_needed=True)
+    steps = [s.split(" (")[0] for s in cur.sql[2:]]
+    assert steps == ["CREATE TABLE findings_y2024m11", "WITH moved AS", "ALTER TABLE findings ATTACH PARTITION findings_y2024m11 FOR VALUES FROM"]
+    assert "DELETE FROM findings_default" in cur.sql[3] and "INSERT INTO findings_y2024m11" in cur.sql[3]
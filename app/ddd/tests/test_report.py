@@ -0,0 +1,85 @@
+import os
+from uuid import uuid4
+
+import pytest
+from psycopg.types.json import Jsonb
+
+from ddd import report
+
+FINDINGS = [
+    {"category": "headers", "severity": 1, "tier": 1, "detail": {"url": "https://a.test/", "header": "x-frame-options"}},
+    {"category": "phi", "severity": 3, "tier": 3, "detail": {"url": "https://a.test/patient"}},
+]
+
+
+class FakeCopy:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.copied, self.sql, self.many = [], [], None
+
+    def copy(self, sql):
+        self.sql.append(sql)
+        return FakeCopy(self.copied)
+
+    def executemany(self, sql, rows):
+        self.sql.append(sql)
+        self.many = rows
+
+
+def _plain(rows):
+    return [row[:-1] + (row[-1].obj,) for row in rows]
+
+
+def test_copy_is_the_default_path():
+    cur = FakeCursor()
+    assert report.write_findings(cur, "run-1", FINDINGS) == 2
+    assert cur.sql == ["COPY findings (run_id, url, ip, category, severity, tier, detail) FROM STDIN"]
+    assert all(isinstance(row[-1], Jsonb) for row in cur.copied)
+    assert _plain(cur.copied) == [
+        ("run-1", "https://a.test/", None, "headers", 1, 1, FINDINGS[0]["detail"]),
+        ("run-1", "https://a.test/patient", None, "phi", 3, 3, FINDINGS[1]["detail"]),
+    ]
+
+
+def test_executemany_path_sends_the_same_rows():
+    cur, copied = FakeCursor(), FakeCursor()
+    report.write_findings(copied, "run-1", FINDINGS)
+    assert report.write_findings(cur, "run-1", FINDINGS, method="executemany") == 2
+    assert cur.sql[0].startswith("INSERT INTO findings (run_id, url, ip, category, severity, tier, detail) VALUES")
+    assert _plain(cur.many) == _plain(copied.copied)
+
+
+def test_unknown_method_is_refused():
+    with pytest.raises(ValueError):
+        report.write_findings(FakeCursor(), "run-1", FINDINGS, method="bulk")
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="needs a Postgres (DATABASE_URL)")
+@pytest.mark.parametrize("method", ["copy", "executemany"])
+def test_write_findings_round_trip(method):
+    from ddd.db import migrate_once, pool
+
+    migrate_once()
+    run_id = str(uuid4())
+    try:
+        with pool.connection() as conn, conn.transaction(), conn.cursor() as cur:
+            report.write_findings(cur, run_id, FINDINGS, method)
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT category, detail FROM findings WHERE run_id=%s ORDER BY severity", (run_id,))
+            assert cur.fetchall() == [("headers", FINDINGS[0]["detail"]), ("phi", FINDINGS[1]["detail"])]
+    finally:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM findings WHERE run_id=%s", (run_id,))
@@ -0,0 +1,49 @@
+import io
+import os
+
+import pytest
+
+from ddd.screenshots import BlobStore
+
+PICTURE = b"\x89PNG not really a picture"
+
+
+def test_same_picture_is_kept_once(tmp_path):
+    store = BlobStore(tmp_path)
+    digest = store.put(PICTURE)
+    assert store.put(PICTURE) == digest
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == [store.path(digest)]
+    assert store.get(digest) == PICTURE and store.exists(digest)
+
+
+def test_pictures_are_sharded_by_hash(tmp_path):
+    store = BlobStore(tmp_path)
+    digest = store.put(PICTURE, "jpg")
+    assert store.path(digest, "jpg") == tmp_path / digest[:2] / digest[2:4] / f"{digest}.jpg"
+    assert store.path(digest, "jpg").is_file()
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    store = BlobStore(tmp_path)
+
+    def boom(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", boom)
+    with pytest.raises(OSError):
+        store.put(PICTURE)
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == []
+
+
+def test_thumbnail_is_made_once(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.new("RGB", (1280, 640), "navy").save(buf, "PNG")
+    store = BlobStore(tmp_path)
+    digest = store.put(buf.getvalue())
+    thumb = store.thumbnail(digest, size=320)
+    assert thumb == store.path(digest).with_name(f"{digest}.thumb320.png")
+    with Image.open(thumb) as im:
+        assert im.size == (320, 160)
+    mtime = thumb.stat().st_mtime_ns
+    assert store.thumbnail(digest, size=320) == thumb and thumb.stat().st_mtime_ns == mtime
+    assert not list(tmp_path.rglob(".tmp-*"))